@@ -0,0 +1,254 @@
+"""หลายบัญชี TikTok: โควตาโพสต์ต่อบัญชี (รายชั่วโมง / รายวัน) และ dispatcher แบบ weighted fair queueing หน้า stage upload
+
+บัญชีที่ใช้โควตาหมดจะรอเฉพาะงานของตัวเอง (บัญชีอื่นโพสต์ต่อได้) และงานที่ต้องรอนานเกิน max_wait
+จะถูกคืนให้ผู้เรียกเลื่อนเวลาไปแทนการยึดที่ในคิว
+ถ้ามี ledger (job store) จำนวนโพสต์จะนับร่วมกันทุก process (worker mode) และไม่เริ่มใหม่เมื่อ restart
+"""
+import json
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from resilience import TokenBucket
+
+DEFAULT_ACCOUNT = 'default'
+
+
+@dataclass
+class Account:
+    name: str
+    access_token: str
+    username: str
+    weight: float = 1.0          # สัดส่วนรอบการอัปโหลดเมื่อหลายบัญชีมีงานรอพร้อมกัน
+    posts_per_hour: int = 5
+    posts_per_day: int = 15
+
+
+def window_wait(posted: Sequence[float], limits: Sequence[Tuple[float, int]], posts: int, now: float) -> float:
+    """เวลาที่ต้องรอจนโพสต์ได้อีก posts ครั้งภายใต้ sliding window (posted = เวลาที่โพสต์ไปแล้ว เก่า -> ใหม่)"""
+    wait = 0.0
+    for window, limit in limits:
+        recent = [t for t in posted if t > now - window]
+        excess = len(recent) + posts - limit
+        if excess <= 0:
+            continue
+        if limit <= 0:
+            return float('inf')
+        if excess <= len(recent):
+            wait = max(wait, recent[excess - 1] + window - now)  # รอจนโพสต์เก่าหลุด window ครบจำนวน
+        else:
+            wait = max(wait, ((excess - len(recent) - 1) // limit + 1) * window)  # ประมาณ: เกินไปอีกหลาย window
+    return wait
+
+
+class PostQuota:
+    """token bucket รายชั่วโมง + รายวันของบัญชีเดียว (ต้องมี token ทั้งสองถึงจะโพสต์ได้)
+
+    ledger = job store ที่นับโพสต์ของบัญชีร่วมกันทุก process (sliding window 1 ชั่วโมง / 1 วัน)
+    token bucket ใน process ยังใช้คุมอัตราและลดอัตราเมื่อโดน 429 แต่โพสต์ได้ก็ต่อเมื่อ ledger จองให้ได้ด้วย
+    ไม่มี ledger = นับเฉพาะ process นี้ (เริ่มเต็มใหม่ทุกครั้งที่ restart)
+    โควตาที่จองแล้วแต่อัปโหลดไม่สำเร็จคืนได้ด้วย release()
+    """
+
+    def __init__(self, posts_per_hour: int, posts_per_day: int, ledger=None, account: Optional[str] = None):
+        self.hourly = TokenBucket(posts_per_hour / 3600.0, posts_per_hour)
+        self.daily = TokenBucket(posts_per_day / 86400.0, posts_per_day)
+        self.limits = ((3600.0, posts_per_hour), (86400.0, posts_per_day))
+        self.ledger = ledger
+        self.account = account
+        self._lock = threading.Lock()
+
+    def wait_time(self, posts: int = 1) -> float:
+        """เวลาที่ต้องรอจนกว่าจะโพสต์ได้อีก posts ครั้ง"""
+        wait = max(self.hourly.wait_time(posts), self.daily.wait_time(posts))
+        if self.ledger is not None:
+            now = time.time()
+            posted = self.ledger.recent_posts(self.account, now - max(window for window, _ in self.limits))
+            wait = max(wait, window_wait(posted, self.limits, posts, now))
+        return wait
+
+    def acquire_post(self) -> Optional[float]:
+        """จองโพสต์ 1 ครั้งถ้าโพสต์ได้ตอนนี้ - คืนเวลาที่จอง (ใช้กับ release) หรือ None ถ้ายังไม่มีโควตา"""
+        with self._lock:
+            if self.wait_time() > 0 or not self.hourly.try_acquire():
+                return None
+            if not self.daily.try_acquire():
+                self.hourly.release()
+                return None
+            # ลง ledger หลังได้ token ครบแล้ว - ledger จะไม่มีแถวค้างจากการจองที่ bucket ปฏิเสธ
+            posted_at = time.time()
+            if self.ledger is not None and not self.ledger.reserve_post(self.account, self.limits, posted_at):
+                self.hourly.release()
+                self.daily.release()
+                return None  # process อื่นใช้โควตาไปก่อน
+            return posted_at
+
+    def try_acquire(self) -> bool:
+        return self.acquire_post() is not None
+
+    def release(self, posted_at: float):
+        """คืนโควตาที่จองไว้ด้วย acquire_post (อัปโหลดไม่สำเร็จ)"""
+        self.hourly.release()
+        self.daily.release()
+        if self.ledger is not None:
+            self.ledger.release_post(self.account, posted_at)
+
+    def on_throttled(self):
+        """TikTok ตอบ 429 ให้บัญชีนี้ - ลดอัตรารายชั่วโมงลง (ค่อยๆ เพิ่มกลับเมื่อโพสต์สำเร็จ)"""
+        self.hourly.on_throttled()
+
+    def on_success(self):
+        self.hourly.on_success()
+
+    def stats(self) -> Dict:
+        return {'hourly': self.hourly.stats(), 'daily': self.daily.stats(),
+                'wait_s': round(self.wait_time(), 1)}
+
+
+class AccountPool:
+    def __init__(self, accounts: List[Account], ledger=None):
+        if not accounts:
+            raise ValueError('ต้องมีอย่างน้อย 1 บัญชี')
+        self.accounts: Dict[str, Account] = {account.name: account for account in accounts}
+        self.default = accounts[0].name
+        self.quotas = {account.name: PostQuota(account.posts_per_hour, account.posts_per_day, ledger, account.name)
+                       for account in accounts}
+
+    def names(self) -> List[str]:
+        return list(self.accounts)
+
+    def resolve(self, name: Optional[str]) -> str:
+        """ชื่อบัญชีของ job (ไม่ระบุ / ไม่รู้จัก = บัญชีแรก)"""
+        return name if name in self.accounts else self.default
+
+    def get(self, name: Optional[str]) -> Account:
+        return self.accounts[self.resolve(name)]
+
+    def quota(self, name: Optional[str]) -> PostQuota:
+        return self.quotas[self.resolve(name)]
+
+    def stats(self) -> Dict:
+        return {name: {'username': account.username, 'weight': account.weight,
+                       **self.quotas[name].stats()}
+                for name, account in self.accounts.items()}
+
+
+def load_accounts(path: str, default: Account) -> List[Account]:
+    """อ่านบัญชีจากไฟล์ JSON: [{"name", "access_token", "username", "weight", "posts_per_hour", "posts_per_day"}]
+
+    ไม่มีไฟล์ = ใช้บัญชีเดียว (default) - โควตาที่ไม่ระบุในไฟล์ใช้ค่าของ default
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return [default]
+    known = set(Account.__dataclass_fields__)
+    base = {'posts_per_hour': default.posts_per_hour, 'posts_per_day': default.posts_per_day}
+    return [Account(**{**base, **{key: value for key, value in entry.items() if key in known}})
+            for entry in entries]
+
+
+class FairDispatcher:
+    """hand-off queue หน้า stage upload: แยกคิวต่อบัญชี แล้วปล่อยงานตามลำดับ weighted fair queueing
+
+    interface เดียวกับ queue.Queue ที่ JobPipeline ใช้ (put / get(timeout) / qsize)
+    get() ปล่อยเฉพาะงานของบัญชีที่ยังมีโควตา (จองโควตาให้ทันที) บัญชีที่รอโควตาไม่ขวางบัญชีอื่น
+    on_dispatched(item, posted_at) ได้เวลาที่จองไว้ - เก็บไว้คืนโควตาด้วย PostQuota.release ถ้าอัปโหลดไม่สำเร็จ
+    put() ของงานที่จะต้องรอโควตานานเกิน max_wait ส่งให้ on_deferred(item, wait_seconds) แทนและคืน False
+    """
+
+    def __init__(self, pool: AccountPool, account_of: Callable[[object], Optional[str]],
+                 maxsize: int = 10, max_wait: float = 300.0,
+                 on_deferred: Optional[Callable[[object, float], None]] = None,
+                 on_dispatched: Optional[Callable[[object, float], None]] = None):
+        self.pool = pool
+        self.account_of = account_of
+        self.maxsize = maxsize
+        self.max_wait = max_wait
+        self.on_deferred = on_deferred
+        self.on_dispatched = on_dispatched
+        self._flows: Dict[str, deque] = {}   # บัญชี -> [(start tag, finish tag, item)]
+        self._last_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._size = 0
+        self._cond = threading.Condition()
+        self._dispatched: Dict[str, int] = {}
+        self._deferred = 0
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None) -> bool:
+        name = self.pool.resolve(self.account_of(item))
+        with self._cond:
+            queued = len(self._flows.get(name, ()))
+            wait = self.pool.quota(name).wait_time(queued + 1)
+            if wait > self.max_wait and self.on_deferred is not None:
+                self._deferred += 1
+                deferred = True
+            else:
+                deferred = False
+                if not self._cond.wait_for(lambda: self._size < self.maxsize, timeout if block else 0):
+                    raise queue.Full
+                # start = max(เวลาเสมือนตอนนี้, finish ของงานก่อนหน้าในบัญชีเดียวกัน) แล้วเลื่อนตามน้ำหนัก
+                start = max(self._virtual_time, self._last_finish.get(name, 0.0))
+                finish = start + 1.0 / max(self.pool.get(name).weight, 0.01)
+                self._last_finish[name] = finish
+                self._flows.setdefault(name, deque()).append((start, finish, item))
+                self._size += 1
+                self._cond.notify_all()
+        if deferred:
+            self.on_deferred(item, wait)
+            return False
+        return True
+
+    def _pick(self):
+        """ต้องถือ lock อยู่แล้ว - งานที่ finish tag น้อยสุดจากบัญชีที่มีโควตา (None, เวลารอ) ถ้ายังไม่มี"""
+        best = None
+        soonest = None
+        for name, flow in self._flows.items():
+            if not flow:
+                continue
+            quota = self.pool.quota(name)
+            wait = quota.wait_time()
+            if wait > 0:
+                soonest = wait if soonest is None else min(soonest, wait)
+            elif best is None or flow[0][1] < self._flows[best][0][1]:
+                best = name
+        return best, soonest
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                name, soonest = self._pick()
+                posted_at = self.pool.quota(name).acquire_post() if name is not None else None
+                if posted_at is not None:
+                    start, _, item = self._flows[name].popleft()
+                    self._virtual_time = max(self._virtual_time, start)
+                    self._size -= 1
+                    self._dispatched[name] = self._dispatched.get(name, 0) + 1
+                    self._cond.notify_all()
+                    if self.on_dispatched is not None:
+                        self.on_dispatched(item, posted_at)
+                    return item
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Empty
+                # ตื่นเมื่อมีงานใหม่ หรือเมื่อบัญชีที่รอโควตาอยู่ได้ token คืน
+                waits = [w for w in (remaining, soonest) if w is not None]
+                self._cond.wait(min(waits) if waits else None)
+
+    def qsize(self) -> int:
+        with self._cond:
+            return self._size
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'waiting': {name: len(flow) for name, flow in self._flows.items() if flow},
+                'dispatched': dict(self._dispatched),
+                'deferred': self._deferred,
+                'maxsize': self.maxsize
+            }
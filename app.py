@@ -1,50 +1,158 @@
 # app.py
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
 import os
 import json
+import asyncio
 import time
 import threading
 from datetime import datetime, timedelta
-import google.generativeai as genai
-from dataclasses import dataclass
 from typing import List, Dict, Optional
 import requests
-import schedule
 import random
+import inspect
 import pytz
-
-app = Flask(__name__)
+from job_queue import (JobQueue, JobPipeline, Stage, StoreJobQueue, QueueFullError,
+                       PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+from job_store import create_job_store
+from resilience import guard_from_env, is_throttled
+from generation_cache import GenerationCache
+from generation_batcher import MicroBatcher
+from prompt_sampler import PromptSampler, CyclingChoice
+from prompt_catalog import ASMR_PROMPTS, ENHANCEMENTS, CAMERA_ANGLES, SOUND_DESCRIPTIONS
+from prompt_templates import VEO_SPEC, render_scene, render_batch, templates_fingerprint
+from tiktok_upload import ChunkedUploader, PublishFailedError
+from artifact_store import ArtifactStore
+from accounts import Account, AccountPool, FairDispatcher, DEFAULT_ACCOUNT, load_accounts
+from dashboard import register_status_routes, job_event_data
+from lazy import Lazy
+from metrics import MetricsRegistry
+from events import EventBus, StoreEventBridge
+from fragment_cache import FragmentCache
+from log_buffer import JsonlLogSink
+from schedule_index import WeeklySchedule, WEEKDAYS
+from scheduler import Scheduler, next_run_time, RECURRING_SCHEDULES
+from models import Job
+from ids import new_id, id_for
 
 # Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
 TIKTOK_ACCESS_TOKEN = os.getenv('TIKTOK_ACCESS_TOKEN', 'your-tiktok-token')
 
+# Job execution (คิวงาน + pipeline)
+JOB_QUEUE_MAXSIZE = int(os.getenv('JOB_QUEUE_MAXSIZE', '100'))        # ขนาดคิวหลัก
+JOB_QUEUE_DEFER_MAX = int(os.getenv('JOB_QUEUE_DEFER_MAX', '100'))    # งานที่พักรอได้เมื่อคิวหลักเต็ม (0 = ปฏิเสธทันที)
+GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', '2'))  # เรียก Gemini พร้อมกันสูงสุด
+CAPTION_CONCURRENCY = int(os.getenv('CAPTION_CONCURRENCY', '1'))        # สร้าง caption พร้อมกันสูงสุด
+UPLOAD_CONCURRENCY = int(os.getenv('UPLOAD_CONCURRENCY', '2'))          # อัปโหลด TikTok พร้อมกันสูงสุด
+PIPELINE_HANDOFF_SIZE = int(os.getenv('PIPELINE_HANDOFF_SIZE', '4'))    # งานที่พักรอระหว่าง stage ได้สูงสุด
+GENERATION_BATCH_SIZE = int(os.getenv('GENERATION_BATCH_SIZE', '1'))    # prompts ต่อ 1 Gemini request (1 = ไม่รวม batch)
+GENERATION_BATCH_WAIT_MS = int(os.getenv('GENERATION_BATCH_WAIT_MS', '500'))  # รอ prompts อื่นมารวม batch ได้นานสุด
+
+# Execution mode: threads (pipeline หลาย thread) | async (asyncio event loop เดียว)
+#                 | distributed (เว็บแค่ส่งเข้าคิวใน SQLite แล้วให้ worker.py หลาย process รัน)
+EXECUTION_MODE = os.getenv('EXECUTION_MODE', 'threads')
+WORKER_LEASE_SECONDS = float(os.getenv('WORKER_LEASE_SECONDS', '60'))  # worker ไม่ต่อ lease นานเท่านี้ = ถือว่าตาย
+WORKER_MAX_ATTEMPTS = int(os.getenv('WORKER_MAX_ATTEMPTS', '3'))       # job ที่ทำให้ worker ตายเกินนี้จะถูกตั้งเป็น failed
+WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', '0'))       # /metrics ของ worker.py (0 = ปิด, หลาย worker ใช้ port ต่างกัน)
+ASYNC_MAX_IN_FLIGHT = int(os.getenv('ASYNC_MAX_IN_FLIGHT', '200'))      # jobs ที่ค้างใน event loop ได้สูงสุด
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')                   # ใช้ชี้ไป stub server ตอนทดสอบ
+TIKTOK_API_BASE = os.getenv('TIKTOK_API_BASE', 'https://open.tiktokapis.com')
+TIKTOK_USERNAME = os.getenv('TIKTOK_USERNAME', 'autoasmr')
+TIKTOK_HTTP_POOL_SIZE = int(os.getenv('TIKTOK_HTTP_POOL_SIZE', '100'))
+TIKTOK_UPLOAD_CHUNK_MB = float(os.getenv('TIKTOK_UPLOAD_CHUNK_MB', '10'))  # ขนาด chunk ของ FILE_UPLOAD (5-64 MB)
+TIKTOK_UPLOAD_PARALLEL = int(os.getenv('TIKTOK_UPLOAD_PARALLEL', '1'))     # PUT chunks พร้อมกัน (TikTok จริงรับตามลำดับ)
+
+# หลายบัญชี TikTok (ไฟล์ JSON - ไม่มีไฟล์ = บัญชีเดียวจาก TIKTOK_ACCESS_TOKEN / TIKTOK_USERNAME)
+TIKTOK_ACCOUNTS_PATH = os.getenv('TIKTOK_ACCOUNTS_PATH', 'data/tiktok_accounts.json')
+TIKTOK_POSTS_PER_HOUR = int(os.getenv('TIKTOK_POSTS_PER_HOUR', '5'))   # โควตาเริ่มต้นต่อบัญชี
+TIKTOK_POSTS_PER_DAY = int(os.getenv('TIKTOK_POSTS_PER_DAY', '15'))
+UPLOAD_QUOTA_MAX_WAIT = float(os.getenv('UPLOAD_QUOTA_MAX_WAIT', '300'))  # ต้องรอโควตานานกว่านี้ = เลื่อน job ไปก่อน
+
+# Job storage
+JOB_STORE_BACKEND = os.getenv('JOB_STORE_BACKEND', 'sqlite')   # sqlite | memory
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', 'data/jobs.db')
+DAILY_RUN_TIME = os.getenv('DAILY_RUN_TIME', '09:00')  # เวลา (ไทย) ของ jobs ที่ตั้งเป็น daily/weekly
+LOG_BUFFER_CAPACITY = int(os.getenv('LOG_BUFFER_CAPACITY', '1000'))  # logs ใน memory backend
+LOG_PER_JOB_QUOTA = int(os.getenv('LOG_PER_JOB_QUOTA', '200'))      # job เดียวใช้ buffer ได้ไม่เกินนี้
+JOB_ARCHIVE_DIR = os.getenv('JOB_ARCHIVE_DIR', '')  # memory backend: ที่เก็บ jobs ที่จบแล้ว ('' = temp dir, off = เก็บใน RAM)
+LOG_EXPORT_PATH = os.getenv('LOG_EXPORT_PATH', '')                   # เช่น data/job_logs.jsonl (ว่าง = ไม่ export)
+LOG_EXPORT_MAX_MB = float(os.getenv('LOG_EXPORT_MAX_MB', '10'))
+LOG_EXPORT_BACKUPS = int(os.getenv('LOG_EXPORT_BACKUPS', '5'))
+PREWARM_CLIENTS = os.getenv('PREWARM_CLIENTS', '0') == '1'  # สร้าง Gemini client ตอน start แทนตอน job แรก
+
+# Generation cache (ใช้วิดีโอเดิมซ้ำเมื่อ prompt + model parameters เหมือนกัน)
+GENERATION_CACHE_DIR = os.getenv('GENERATION_CACHE_DIR', 'data/generation_cache')
+GENERATION_CACHE_MAX_MB = float(os.getenv('GENERATION_CACHE_MAX_MB', '50'))
+GENERATION_CACHE_TTL_HOURS = float(os.getenv('GENERATION_CACHE_TTL_HOURS', '168'))
+GENERATION_CACHE_DEFAULT = os.getenv('GENERATION_CACHE_DEFAULT', '1') == '1'  # ค่าเริ่มต้นของ use_cache ใน job ใหม่
+
+# Artifact store (ไฟล์วิดีโอ / thumbnail ที่สร้างแล้วเก็บไว้ในเครื่อง ใช้ซ้ำตอนอัปโหลดใหม่และ preview)
+ARTIFACT_STORE_DIR = os.getenv('ARTIFACT_STORE_DIR', 'data/artifacts')
+ARTIFACT_STORE_MAX_MB = float(os.getenv('ARTIFACT_STORE_MAX_MB', '2048'))
+ARTIFACT_FETCH_REMOTE = os.getenv('ARTIFACT_FETCH_REMOTE', '0') == '1'  # ดาวน์โหลดวิดีโอที่ได้เป็น URL มาเก็บด้วย
+
+# Prompt sampler (สุ่ม prompt อัตโนมัติแบบไม่ซ้ำ)
+PROMPT_HISTORY_PATH = os.getenv('PROMPT_HISTORY_PATH', 'data/prompt_history.json')  # ว่าง = ไม่บันทึกข้าม restart
+PROMPT_HISTORY_WINDOW = int(os.getenv('PROMPT_HISTORY_WINDOW', '500'))  # ไม่ซ้ำกับ prompts เท่านี้ครั้งล่าสุด
+# น้ำหนักของแต่ละหมวด เช่น "glass_fruits=3,creative_materials=1" (หมวดที่ไม่ระบุ = 1)
+PROMPT_CATEGORY_WEIGHTS = {
+    name.strip(): float(weight)
+    for name, weight in (pair.split('=', 1) for pair in os.getenv('PROMPT_CATEGORY_WEIGHTS', '').split(',') if '=' in pair)
+}
+
 # กำหนด timezone ไทย
 THAILAND_TZ = pytz.timezone('Asia/Bangkok')
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-
-@dataclass
-class Job:
-    id: str
-    name: str
-    prompt: str
-    schedule_time: str
-    status: str
-    created_at: str
-    last_run: Optional[str] = None
-    video_url: Optional[str] = None
-    tiktok_url: Optional[str] = None
-    error_message: Optional[str] = None
-
-# In-memory storage (ใช้ database จริงในการใช้งานจริง)
-jobs_storage = {}
-job_logs = []
+def configure_gemini():
+    """โหลด Gemini SDK และตั้งค่า (ครั้งแรกที่มีการเรียกใช้ใน process นี้)"""
+    import google.generativeai as genai
+    
+    if GEMINI_API_ENDPOINT:
+        genai.configure(api_key=GEMINI_API_KEY, transport='rest',
+                        client_options={'api_endpoint': GEMINI_API_ENDPOINT})
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
+    return genai
+
+# Gemini SDK โหลดช้าและกิน memory - process ที่ไม่ได้สร้างวิดีโอ (เว็บใน worker mode, CLI) จึงไม่ต้องโหลดเลย
+gemini_client = Lazy(configure_gemini, 'gemini')
+
+# Rate limit + retry + circuit breaker ต่อ API (ตั้งค่าผ่าน env เช่น GEMINI_RATE_PER_MIN, TIKTOK_RETRY_MAX_ATTEMPTS)
+gemini_guard = guard_from_env('gemini', 'GEMINI', default_rate_per_min=60, default_burst=5)
+tiktok_guard = guard_from_env('tiktok', 'TIKTOK', default_rate_per_min=6, default_burst=2)
+
+# Components ของ process (job store, caches, event bus, metrics, คิว + runner, scheduler) สร้างใน init_services()
+# ตอน create_app / worker.py เริ่มทำงาน - import module นี้จึงไม่เปิดไฟล์ / database และไม่สร้าง thread
+job_store = None
+log_sink = None
+account_pool = None
+tiktok_uploaders = {}
+artifact_store = None
+generation_cache = None
+event_bus = None
+fragment_cache = None
+metrics = None
+stage_duration = jobs_finished = scheduler_lag = None
+store_event_bridge = None  # worker mode: อ่านการเปลี่ยนแปลงจาก job store แทนการ publish เอง
+generation_batcher = None
+job_queue = None
+upload_dispatcher = None
+job_runner = None
+scheduler = None
+_services_ready = False
+_services_lock = threading.Lock()
+
+def save_job(job: Job):
+    """บันทึก job แล้วแจ้ง subscribers"""
+    job_store.save_job(job)
+    if store_event_bridge is None:
+        event_bus.publish('job', job_event_data(job, job_store), job_id=job.id)
 
 class VideoJobManager:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.model_name = 'gemini-1.5-pro'
+        self._model = Lazy(self._build_model, 'gemini_model')
+        self._spec_in_session = False  # model มี VEO_SPEC เป็น system instruction แล้ว - request ไม่ต้องแนบซ้ำ
         
         # 📅 ตารางเวลาอัปโหลดที่เหมาะสม (เวลาไทย)
         self.optimal_schedule = {
@@ -56,45 +164,10 @@ class VideoJobManager:
             'saturday': {'time': '17:30', 'range': '17:00-18:00'},   # วันเสาร์
             'sunday': {'time': '20:30', 'range': '20:00-21:00'}      # วันอาทิตย์
         }
+        self.weekly_schedule = WeeklySchedule(self.optimal_schedule, THAILAND_TZ)
         
         # ตัวอย่าง prompts ASMR ยอดนิยม (AUTO-GENERATED)
-        self.asmr_prompts = {
-            "glass_fruits": [
-                "A hyper-realistic cinematic close-up of a whole, full-shaped glass strawberry with a soft red translucent hue. The glass fruit is perfectly centred on a wooden cutting board, glowing subtly under studio lighting. A human hand is clearly visible, holding a sharp stainless steel knife just above the fruit, ready to slice. In slow motion, the knife makes clean slices through the glass fruit, creating delicate glass-crack sounds. Transparent shards scatter lightly. ASMR slicing sounds only.",
-                
-                "Ultra-realistic 4K footage of a translucent glass mango with golden-yellow tint being precisely sliced with a steel knife on a wooden cutting board. The mango has a glossy, semi-transparent surface with a visible frosted glass seed inside. Soft cinematic lighting highlights the glass textures. The knife moves smoothly and deliberately, making three clean cuts with crisp glass-shattering sounds. Each slice reveals the crystal-like interior.",
-                
-                "Close-up of a crystal-clear glass banana with pale yellow hue resting on a dark wooden surface. A chef's knife rapidly dices the glass fruit into perfect uniform cubes that scatter with each cut. The inside reveals glass segments and texture. Studio lighting creates subtle reflections. ASMR-style audio with only slicing sounds, no background music.",
-                
-                "Hyper-detailed glass watermelon with dark green exterior and red glass interior being chopped with a large cleaver. One powerful chop down the middle reveals the translucent red inside with black glass seeds. The two halves fall apart cleanly on a wooden table. Cinematic lighting with shallow depth of field.",
-                
-                "A transparent glass apple with light green tint being sliced into thin, even pieces. Each cut creates satisfying glass crack sounds as the knife glides through. The apple core is visible as frosted glass. Macro lens close-up with professional food photography lighting."
-            ],
-            
-            "creative_materials": [
-                "A glowing chunk of solid gold being sliced with a heated knife. Each cut creates sharp, crisp snapping sounds like breaking delicate shells. Golden shards scatter as the surface cracks cleanly, blending satisfying crunch with molten smoothness. Warm studio lighting enhances the golden glow.",
-                
-                "Crystal-clear ice blocks being precisely cut with a heated blade. Steam rises as the knife meets ice. Each slice produces crisp cracking sounds and the pieces slide apart with glassy precision. Water droplets catch the light as they scatter.",
-                
-                "A translucent soap bar made of rainbow colors being sliced into perfect cubes. The knife glides smoothly through the soft material, creating satisfying slicing sounds and revealing marbled patterns inside. Pieces fall away cleanly with slight bounce.",
-                
-                "A block of kinetic sand being cut with a thin wire. The sand parts smoothly creating perfect clean edges. Grains cascade gently as the wire passes through. Close-up macro shot showing individual sand particles falling.",
-                
-                "A honeycomb structure made of amber glass being carved with precision tools. Each hexagonal cell breaks with tiny crystalline sounds. Golden light passes through creating beautiful refractions."
-            ],
-            
-            "satisfying_textures": [
-                "Ultra-satisfying scene of vibrant pastel rainbow butter being gently spread across warm crispy toast. The knife glides smoothly, creating perfect ridges and swirls. Soft spreading sounds and gentle sizzling from the warm bread.",
-                
-                "Slicing through a perfect cube of jelly that wobbles hypnotically. The knife creates clean cuts revealing the translucent interior. Each piece jiggles independently as it separates. Subtle squelching sounds.",
-                
-                "Cutting through layers of colorful modeling clay stacked in a rainbow pattern. Each slice reveals all the color layers in cross-section. The knife moves smoothly through the soft material with satisfying resistance.",
-                
-                "Precise cuts through a sphere of magnetic putty that slowly reforms after each slice. The metallic gray material moves and flows like liquid metal. Subtle magnetic clicking sounds as particles realign.",
-                
-                "Slicing through foam blocks that compress and spring back. Each cut creates a satisfying 'whoosh' sound as air escapes. The foam texture is perfectly uniform and bouncy."
-            ]
-        }
+        self.asmr_prompts = ASMR_PROMPTS
         
         # Hashtags ยอดนิยมสำหรับ TikTok ASMR
         self.popular_hashtags = [
@@ -104,42 +177,69 @@ class VideoJobManager:
             '#viral', '#fyp', '#foryou', '#trending'
         ]
 
-    def get_next_optimal_time(self) -> dict:
-        """หาเวลาถัดไปที่เหมาะสมสำหรับอัปโหลด"""
-        thailand_now = datetime.now(THAILAND_TZ)
+        # ส่วนเสริมที่สุ่มต่อท้าย base prompt (ตารางอยู่ใน prompt_catalog)
+        self.enhancements = ENHANCEMENTS
+        self.camera_angles = CAMERA_ANGLES
+        self.sound_descriptions = SOUND_DESCRIPTIONS
         
-        # วันในสัปดาห์ (0=จันทร์, 6=อาทิตย์)
-        weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        
-        for days_ahead in range(7):  # ตรวจสอบ 7 วันข้างหน้า
-            target_date = thailand_now + timedelta(days=days_ahead)
-            weekday = weekdays[target_date.weekday()]
-            
-            optimal_time = self.optimal_schedule[weekday]['time']
-            target_time = datetime.strptime(f"{target_date.strftime('%Y-%m-%d')} {optimal_time}", 
-                                          '%Y-%m-%d %H:%M')
-            target_time = THAILAND_TZ.localize(target_time)
-            
-            # ถ้าเวลานั้นยังไม่ถึง หรือ ถ้าเป็นวันถัดไป
-            if target_time > thailand_now or days_ahead > 0:
-                return {
-                    'datetime': target_time,
-                    'weekday': weekday,
-                    'time_range': self.optimal_schedule[weekday]['range'],
-                    'thai_weekday': self.get_thai_weekday(weekday)
-                }
-        
-        # fallback: วันจันทร์หน้า
-        next_monday = thailand_now + timedelta(days=7-thailand_now.weekday())
-        target_time = datetime.strptime(f"{next_monday.strftime('%Y-%m-%d')} 19:30", '%Y-%m-%d %H:%M')
-        target_time = THAILAND_TZ.localize(target_time)
+        self.captions = [
+            "✨ Oddly satisfying ASMR moment ✨",
+            "🔪 Glass cutting therapy 🔪", 
+            "💎 Crystal clear relaxation 💎",
+            "🧘‍♀️ ASMR vibes only 🧘‍♀️",
+            "⚡ Satisfying slice sounds ⚡",
+            "🎯 Perfect cuts every time 🎯",
+            "🌟 AI-generated satisfaction 🌟",
+            "💫 Mesmerizing ASMR content 💫"
+        ]
         
-        return {
-            'datetime': target_time,
-            'weekday': 'monday',
-            'time_range': '19:00-20:00',
-            'thai_weekday': 'วันจันทร์'
-        }
+        # สุ่มแบบไม่ซ้ำ: ทุกชุด (หมวด x base prompt x ส่วนเสริม) ไม่ออกซ้ำภายใน PROMPT_HISTORY_WINDOW ครั้งล่าสุด
+        # (สร้างเมื่อสุ่มครั้งแรก - ต้องอ่านประวัติจาก disk)
+        self._prompt_sampler = Lazy(lambda: PromptSampler(
+            self.asmr_prompts,
+            [self.enhancements, self.camera_angles, self.sound_descriptions],
+            weights=PROMPT_CATEGORY_WEIGHTS,
+            window=PROMPT_HISTORY_WINDOW,
+            history_path=PROMPT_HISTORY_PATH or None
+        ), 'prompt_sampler')
+        self.caption_sampler = CyclingChoice(self.captions)
+
+    @property
+    def model(self):
+        """Gemini model ของ process นี้ (โหลด SDK เมื่อใช้ครั้งแรก)"""
+        return self._model.get()
+    
+    @model.setter
+    def model(self, model):
+        self._model.set(model)
+        self._spec_in_session = False  # model ที่ส่งมาเอง (เช่น fake ของ benchmark) ไม่รู้จัก spec
+
+    def _build_model(self):
+        """ส่ง spec ทางเทคนิคครั้งเดียวเป็น system instruction ถ้า SDK รองรับ (google-generativeai 0.3.2 ยังไม่มี)"""
+        genai = gemini_client.get()
+        self._spec_in_session = 'system_instruction' in inspect.signature(genai.GenerativeModel).parameters
+        if self._spec_in_session:
+            return genai.GenerativeModel(self.model_name, system_instruction=VEO_SPEC.text)
+        return genai.GenerativeModel(self.model_name)
+
+    def spec_in_session(self) -> bool:
+        self._model.get()  # สร้าง model ก่อน - ค่านี้รู้หลังตรวจ SDK
+        return self._spec_in_session
+    
+    @property
+    def prompt_sampler(self) -> PromptSampler:
+        return self._prompt_sampler.get()
+    
+    def prewarm(self):
+        """สร้าง clients ล่วงหน้า (Gemini SDK + model, prompt sampler) ให้ job แรกไม่ต้องรอ"""
+        self.model
+        self.prompt_sampler
+
+    def get_next_optimal_time(self) -> dict:
+        """หาเวลาถัดไปที่เหมาะสมสำหรับอัปโหลด"""
+        next_slot = self.weekly_schedule.next_slot(datetime.now(THAILAND_TZ))
+        next_slot['thai_weekday'] = self.get_thai_weekday(next_slot['weekday'])
+        return next_slot
     
     def get_thai_weekday(self, weekday: str) -> str:
         """แปลงชื่อวันเป็นภาษาไทย"""
@@ -158,7 +258,7 @@ class VideoJobManager:
         """สร้าง Auto Job สำหรับวันถัดไป"""
         next_time = self.get_next_optimal_time()
         
-        job_id = f"daily_auto_{int(time.time())}"
+        job_id = new_id()
         job = Job(
             id=job_id,
             name=f"Auto ASMR - {next_time['thai_weekday']}",
@@ -171,129 +271,227 @@ class VideoJobManager:
         return job, next_time
     
     def generate_random_asmr_prompt(self) -> str:
-        """สุ่ม prompt ASMR แบบอัตโนมัติ"""
-        import random
-        
-        # สุ่มหมวดหมู่
-        category = random.choice(list(self.asmr_prompts.keys()))
-        base_prompt = random.choice(self.asmr_prompts[category])
-        
-        # เพิ่มการปรับแต่งสุ่ม
-        enhancements = [
-            "Ultra-sharp macro lens, shallow depth of field",
-            "Cinematic lighting with soft shadows", 
-            "Professional studio lighting setup",
-            "Natural daylight with warm tones",
-            "Moody dramatic lighting"
-        ]
-        
-        camera_angles = [
-            "Extreme close-up from directly above",
-            "45-degree angle perspective", 
-            "Side view macro shot",
-            "Slightly elevated bird's eye view"
-        ]
-        
-        sound_descriptions = [
-            "ASMR-quality audio with crisp, clear sounds",
-            "High-fidelity slicing sounds only, no background noise",
-            "Satisfying cutting sounds with natural acoustics", 
-            "Crystal-clear audio capturing every detail"
-        ]
-        
-        # สุ่มเลือกส่วนประกอบ
-        enhancement = random.choice(enhancements)
-        angle = random.choice(camera_angles)
-        sound = random.choice(sound_descriptions)
-        
-        # รวม prompt สุ่ม
-        final_prompt = f"{base_prompt} {enhancement}. {angle}. {sound}. Optimized for TikTok vertical format 9:16, 8-15 seconds duration."
-        
-        return final_prompt
+        """สุ่ม prompt ASMR แบบอัตโนมัติ (ไม่ซ้ำกับ prompts ล่าสุดใน window ของ prompt_sampler)
+
+        คืน key ของชุดที่สุ่มได้ - job เก็บแค่ key นี้ ข้อความเต็มสร้างจาก prompt_catalog เมื่อใช้ (job.prompt_text)
+        """
+        return self.prompt_sampler.draw()['key']
     
     def generate_random_caption(self, prompt_used: str) -> str:
         """สร้าง caption สำหรับ TikTok แบบอัตโนมัติ"""
-        import random
-        
-        captions = [
-            "✨ Oddly satisfying ASMR moment ✨",
-            "🔪 Glass cutting therapy 🔪", 
-            "💎 Crystal clear relaxation 💎",
-            "🧘‍♀️ ASMR vibes only 🧘‍♀️",
-            "⚡ Satisfying slice sounds ⚡",
-            "🎯 Perfect cuts every time 🎯",
-            "🌟 AI-generated satisfaction 🌟",
-            "💫 Mesmerizing ASMR content 💫"
-        ]
-        
         # สุ่ม hashtags (5-8 tags)
         selected_hashtags = random.sample(self.popular_hashtags, random.randint(5, 8))
         hashtag_string = ' '.join(selected_hashtags)
         
-        caption = random.choice(captions)
+        # วนครบทุก caption ก่อนจะซ้ำ
+        caption = self.caption_sampler.choice()
         
         return f"{caption}\n\n{hashtag_string}"
     
-    def generate_video_with_gemini(self, prompt: str) -> Dict:
+    def optimize_prompt_for_veo(self, prompt: str) -> str:
+        """ปรับ prompt ให้เหมาะกับ Veo 3 (ข้อความเต็มพร้อม spec - ใช้เป็น cache key ไม่ว่า spec จะส่งทางไหน)"""
+        return render_scene(prompt)
+    
+    def scene_request(self, prompt: str) -> str:
+        """ข้อความที่ส่งให้ Gemini จริง: ไม่แนบ spec ถ้า model ได้ไปเป็น system instruction แล้ว"""
+        return render_scene(prompt, include_spec=not self.spec_in_session())
+    
+    def build_batch_prompt(self, prompts: List[str]) -> str:
+        """รวมหลาย prompts ไว้ใน request เดียว (spec ทางเทคนิคใส่ครั้งเดียว) ขอผลเป็น JSON array ตามลำดับ"""
+        return render_batch(prompts, include_spec=not self.spec_in_session())
+    
+    def split_batch_response(self, response, count: int) -> List[Optional[str]]:
+        """แยกผลของ batch ตามลำดับ prompt: None = สำเร็จ, ข้อความ = error ของ prompt นั้น"""
+        errors = [None] * count
+        try:
+            text = response.text.strip().strip('`')
+            items = json.loads(text[text.index('['):])
+        except Exception:
+            return errors  # ไม่มีผลแยกรายการ - ถือว่าสำเร็จทั้ง batch
+        seen = set()
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and isinstance(item.get('index'), int) and 1 <= item['index'] <= count:
+                seen.add(item['index'])
+                if item.get('error'):
+                    errors[item['index'] - 1] = str(item['error'])
+        for index in range(1, count + 1):
+            if index not in seen:
+                errors[index - 1] = 'ไม่พบผลลัพธ์ของ prompt นี้ใน batch response'
+        return errors
+    
+    def build_video_data(self, response) -> Dict:
+        """แปลงผลลัพธ์จาก Gemini เป็นข้อมูลวิดีโอ"""
+        # จำลองการสร้างวิดีโอ (ในความเป็นจริงจะเชื่อมต่อ Veo 3 API)
+        return {
+            'video_url': f'https://storage.googleapis.com/asmr_videos/video_{int(time.time())}.mp4',
+            'duration': random.randint(8, 15),
+            'format': 'mp4',
+            'resolution': '1080x1920',
+            'audio_included': True,
+            'generated_at': datetime.now().isoformat()
+        }
+    
+    def retry_logger(self, job_id: Optional[str], api_name: str):
+        """callback สำหรับ log การลองใหม่ของ API ลงใน job"""
+        if not job_id:
+            return None
+        
+        def on_retry(attempt: int, delay: float, error: Exception):
+            self.log_job_activity(job_id, f'🔁 {api_name} ผิดพลาดชั่วคราว ({error}) - ลองใหม่ครั้งที่ {attempt + 1} ในอีก {delay:.1f}s', 'error')
+        
+        return on_retry
+    
+    def generation_params(self) -> Dict:
+        """parameters ที่มีผลต่อวิดีโอที่ได้ (เป็นส่วนหนึ่งของ cache key)"""
+        return {'model': self.model_name, 'resolution': '1080x1920', 'duration': '8-15', 'fps': 30,
+                'templates': templates_fingerprint()}
+    
+    def generate_video_with_gemini(self, prompt: str, job_id: Optional[str] = None,
+                                   use_cache: bool = True) -> Dict:
         """สร้างวิดีโอด้วย Gemini + Veo 3"""
         try:
-            # ปรับ prompt ให้เหมาะกับ Veo 3
-            optimized_prompt = f"""
-            Create a hyper-realistic ASMR video using Veo 3 technology:
-            
-            {prompt}
-            
-            Technical specifications:
-            - Resolution: 1080x1920 (9:16 vertical for TikTok)
-            - Duration: 8-15 seconds
-            - Frame rate: 30 FPS
-            - Audio: High-quality ASMR sounds synchronized with visuals
-            - Style: Professional food photography lighting
-            - Focus: Macro lens with shallow depth of field
-            - Background: Minimal, clean wooden surface
-            - Sound design: Only cutting/slicing sounds, no music
-            """
+            optimized_prompt = self.optimize_prompt_for_veo(prompt)
+            cache_key = generation_cache.key_for(optimized_prompt, self.generation_params())
+            if use_cache:
+                cached = generation_cache.get(cache_key)
+                if cached:
+                    return {'success': True, 'data': cached, 'cached': True}
             
             # สร้างวิดีโอด้วย Gemini (จำลอง Veo 3 integration)
-            response = self.model.generate_content(optimized_prompt)
+            request_text = self.scene_request(prompt)
+            response = gemini_guard.call(lambda: self.model.generate_content(request_text),
+                                         on_retry=self.retry_logger(job_id, 'Gemini'))
+            video_data = self.build_video_data(response)
+            generation_cache.put(cache_key, video_data)
+            return {'success': True, 'data': video_data}
             
-            # จำลองการสร้างวิดีโอ (ในความเป็นจริงจะเชื่อมต่อ Veo 3 API)
-            video_data = {
-                'video_url': f'https://storage.googleapis.com/asmr_videos/video_{int(time.time())}.mp4',
-                'duration': random.randint(8, 15),
-                'format': 'mp4',
-                'resolution': '1080x1920',
-                'audio_included': True,
-                'generated_at': datetime.now().isoformat()
-            }
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def generate_videos_batch(self, requests_: List[Dict]) -> List[Dict]:
+        """สร้างวิดีโอหลายรายการด้วย Gemini request เดียว (requests_: [{'prompt', 'job_id', 'use_cache'}])
+
+        รายการที่มีใน cache ไม่ถูกส่งไป และ prompt ซ้ำกันใน batch ใช้ผลเดียวกัน
+        """
+        results: List[Optional[Dict]] = [None] * len(requests_)
+        keys = [generation_cache.key_for(self.optimize_prompt_for_veo(item['prompt']), self.generation_params())
+                for item in requests_]
+        misses: Dict[str, List[int]] = {}  # cache key -> ตำแหน่งใน requests_
+        for position, (item, key) in enumerate(zip(requests_, keys)):
+            cached = generation_cache.get(key) if item.get('use_cache', True) else None
+            if cached:
+                results[position] = {'success': True, 'data': cached, 'cached': True}
+            else:
+                misses.setdefault(key, []).append(position)
+        if not misses:
+            return results
+        
+        prompts = [requests_[positions[0]]['prompt'] for positions in misses.values()]
+        job_ids = [requests_[position].get('job_id') for positions in misses.values() for position in positions]
+        retry_loggers = [logger for logger in (self.retry_logger(job_id, 'Gemini') for job_id in job_ids) if logger]
+        
+        def on_retry(attempt: int, delay: float, error: Exception):
+            for logger in retry_loggers:
+                logger(attempt, delay, error)
+        
+        try:
+            batch_prompt = self.build_batch_prompt(prompts)
+            response = gemini_guard.call(lambda: self.model.generate_content(batch_prompt), on_retry=on_retry)
+            errors = self.split_batch_response(response, len(prompts))
+        except Exception as e:
+            errors, response = [str(e)] * len(prompts), None
+        
+        for (key, positions), error in zip(misses.items(), errors):
+            if error:
+                result = {'success': False, 'error': error}
+            else:
+                video_data = self.build_video_data(response)
+                generation_cache.put(key, video_data)
+                result = {'success': True, 'data': video_data}
+            for position in positions:
+                results[position] = result
+        return results
+    
+    def generate_video_batched(self, prompt: str, job_id: Optional[str] = None,
+                               use_cache: bool = True) -> Dict:
+        """ส่ง prompt เข้า micro-batch แล้วรอผลของ job นี้ (ใช้เมื่อเปิด GENERATION_BATCH_SIZE > 1)"""
+        future = generation_batcher.submit({'prompt': prompt, 'job_id': job_id, 'use_cache': use_cache})
+        try:
+            return future.result()
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    async def generate_video_async(self, prompt: str, job_id: Optional[str] = None,
+                                   use_cache: bool = True) -> Dict:
+        """stage generation ของ async mode: ใช้ micro-batch ถ้าเปิดไว้ ไม่งั้นเรียก Gemini แบบ async ตรงๆ"""
+        if generation_batcher is None:
+            return await self.generate_video_with_gemini_async(prompt, job_id, use_cache)
+        future = generation_batcher.submit({'prompt': prompt, 'job_id': job_id, 'use_cache': use_cache})
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    async def generate_video_with_gemini_async(self, prompt: str, job_id: Optional[str] = None,
+                                               use_cache: bool = True) -> Dict:
+        """สร้างวิดีโอด้วย Gemini + Veo 3 (เวอร์ชัน asyncio)"""
+        try:
+            optimized_prompt = self.optimize_prompt_for_veo(prompt)
+            cache_key = generation_cache.key_for(optimized_prompt, self.generation_params())
+            if use_cache:
+                cached = await asyncio.to_thread(generation_cache.get, cache_key)  # อ่านไฟล์ cache นอก event loop
+                if cached:
+                    return {'success': True, 'data': cached, 'cached': True}
             
+            request_text = self.scene_request(prompt)
+            response = await gemini_guard.call_async(lambda: self.model.generate_content_async(request_text),
+                                                     on_retry=self.retry_logger(job_id, 'Gemini'))
+            video_data = self.build_video_data(response)
+            await asyncio.to_thread(generation_cache.put, cache_key, video_data)
             return {'success': True, 'data': video_data}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def upload_to_tiktok(self, video_url: str, caption: str) -> Dict:
+    def build_tiktok_post_info(self, caption: str) -> Dict:
+        """ข้อมูลโพสต์สำหรับ TikTok Content Posting API"""
+        return {
+            'title': caption,
+            'privacy_level': 'PUBLIC_TO_EVERYONE',
+            'disable_duet': False,
+            'disable_comment': False,
+            'disable_stitch': False,
+            'brand_content_toggle': False
+        }
+    
+    def account_for(self, job: Job) -> Account:
+        """บัญชีที่ job จะโพสต์ (ไม่ระบุ = บัญชีหลัก)"""
+        return account_pool.get(job.account)
+    
+    def post_to_tiktok(self, upload_payload: Dict, account: Optional[Account] = None) -> Dict:
+        """ส่งโพสต์ไป TikTok"""
+        # จำลอง TikTok API upload
+        # ในความเป็นจริงจะใช้ TikTok Content Posting API (Authorization: Bearer ของบัญชีนั้น)
+        username = account.username if account else TIKTOK_USERNAME
+        return {
+            'publish_id': f'tiktok_{int(time.time())}',
+            'share_url': f'https://vm.tiktok.com/{random.randint(100000000, 999999999)}',
+            'embed_url': f'https://www.tiktok.com/@{username}/video/{random.randint(7000000000000000000, 7999999999999999999)}',
+            'status': 'PUBLISHED'
+        }
+    
+    def upload_to_tiktok(self, video_url: str, caption: str, job_id: Optional[str] = None,
+                         account: Optional[Account] = None) -> Dict:
         """อัปโหลดวิดีโอไป TikTok พร้อม auto-caption"""
         try:
             # ข้อมูลสำหรับ TikTok API
             upload_payload = {
-                'video_url': video_url,
-                'text': caption,
-                'privacy_level': 'PUBLIC_TO_EVERYONE',
-                'disable_duet': False,
-                'disable_comment': False,
-                'disable_stitch': False,
-                'brand_content_toggle': False
+                'post_info': self.build_tiktok_post_info(caption),
+                'source_info': {'source': 'PULL_FROM_URL', 'video_url': video_url}
             }
             
-            # จำลอง TikTok API upload
-            # ในความเป็นจริงจะใช้ TikTok Content Posting API
-            tiktok_response = {
-                'publish_id': f'tiktok_{int(time.time())}',
-                'share_url': f'https://vm.tiktok.com/{random.randint(100000000, 999999999)}',
-                'embed_url': f'https://www.tiktok.com/@autoasmr/video/{random.randint(7000000000000000000, 7999999999999999999)}',
-                'status': 'PUBLISHED'
-            }
+            tiktok_response = tiktok_guard.call(lambda: self.post_to_tiktok(upload_payload, account),
+                                                on_retry=self.retry_logger(job_id, 'TikTok'))
             
             return {
                 'success': True, 
@@ -305,68 +503,224 @@ class VideoJobManager:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def execute_job(self, job: Job):
-        """ดำเนินการ job แบบ FULL AUTO"""
+    def local_video_path(self, job: Job) -> Optional[str]:
+        """ไฟล์วิดีโอในเครื่อง (artifact store ก่อน แล้วจึง video_data['file_path']) - None ถ้ามีแค่ URL"""
+        data = job.video_data or {}
+        path = artifact_store.path_for(data.get('video_artifact')) or data.get('file_path')
+        return path if path and os.path.exists(path) else None
+    
+    def store_artifacts(self, job: Job):
+        """เก็บวิดีโอ / thumbnail ของ job เข้า artifact store แล้ว pin ไว้จนกว่า job จะออกจาก pipeline"""
+        data = job.video_data
+        for kind, path_field, url_field in (('video', 'file_path', 'video_url'),
+                                            ('thumbnail', 'thumbnail_path', 'thumbnail_url')):
+            digest = data.get(f'{kind}_artifact')
+            if digest and digest in artifact_store:
+                artifact_store.pin(digest, job.id)
+                continue
+            try:
+                if data.get(path_field) and os.path.exists(data[path_field]):
+                    stored = artifact_store.put_path(data[path_field], owner=job.id)
+                elif ARTIFACT_FETCH_REMOTE and data.get(url_field):
+                    stored = artifact_store.put_url(data[url_field], owner=job.id)
+                else:
+                    continue
+            except Exception as e:
+                self.log_job_activity(job.id, f'⚠️ เก็บ {kind} ไว้ในเครื่องไม่ได้: {e}', 'warning')
+                continue
+            data[f'{kind}_artifact'] = stored['digest']
+            self.log_job_activity(job.id, f'📦 เก็บ {kind} ไว้ในเครื่องแล้ว ({stored["size"] / 1024 / 1024:.1f} MB)', 'info')
+    
+    def upload_file_to_tiktok(self, job: Job) -> Dict:
+        """อัปโหลดไฟล์วิดีโอแบบ FILE_UPLOAD ทีละ chunk (รันต่อจาก chunk ล่าสุดที่ TikTok ตอบรับได้)"""
+        path = self.local_video_path(job)
+        account = self.account_for(job)
+        uploader = tiktok_uploaders[account.name]
+        if job.upload_progress and job.upload_progress.get('acked'):
+            self.log_job_activity(job.id, f'♻️ อัปโหลดต่อจาก chunk ที่ส่งแล้ว {len(job.upload_progress["acked"])} ชิ้น', 'info')
+        
+        def on_progress(state: Dict):
+            job.upload_progress = state
+            job.publish_id = state['publish_id']
+            save_job(job)  # checkpoint: chunks ที่ส่งสำเร็จ
+        
         try:
-            # อัปเดทสถานะ
-            job.status = 'running'
-            job.last_run = datetime.now().isoformat()
-            
-            # Log การเริ่มงาน
-            self.log_job_activity(job.id, '🤖 เริ่ม AUTO-JOB: กำลังสุ่ม prompt ASMR...', 'info')
-            
-            # 1. สุ่ม prompt ASMR แบบอัตโนมัติ (ถ้าไม่มี prompt หรือเป็น auto mode)
-            if not job.prompt or job.prompt.lower() == 'auto':
-                auto_prompt = self.generate_random_asmr_prompt()
-                job.prompt = auto_prompt
-                self.log_job_activity(job.id, f'✨ สุ่ม prompt สำเร็จ: {auto_prompt[:100]}...', 'success')
-            
-            # 2. สร้างวิดีโอด้วย Gemini + Veo 3
-            self.log_job_activity(job.id, '🎬 กำลังสร้างวิดีโอ ASMR ด้วย AI...', 'info')
-            
-            video_result = self.generate_video_with_gemini(job.prompt)
-            
-            if not video_result['success']:
-                job.status = 'failed'
-                job.error_message = video_result['error']
-                self.log_job_activity(job.id, f'❌ ล้มเหลวในการสร้างวิดีโอ: {video_result["error"]}', 'error')
-                return
-            
-            job.video_url = video_result['data']['video_url']
-            video_duration = video_result['data']['duration']
-            self.log_job_activity(job.id, f'✅ สร้างวิดีโอสำเร็จ ({video_duration}s) - มีเสียง ASMR', 'success')
-            
-            # 3. สร้าง caption อัตโนมัติ
-            self.log_job_activity(job.id, '📝 กำลังสร้าง caption และ hashtags...', 'info')
-            auto_caption = self.generate_random_caption(job.prompt)
-            self.log_job_activity(job.id, f'✨ Caption: {auto_caption[:50]}...', 'success')
-            
-            # 4. อัปโหลดไป TikTok
-            self.log_job_activity(job.id, '📱 กำลังอัปโหลดไป TikTok...', 'info')
-            
-            upload_result = self.upload_to_tiktok(job.video_url, auto_caption)
-            
-            if not upload_result['success']:
-                job.status = 'partial_success'  # วิดีโอสร้างได้แต่อัปโหลดไม่ได้
-                job.error_message = upload_result['error']
-                self.log_job_activity(job.id, f'⚠️ ล้มเหลวในการอัปโหลด: {upload_result["error"]}', 'error')
-                return
-            
-            job.tiktok_url = upload_result['tiktok_url']
-            job.status = 'completed'
-            job.error_message = None
-            
-            # 5. สรุปผลลัพธ์
-            self.log_job_activity(job.id, f'🎉 สำเร็จ! TikTok URL: {upload_result["tiktok_url"]}', 'success')
-            self.log_job_activity(job.id, '🚀 AUTO-JOB เสร็จสมบูรณ์ - พร้อมไวรัล!', 'success')
-            
-            # 6. เพิ่มข้อมูลสถิติ
-            self.log_job_activity(job.id, f'📊 ข้อมูล: ระยะเวลา {video_duration}s | ASMR Audio ✅ | คุณภาพ HD', 'info')
-            
+            state = uploader.upload_file(path, self.build_tiktok_post_info(job.caption),
+                                         state=job.upload_progress, on_progress=on_progress,
+                                         on_retry=self.retry_logger(job.id, 'TikTok'))
+            post_id = uploader.wait_published(state['publish_id'])
+            tiktok_url = f'https://www.tiktok.com/@{account.username}/video/{post_id}' if post_id else None
+            return {
+                'success': True,
+                'tiktok_url': tiktok_url,
+                'embed_url': tiktok_url,
+                'publish_id': state['publish_id']
+            }
+        except PublishFailedError as e:
+            job.upload_progress = None  # โพสต์นี้ใช้ไม่ได้แล้ว ครั้งหน้าต้อง init ใหม่
+            job.publish_id = None
+            return {'success': False, 'error': str(e)}
         except Exception as e:
+            return {'success': False, 'error': str(e), 'publish_id': job.publish_id}
+    
+    # ===== ขั้นตอนของ pipeline (แต่ละ stage คืน True = ส่งต่อ stage ถัดไป) =====
+    
+    def stage_generate(self, job: Job, ctx: Dict) -> bool:
+        """Stage 1: สุ่ม prompt + สร้างวิดีโอด้วย Gemini + Veo 3"""
+        if not self.begin_generation(job):
+            return True
+        if generation_batcher is not None:
+            video_result = self.generate_video_batched(job.prompt_text, job.id, job.use_cache)
+        else:
+            video_result = self.generate_video_with_gemini(job.prompt_text, job.id, job.use_cache)
+        return self.complete_generation(job, ctx, video_result)
+    
+    def begin_generation(self, job: Job) -> bool:
+        """เริ่ม job: อัปเดทสถานะและสุ่ม prompt - คืน False ถ้ามีวิดีโอจาก checkpoint แล้ว (ไม่ต้องเรียก Gemini)"""
+        # อัปเดทสถานะ
+        job.status = 'running'
+        job.last_run = datetime.now().isoformat()
+        save_job(job)
+        
+        # Log การเริ่มงาน
+        if job.video_data:
+            self.log_job_activity(job.id, '♻️ รันต่อจาก checkpoint: ข้ามการสร้างวิดีโอ (สร้างไว้แล้ว)', 'info')
+            self.store_artifacts(job)  # pin ไฟล์เดิมไว้ระหว่างรันต่อ
+            return False
+        self.log_job_activity(job.id, '🤖 เริ่ม AUTO-JOB: กำลังสุ่ม prompt ASMR...', 'info')
+        
+        # 1. สุ่ม prompt ASMR แบบอัตโนมัติ (ถ้าไม่มี prompt หรือเป็น auto mode)
+        if not job.prompt_key and (not job.prompt or job.prompt.lower() == 'auto'):
+            job.prompt = 'auto'
+            job.prompt_key = self.generate_random_asmr_prompt()
+            save_job(job)  # checkpoint: prompt ที่สุ่มได้
+            self.log_job_activity(job.id, f'✨ สุ่ม prompt สำเร็จ: {job.prompt_text[:100]}...', 'success')
+        
+        # 2. สร้างวิดีโอด้วย Gemini + Veo 3
+        self.log_job_activity(job.id, '🎬 กำลังสร้างวิดีโอ ASMR ด้วย AI...', 'info')
+        return True
+    
+    def complete_generation(self, job: Job, ctx: Dict, video_result: Dict) -> bool:
+        """บันทึกผลการสร้างวิดีโอ คืน True ถ้าไปต่อได้"""
+        if not video_result['success']:
             job.status = 'failed'
-            job.error_message = str(e)
-            self.log_job_activity(job.id, f'💥 เกิดข้อผิดพลาดร้ายแรง: {str(e)}', 'error')
+            job.error_message = video_result['error']
+            self.log_job_activity(job.id, f'❌ ล้มเหลวในการสร้างวิดีโอ: {video_result["error"]}', 'error')
+            return False
+        
+        if video_result.get('cached'):
+            self.log_job_activity(job.id, '💾 พบวิดีโอจาก prompt เดียวกันใน cache - ไม่ต้องสร้างใหม่', 'success')
+        
+        # checkpoint: ข้อมูลวิดีโอ
+        job.video_data = dict(video_result['data'])
+        job.video_url = job.video_data['video_url']
+        self.store_artifacts(job)
+        self.log_job_activity(job.id, f'✅ สร้างวิดีโอสำเร็จ ({job.video_data["duration"]}s) - มีเสียง ASMR', 'success')
+        save_job(job)
+        return True
+    
+    def stage_caption(self, job: Job, ctx: Dict) -> bool:
+        """Stage 2: สร้าง caption อัตโนมัติ"""
+        if job.caption:
+            self.log_job_activity(job.id, '♻️ ใช้ caption เดิมจาก checkpoint', 'info')
+            return True
+        
+        self.log_job_activity(job.id, '📝 กำลังสร้าง caption และ hashtags...', 'info')
+        job.caption = self.generate_random_caption(job.prompt_text)
+        save_job(job)  # checkpoint: caption
+        self.log_job_activity(job.id, f'✨ Caption: {job.caption[:50]}...', 'success')
+        return True
+    
+    def stage_upload(self, job: Job, ctx: Dict) -> bool:
+        """Stage 3: อัปโหลดไป TikTok และสรุปผล"""
+        self.log_job_activity(job.id, '📱 กำลังอัปโหลดไป TikTok...', 'info')
+        if self.local_video_path(job):
+            upload_result = self.upload_file_to_tiktok(job)
+        else:
+            upload_result = self.upload_to_tiktok(job.video_url, job.caption, job.id, self.account_for(job))
+        return self.complete_upload(job, ctx, upload_result)
+    
+    def complete_upload(self, job: Job, ctx: Dict, upload_result: Dict) -> bool:
+        """บันทึกผลการอัปโหลดและสรุปผล job"""
+        # checkpoint: publish_id (ถ้า TikTok รับงานแล้วแต่ยังไม่เผยแพร่ จะได้ไม่โพสต์ซ้ำ)
+        job.publish_id = upload_result.get('publish_id') or job.publish_id
+        quota = account_pool.quota(job.account)
+        
+        if not upload_result['success']:
+            if is_throttled(RuntimeError(upload_result['error'])):
+                quota.on_throttled()  # บัญชีนี้โดน rate limit - ลดอัตราโพสต์ของบัญชีนี้เท่านั้น
+            job.status = 'partial_success'  # วิดีโอสร้างได้แต่อัปโหลดไม่ได้
+            job.error_message = upload_result['error']
+            self.log_job_activity(job.id, f'⚠️ ล้มเหลวในการอัปโหลด: {upload_result["error"]}', 'error')
+            return False
+        
+        quota.on_success()
+        job.tiktok_url = upload_result['tiktok_url']
+        job.status = 'completed'
+        job.error_message = None
+        
+        # สรุปผลลัพธ์
+        self.log_job_activity(job.id, f'🎉 สำเร็จ! TikTok URL: {upload_result["tiktok_url"]}', 'success')
+        self.log_job_activity(job.id, '🚀 AUTO-JOB เสร็จสมบูรณ์ - พร้อมไวรัล!', 'success')
+        
+        # เพิ่มข้อมูลสถิติ
+        self.log_job_activity(job.id, f'📊 ข้อมูล: ระยะเวลา {job.video_data["duration"]}s | ASMR Audio ✅ | คุณภาพ HD', 'info')
+        return True
+    
+    def handle_stage_error(self, job: Job, error: Exception):
+        """จัดการ exception ที่หลุดออกมาจาก stage ใดๆ"""
+        job.status = 'failed'
+        job.error_message = str(error)
+        self.log_job_activity(job.id, f'💥 เกิดข้อผิดพลาดร้ายแรง: {str(error)}', 'error')
+    
+    def finish_job(self, job: Job, ctx: Dict):
+        """เรียกเมื่อ job ออกจาก pipeline - บันทึกผลลัพธ์สุดท้ายลง storage"""
+        posted_at = ctx.pop('post_reserved', None)
+        if posted_at is not None and job.status != 'completed' and not job.publish_id:
+            # จองโควตาตอนออกจากคิวหน้า upload แต่ไม่ได้โพสต์ (TikTok ไม่รับงาน) - คืนให้บัญชี
+            account_pool.quota(job.account).release(posted_at)
+        save_job(job)
+        if ctx.get('upload_deferred'):
+            return  # ยังไม่จบ - รออัปโหลดเมื่อบัญชีมีโควตา (ไฟล์ยัง pin อยู่)
+        jobs_finished.inc(status=job.status)
+        artifact_store.unpin(job.id)  # ไฟล์ยังอยู่ใน store จนกว่าจะถูก evict ตาม LRU
+    
+    def pipeline_stages(self) -> List:
+        """ลำดับ stage ของ job: (ชื่อ, handler ที่จับเวลาไว้แล้ว)"""
+        stages = [
+            ('generation', self.stage_generate),
+            ('caption', self.stage_caption),
+            ('upload', self.stage_upload)
+        ]
+        return [(name, self.timed_stage(name, handler)) for name, handler in stages]
+    
+    def observe_stage(self, stage: str, seconds: float, outcome: str):
+        """บันทึกเวลาของ stage (outcome: passed / stopped / error)"""
+        stage_duration.observe(seconds, stage=stage, outcome=outcome)
+    
+    def timed_stage(self, name: str, handler):
+        def run(job: Job, ctx: Dict) -> bool:
+            started = time.monotonic()
+            outcome = 'error'
+            try:
+                passed = handler(job, ctx)
+                outcome = 'passed' if passed else 'stopped'
+                return passed
+            finally:
+                self.observe_stage(name, time.monotonic() - started, outcome)
+        return run
+    
+    def execute_job(self, job: Job):
+        """ดำเนินการ job แบบ FULL AUTO (รันทุก stage ต่อกันใน thread ปัจจุบัน)"""
+        ctx = {}
+        try:
+            for _, handler in self.pipeline_stages():
+                if not handler(job, ctx):
+                    break
+        except Exception as e:
+            self.handle_stage_error(job, e)
+        finally:
+            self.finish_job(job, ctx)
     
     def log_job_activity(self, job_id: str, message: str, level: str):
         """บันทึก log กิจกรรม"""
@@ -376,80 +730,283 @@ class VideoJobManager:
             'message': message,
             'level': level
         }
-        job_logs.append(log_entry)
-        
-        # เก็บแค่ 1000 entries ล่าสุด
-        if len(job_logs) > 1000:
-            job_logs.pop(0)
+        job_store.append_log(log_entry)
+        if log_sink is not None:
+            log_sink.write(log_entry)
+        if store_event_bridge is None:
+            event_bus.publish('log', log_entry, job_id=job_id)
 
 # สร้าง instance
 video_manager = VideoJobManager()
 
-def schedule_daily_jobs():
-    """ตั้งค่า scheduler สำหรับวันละ 1 คลิป"""
-    
-    def create_and_run_daily_job():
-        """สร้างและรัน job รายวัน"""
+def defer_upload(item, wait: float):
+    """บัญชีของ job ต้องรอโควตานานเกิน UPLOAD_QUOTA_MAX_WAIT: เลื่อนการอัปโหลดไปแทนการยึดที่ในคิว"""
+    job, ctx = item[0], item[1]
+    ctx['upload_deferred'] = True
+    resume_at = datetime.now(THAILAND_TZ) + timedelta(seconds=wait)
+    job.status = 'scheduled'
+    job.upload_resume_at = resume_at.isoformat()  # เก็บไว้ใน job store: rebuild_schedule ตั้งเวลาใหม่ได้หลัง restart
+    save_job(job)
+    video_manager.log_job_activity(job.id, f'⏳ บัญชี {account_pool.resolve(job.account)} ใช้โควตาโพสต์ครบแล้ว - เลื่อนอัปโหลดไป {resume_at.strftime("%Y-%m-%d %H:%M")}', 'warning')
+    schedule_upload_resume(job.id, resume_at)
+
+def schedule_upload_resume(job_id: str, resume_at: datetime):
+    scheduler.schedule(UPLOAD_RETRY_PREFIX + job_id, resume_at, lambda _key: resume_deferred_upload(job_id))
+    scheduler.start()
+
+def resume_deferred_upload(job_id: str):
+    """ถึงเวลาที่บัญชีโพสต์ได้อีก: ส่ง job เข้าคิวใหม่ (generation / caption ข้ามไปด้วย checkpoint)"""
+    job = job_store.get_job(job_id)
+    if not job or job.status != 'scheduled':
+        return  # ถูกลบหรือถูกสั่งรันไปแล้ว
+    try:
+        submit_job(job, PRIORITY_HIGH)
+    except QueueFullError:
+        schedule_upload_resume(job_id, datetime.now(THAILAND_TZ) + timedelta(minutes=1))
+
+def mark_post_reserved(item, posted_at: float):
+    """job ได้โควตาโพสต์จาก upload dispatcher แล้ว - finish_job คืนให้ถ้าอัปโหลดไม่สำเร็จ"""
+    item[1]['post_reserved'] = posted_at
+
+def create_upload_dispatcher(on_deferred=defer_upload) -> FairDispatcher:
+    """คิวหน้า stage upload: แบ่งรอบตามน้ำหนักของบัญชี และรอโควตาแยกต่อบัญชี"""
+    return FairDispatcher(account_pool, lambda item: item[0].account, maxsize=PIPELINE_HANDOFF_SIZE,
+                          max_wait=UPLOAD_QUOTA_MAX_WAIT, on_deferred=on_deferred,
+                          on_dispatched=mark_post_reserved)
+
+# จำนวน worker / concurrency ของแต่ละ stage ใน pipeline: generation -> caption -> upload
+stage_workers = {
+    # batch mode: ต้องมี jobs รอพร้อมกันพอจะเต็ม batch (Gemini requests พร้อมกันยังไม่เกิน GENERATION_CONCURRENCY)
+    'generation': GENERATION_CONCURRENCY * max(1, GENERATION_BATCH_SIZE),
+    'caption': CAPTION_CONCURRENCY,
+    'upload': UPLOAD_CONCURRENCY
+}
+
+def submit_job(job: Job, priority: int = PRIORITY_NORMAL):
+    """ส่ง job เข้าคิว (raise QueueFullError ถ้าคิวเต็ม)"""
+    if job_runner is not None:
+        job_runner.start()
+    previous_status, resume_at = job.status, job.upload_resume_at
+    job.status = 'queued'
+    job.upload_resume_at = None  # ส่งเข้าคิวแล้ว การเลื่อนอัปโหลดครั้งก่อน (ถ้ามี) ไม่ต้องใช้อีก
+    save_job(job)
+    video_manager.log_job_activity(job.id, f'📥 ส่งเข้าคิว (รออยู่ {len(job_queue)} งาน)', 'info')
+    try:
+        job_queue.put(job, priority)
+    except QueueFullError as e:
+        job.status, job.upload_resume_at = previous_status, resume_at
+        save_job(job)
+        video_manager.log_job_activity(job.id, f'⛔ คิวเต็ม: {str(e)}', 'error')
+        raise
+
+def recover_interrupted_jobs():
+    """jobs ที่ค้างสถานะ queued/running จากการปิดโปรแกรมครั้งก่อน ให้ถือว่าล้มเหลว (กดรันใหม่ได้)"""
+    for status in ('queued', 'running'):
+        for job in job_store.list_jobs(status=status, limit=10000):
+            job.status = 'failed'
+            job.error_message = 'ถูกขัดจังหวะเพราะระบบ restart'
+            save_job(job)
+            video_manager.log_job_activity(job.id, '♻️ ระบบ restart ระหว่างรัน - กดรันใหม่ได้', 'error')
+
+DAILY_UPLOAD_KEY = 'daily_upload'
+UPLOAD_RETRY_PREFIX = 'upload_quota:'  # key ของ jobs ที่รอโควตาบัญชี (แยกจาก key ของตารางเวลาปกติ)
+
+def schedule_job(job: Job, after_run: bool = False) -> Optional[datetime]:
+    """ตั้งเวลารันครั้งถัดไปของ job ตาม schedule_time (manual / ผ่านไปแล้ว = ยกเลิก)"""
+    thailand_now = datetime.now(THAILAND_TZ)
+    anchor = datetime.fromisoformat(job.created_at) if job.created_at else None
+    next_time = next_run_time(job.schedule_time, thailand_now, anchor, DAILY_RUN_TIME)
+    if next_time is None or (after_run and job.schedule_time not in RECURRING_SCHEDULES):
+        scheduler.cancel(job.id)
+        return None
+    scheduler.schedule(job.id, next_time, run_scheduled_job)
+    scheduler.start()
+    return next_time
+
+def run_scheduled_job(job_id: str):
+    """ถึงเวลาของ job ที่ตั้งไว้: ส่งเข้าคิว แล้วตั้งเวลารอบถัดไป (ถ้าเป็นงานซ้ำ)"""
+    job = job_store.get_job(job_id)
+    if not job:
+        return
+    if job.status in ('queued', 'running'):
+        video_manager.log_job_activity(job_id, '⏭️ ข้ามรอบนี้ - รอบก่อนยังทำงานอยู่', 'warning')
+    else:
+        if job.status == 'completed':
+            # รอบใหม่ของงานที่เสร็จแล้ว: สุ่ม prompt ใหม่ (งาน 'auto') และไม่เอาวิดีโอจาก generation cache
+            # ไม่งั้นงานรายวัน/รายสัปดาห์จะได้คลิปเดิมจาก cache และโพสต์ซ้ำจนกว่า cache จะหมดอายุ
+            job.clear_checkpoints()
+            if job.prompt_key:
+                job.prompt, job.prompt_key = 'auto', None
+            job.use_cache = False
         try:
-            thailand_now = datetime.now(THAILAND_TZ)
-            weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-            today = weekdays[thailand_now.weekday()]
-            
-            # สร้าง job สำหรับวันนี้
-            job_id = f"daily_auto_{today}_{int(time.time())}"
+            submit_job(job, PRIORITY_NORMAL)
+        except QueueFullError:
+            # คิวเต็ม: ลองใหม่ในอีก 1 นาที
+            scheduler.schedule(job_id, datetime.now(THAILAND_TZ) + timedelta(minutes=1), run_scheduled_job)
+            return
+    schedule_job(job, after_run=True)
+
+def rebuild_schedule(batch_size: int = 1000):
+    """ตั้งเวลาใหม่ให้ jobs จาก job store หลัง restart (งานครั้งเดียวที่เลยเวลาไปแล้วจะรันทันที)
+
+    อ่านเฉพาะ jobs ที่ status = 'scheduled' และ jobs ที่ตั้งเวลาซ้ำ ผ่าน index ของ store (cursor ไม่ใช้ OFFSET)
+    ประวัติ jobs ที่จบไปแล้วจึงไม่ทำให้ startup ช้าลง
+    """
+    for job in iter_jobs(status='scheduled', batch_size=batch_size):
+        if job.upload_resume_at:
+            # อัปโหลดที่ถูกเลื่อนเพราะรอโควตา (เวลาผ่านไปแล้วก็รันทันที)
+            schedule_upload_resume(job.id, datetime.fromisoformat(job.upload_resume_at))
+        if job.schedule_time in RECURRING_SCHEDULES or not job.upload_resume_at:
+            schedule_job(job)
+    for schedule_time in RECURRING_SCHEDULES:
+        for job in iter_jobs(schedule_time=schedule_time, batch_size=batch_size):
+            if job.status != 'scheduled':  # status 'scheduled' ตั้งไปแล้วในรอบแรก
+                schedule_job(job)
+
+def iter_jobs(batch_size: int = 1000, **filters):
+    """ไล่ jobs ทีละหน้าแบบ cursor (filters เหมือน job_store.page_jobs)"""
+    cursor = None
+    while True:
+        jobs, cursor = job_store.page_jobs(cursor=cursor, limit=batch_size, **filters)
+        yield from jobs
+        if cursor is None:
+            return
+
+def create_and_run_daily_job(slot_time: datetime):
+    """สร้างและรัน job รายวัน (1 job ต่อบัญชี TikTok) แล้วตั้งเวลา slot ถัดไป"""
+    try:
+        today = WEEKDAYS[slot_time.weekday()]
+        
+        for account in account_pool.accounts.values():
+            # สร้าง job สำหรับวันนี้ (id คำนวณจากเวลา slot + บัญชี - หลาย process ยิงพร้อมกันก็ได้ job เดียว)
+            job_id = id_for(slot_time.timestamp(), f'daily_auto:{slot_time.isoformat()}:{account.name}')
             job = Job(
                 id=job_id,
-                name=f"Daily ASMR - {video_manager.get_thai_weekday(today)}",
+                name=f"Daily ASMR - {video_manager.get_thai_weekday(today)} (@{account.username})",
                 prompt='auto',
                 schedule_time='daily_auto',
                 status='scheduled',
-                created_at=datetime.now().isoformat()
+                created_at=datetime.now().isoformat(),
+                account=account.name
             )
             
-            jobs_storage[job_id] = job
-            video_manager.log_job_activity(job_id, f'📅 สร้าง Daily Job สำหรับ{video_manager.get_thai_weekday(today)}', 'info')
-            
-            # รัน job ทันที
-            video_manager.execute_job(job)
+            if not job_store.create_job(job):
+                continue
+            video_manager.log_job_activity(job_id, f'📅 สร้าง Daily Job สำหรับ{video_manager.get_thai_weekday(today)} (@{account.username})', 'info')
             
-        except Exception as e:
-            print(f"Error in daily job: {e}")
-    
-    # ตั้งเวลาสำหรับแต่ละวัน (เวลาไทย)
-    schedule.every().monday.at("19:30").do(create_and_run_daily_job).tag('daily_upload')
-    schedule.every().tuesday.at("16:30").do(create_and_run_daily_job).tag('daily_upload') 
-    schedule.every().wednesday.at("17:30").do(create_and_run_daily_job).tag('daily_upload')
-    schedule.every().thursday.at("17:30").do(create_and_run_daily_job).tag('daily_upload')
-    schedule.every().friday.at("16:30").do(create_and_run_daily_job).tag('daily_upload')
-    schedule.every().saturday.at("17:30").do(create_and_run_daily_job).tag('daily_upload')
-    schedule.every().sunday.at("20:30").do(create_and_run_daily_job).tag('daily_upload')
-
-# Routes
-@app.route('/')
-def dashboard():
-    """หน้าแดชบอร์ด"""
-    return render_template('dashboard.html', jobs=list(jobs_storage.values()))
-
-@app.route('/auto_create', methods=['POST'])
+            # ส่งเข้าคิวด้วย priority สูงสุด (stage upload แบ่งรอบระหว่างบัญชีให้เอง)
+            submit_job(job, PRIORITY_HIGH)
+        
+    except Exception as e:
+        print(f"Error in daily job: {e}")
+    finally:
+        schedule_daily_jobs()
+
+def schedule_daily_jobs():
+    """ตั้งเวลา slot ถัดไปของระบบอัปโหลดรายวัน (วันละ 1 คลิปตาม optimal_schedule)"""
+    next_time = video_manager.get_next_optimal_time()
+    slot_time = next_time['datetime']
+    scheduler.schedule(DAILY_UPLOAD_KEY, slot_time, lambda _key: create_and_run_daily_job(slot_time))
+    scheduler.start()
+    invalidate_schedule_status()
+    return next_time
+
+# cache ของ /schedule_status (ค่าเปลี่ยนเฉพาะเมื่อ hours_until ลดลง, ถึง slot ถัดไป หรือเปิด/ปิดระบบ)
+_schedule_status_cache = {'payload': None, 'expires_at': None}
+_schedule_status_lock = threading.Lock()
+
+def invalidate_schedule_status():
+    with _schedule_status_lock:
+        _schedule_status_cache['payload'] = None
+
+def parse_account(value) -> Optional[str]:
+    """ชื่อบัญชีจาก request (ว่าง = บัญชีหลัก) - ValueError ถ้าไม่รู้จัก"""
+    if not value:
+        return None
+    if value not in account_pool.accounts:
+        raise ValueError(f'ไม่รู้จักบัญชี TikTok: {value}')
+    return value
+
+def parse_flag(value, default: bool) -> bool:
+    """แปลงค่า true/false จาก JSON หรือ form"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'on', 'yes')
+
+def register_gauges():
+    """ค่าที่อ่านจาก stats() ของแต่ละ component ตอน scrape /metrics"""
+    metrics.gauge('queue_depth', 'งานที่รออยู่ในคิวหลัก',
+                  lambda: {key: job_queue.stats().get(key) for key in ('depth', 'deferred', 'pending', 'leased')},
+                  ('state',))
+    metrics.counter_func('queue_rejected_total', 'งานที่ถูกปฏิเสธเพราะคิวเต็ม', lambda: job_queue.stats()['rejected'])
+    if job_runner is not None:
+        metrics.gauge('stage_active', 'งานที่กำลังทำอยู่ในแต่ละ stage',
+                      lambda: {stage: info.get('active') for stage, info in job_runner.stats().items()
+                               if stage in stage_workers}, ('stage',))
+        metrics.gauge('stage_waiting', 'งานที่รอเข้า stage (hand-off queue)',
+                      lambda: {stage: info.get('waiting') for stage, info in job_runner.stats().items()
+                               if stage in stage_workers}, ('stage',))
+    metrics.gauge('stage_workers', 'จำนวน worker / concurrency limit ของแต่ละ stage', lambda: stage_workers, ('stage',))
+    metrics.gauge('threads', 'threads ที่ทำงานอยู่ใน process', threading.active_count)
+    metrics.gauge('jobs', 'jobs ใน storage แยกตามสถานะ',
+                  lambda: {status: count for status, count in job_store.count_jobs().items() if status != 'total'},
+                  ('status',))
+    metrics.gauge('scheduler_pending', 'งานที่ตั้งเวลารออยู่', lambda: len(scheduler))
+    metrics.gauge('scheduler_last_lag_seconds', 'ความช้าของการปลุกงานครั้งล่าสุด',
+                  lambda: scheduler.stats()['last_lag_seconds'])
+    for name, stats in (('generation', generation_cache.stats), ('artifact', artifact_store.stats)):
+        metrics.counter_func(f'{name}_cache_lookups_total', f'การค้น {name} cache แยกตามผล',
+                             lambda stats=stats: {'hit': stats()['hits'], 'miss': stats()['misses']}, ('result',))
+        metrics.counter_func(f'{name}_cache_evictions_total', f'ไฟล์ที่ถูก evict จาก {name} cache',
+                             lambda stats=stats: stats()['evictions'])
+    metrics.gauge('generation_cache_hit_ratio', 'hit rate ของ generation cache', lambda: generation_cache.stats()['hit_rate'])
+    metrics.gauge('artifact_store_bytes', 'ขนาดรวมของ artifact store', lambda: artifact_store.stats()['bytes'])
+    guards = {'gemini': gemini_guard, 'tiktok': tiktok_guard}
+    for field in ('calls', 'retries', 'failures'):
+        metrics.counter_func(f'api_{field}_total', f'API {field} แยกตาม API',
+                             lambda field=field: {api: guard.stats()[field] for api, guard in guards.items()}, ('api',))
+    metrics.gauge('api_circuit_open', '1 = circuit breaker ไม่ได้ปิดอยู่ (พักการเรียก API)',
+                  lambda: {api: int(guard.stats()['breaker']['state'] != 'closed') for api, guard in guards.items()},
+                  ('api',))
+    metrics.gauge('account_quota_wait_seconds', 'เวลาที่บัญชีต้องรอก่อนโพสต์ได้อีก',
+                  lambda: {name: quota.wait_time() for name, quota in account_pool.quotas.items()}, ('account',))
+    if upload_dispatcher is not None:
+        metrics.counter_func('uploads_dispatched_total', 'jobs ที่ถูกปล่อยเข้า stage upload แยกตามบัญชี',
+                             lambda: upload_dispatcher.stats()['dispatched'], ('account',))
+        metrics.counter_func('uploads_deferred_total', 'jobs ที่ถูกเลื่อนเพราะโควตาบัญชีหมด',
+                             lambda: upload_dispatcher.stats()['deferred'])
+    metrics.gauge('sse_subscribers', 'หน้าเว็บที่เชื่อมต่อ /api/events อยู่', lambda: event_bus.stats()['subscribers'])
+    if generation_batcher is not None:
+        metrics.gauge('generation_batch_pending', 'prompts ที่รอรวม batch', lambda: generation_batcher.stats()['pending'])
+        metrics.gauge('generation_batch_avg_size', 'ขนาด batch เฉลี่ย', lambda: generation_batcher.stats()['avg_batch_size'])
+
+# Routes (สั่งงาน / สถิติ - หน้าแสดงผลและ status APIs อยู่ใน dashboard.py)
 def create_auto_job():
     """สร้าง Full Auto Job ทันที (ไม่ต้องใส่ prompt)"""
     try:
-        job_id = f"auto_job_{int(time.time())}"
+        data = request.get_json(silent=True) or {}
+        job_id = new_id()
         job = Job(
             id=job_id,
-            name=f"Auto ASMR #{len(jobs_storage) + 1}",
+            name=f"Auto ASMR #{job_store.count_jobs()['total'] + 1}",
             prompt='auto',  # ใช้ auto mode
             schedule_time='manual',
             status='scheduled',
-            created_at=datetime.now().isoformat()
+            created_at=datetime.now().isoformat(),
+            use_cache=parse_flag(data.get('use_cache'), GENERATION_CACHE_DEFAULT),
+            account=parse_account(data.get('account'))
         )
         
-        jobs_storage[job_id] = job
+        save_job(job)
         
-        # รันทันที
-        thread = threading.Thread(target=video_manager.execute_job, args=(job,))
-        thread.daemon = True
-        thread.start()
+        # ส่งเข้าคิว (worker pool จะรันให้)
+        try:
+            submit_job(job, PRIORITY_NORMAL)
+        except QueueFullError as e:
+            remove_job(job_id)
+            return jsonify({'success': False, 'error': str(e)}), 429
         
         return jsonify({
             'success': True, 
@@ -460,37 +1017,52 @@ def create_auto_job():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/mass_auto_create', methods=['POST'])
 def create_mass_auto_jobs():
     """สร้าง Auto Jobs หลายๆ อันพร้อมกัน"""
     try:
         data = request.get_json()
         count = int(data.get('count', 3))  # default 3 jobs
+        use_cache = parse_flag(data.get('use_cache'), GENERATION_CACHE_DEFAULT)
+        # ไม่ระบุบัญชี = กระจาย jobs ไปทุกบัญชีแบบวนรอบ (อัปโหลดพร้อมกันได้หลายบัญชี)
+        account = parse_account(data.get('account'))
+        accounts = [account] if account else account_pool.names()
+        
+        # backpressure: ปฏิเสธทั้ง batch ถ้าคิวรับไม่พอ
+        free_slots = job_queue.free_slots()
+        if count > free_slots:
+            return jsonify({
+                'success': False,
+                'error': f'คิวรับได้อีก {free_slots} งาน แต่ขอ {count} งาน',
+                'queue': job_queue.stats()
+            }), 429
         
         created_jobs = []
+        total_jobs = job_store.count_jobs()['total']
         
         for i in range(count):
-            job_id = f"mass_auto_job_{int(time.time())}_{i}"
+            job_id = new_id()
             job = Job(
                 id=job_id,
-                name=f"Auto ASMR Batch #{len(jobs_storage) + i + 1}",
+                name=f"Auto ASMR Batch #{total_jobs + i + 1}",
                 prompt='auto',
                 schedule_time='manual',
                 status='scheduled',
-                created_at=datetime.now().isoformat()
+                created_at=datetime.now().isoformat(),
+                use_cache=use_cache,
+                account=accounts[i % len(accounts)]
             )
             
-            jobs_storage[job_id] = job
-            created_jobs.append(job_id)
-            
-            # รันแบบ delay เล็กน้อยเพื่อไม่ให้ซ้ำกัน
-            def delayed_run(j, delay):
-                time.sleep(delay)
-                video_manager.execute_job(j)
+            save_job(job)
             
-            thread = threading.Thread(target=delayed_run, args=(job, i * 2))
-            thread.daemon = True
-            thread.start()
+            # batch ใช้ priority ต่ำ ไม่แย่งคิว job ที่สร้างเอง
+            try:
+                submit_job(job, PRIORITY_LOW)
+            except QueueFullError:
+                remove_job(job_id)
+                break
+            created_jobs.append(job_id)
+        
+        count = len(created_jobs)
         
         return jsonify({
             'success': True,
@@ -502,18 +1074,11 @@ def create_mass_auto_jobs():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/enable_daily_auto', methods=['POST'])
 def enable_daily_auto():
     """เปิดใช้งานระบบอัปโหลดรายวัน"""
     try:
-        # ล้าง jobs เก่า
-        schedule.clear('daily_upload')
-        
-        # ตั้งค่าใหม่
-        schedule_daily_jobs()
-        
-        # สร้าง job ตัวอย่างสำหรับวันถัดไป
-        next_time = video_manager.get_next_optimal_time()
+        # ตั้งเวลา slot ถัดไป (แทนที่ของเดิมถ้าเปิดอยู่แล้ว)
+        next_time = schedule_daily_jobs()
         
         return jsonify({
             'success': True,
@@ -530,11 +1095,11 @@ def enable_daily_auto():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/disable_daily_auto', methods=['POST'])
 def disable_daily_auto():
     """ปิดใช้งานระบบอัปโหลดรายวัน"""
     try:
-        schedule.clear('daily_upload')
+        scheduler.cancel(DAILY_UPLOAD_KEY)
+        invalidate_schedule_status()
         return jsonify({
             'success': True,
             'message': 'ปิดระบบอัปโหลดรายวันแล้ว'
@@ -542,123 +1107,286 @@ def disable_daily_auto():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/schedule_status')
 def schedule_status():
     """ตรวจสอบสถานะ scheduler"""
     thailand_now = datetime.now(THAILAND_TZ)
-    next_time = video_manager.get_next_optimal_time()
     
-    # นับ jobs ที่ scheduled
-    daily_jobs = schedule.get_jobs('daily_upload')
+    with _schedule_status_lock:
+        payload = _schedule_status_cache['payload']
+        if payload is None or thailand_now >= _schedule_status_cache['expires_at']:
+            next_time = video_manager.get_next_optimal_time()
+            hours_until = int((next_time['datetime'] - thailand_now).total_seconds() / 3600)
+            payload = {
+                # นับ jobs ที่ scheduled
+                'scheduled_jobs_count': len(video_manager.weekly_schedule) if DAILY_UPLOAD_KEY in scheduler else 0,
+                'next_upload': {
+                    'datetime': next_time['datetime'].strftime('%Y-%m-%d %H:%M:%S'),
+                    'weekday': next_time['thai_weekday'],
+                    'time_range': next_time['time_range'],
+                    'hours_until': hours_until
+                },
+                'weekly_schedule': video_manager.optimal_schedule
+            }
+            _schedule_status_cache['payload'] = payload
+            # ใช้ได้จนกว่า hours_until จะลดลง (หรือถึงเวลา slot)
+            _schedule_status_cache['expires_at'] = next_time['datetime'] - timedelta(hours=hours_until)
     
-    return jsonify({
-        'current_time': thailand_now.strftime('%Y-%m-%d %H:%M:%S %Z'),
-        'scheduled_jobs_count': len(daily_jobs),
-        'next_upload': {
-            'datetime': next_time['datetime'].strftime('%Y-%m-%d %H:%M:%S'),
-            'weekday': next_time['thai_weekday'],
-            'time_range': next_time['time_range'],
-            'hours_until': int((next_time['datetime'] - thailand_now).total_seconds() / 3600)
-        },
-        'weekly_schedule': video_manager.optimal_schedule
-    })
-
-@app.route('/jobs')
-def jobs_list():
-    """รายการ jobs"""
-    return render_template('jobs.html', jobs=list(jobs_storage.values()))
+    return jsonify({'current_time': thailand_now.strftime('%Y-%m-%d %H:%M:%S %Z'), **payload})
 
-@app.route('/create_job', methods=['GET', 'POST'])
 def create_job():
     """สร้าง job ใหม่"""
     if request.method == 'POST':
         data = request.get_json() if request.is_json else request.form
+        try:
+            account = parse_account(data.get('account'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        job_id = f"job_{int(time.time())}"
+        job_id = new_id()
         job = Job(
             id=job_id,
             name=data['name'],
             prompt=data['prompt'],
             schedule_time=data['schedule_time'],
             status='scheduled',
-            created_at=datetime.now().isoformat()
+            created_at=datetime.now().isoformat(),
+            use_cache=parse_flag(data.get('use_cache'), GENERATION_CACHE_DEFAULT),
+            account=account
         )
         
-        jobs_storage[job_id] = job
+        save_job(job)
+        schedule_job(job)
         
         if request.is_json:
             return jsonify({'success': True, 'job_id': job_id})
         else:
             return redirect(url_for('jobs_list'))
     
-    return render_template('create_job.html')
-
-@app.route('/job/<job_id>')
-def job_detail(job_id):
-    """รายละเอียด job"""
-    job = jobs_storage.get(job_id)
-    if not job:
-        return "Job not found", 404
-    
-    # ดึง logs ของ job นี้
-    job_specific_logs = [log for log in job_logs if log['job_id'] == job_id]
-    
-    return render_template('job_detail.html', job=job, logs=job_specific_logs)
+    return render_template('create_job.html', use_cache_default=GENERATION_CACHE_DEFAULT,
+                           accounts=account_pool.accounts.values())
 
-@app.route('/run_job/<job_id>', methods=['POST'])
 def run_job_now(job_id):
     """รัน job ทันที"""
-    job = jobs_storage.get(job_id)
+    job = job_store.get_job(job_id)
     if not job:
         return jsonify({'success': False, 'error': 'Job not found'})
     
-    # รัน job ใน background thread
-    thread = threading.Thread(target=video_manager.execute_job, args=(job,))
-    thread.daemon = True
-    thread.start()
+    if job.status in ('queued', 'running'):
+        return jsonify({'success': False, 'error': f'Job อยู่ในสถานะ {job.status} แล้ว'})
     
-    return jsonify({'success': True, 'message': 'Job started'})
-
-@app.route('/logs')
-def logs_page():
-    """หน้า logs"""
-    return render_template('logs.html', logs=reversed(job_logs[-100:]))  # แสดง 100 entries ล่าสุด
-
-@app.route('/api/job_status/<job_id>')
-def job_status_api(job_id):
-    """API สำหรับเช็คสถานะ job"""
-    job = jobs_storage.get(job_id)
-    if not job:
-        return jsonify({'error': 'Job not found'}), 404
+    # job ที่สำเร็จแล้วจะเริ่มใหม่ทั้งหมด ส่วน job ที่ล้มเหลว/สำเร็จบางส่วนจะรันต่อจาก checkpoint
+    if job.status == 'completed':
+        job.clear_checkpoints()
+    
+    # ส่งเข้าคิวให้ worker pool รัน
+    try:
+        submit_job(job, PRIORITY_NORMAL)
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
     
+    return jsonify({'success': True, 'message': 'Job queued'})
+
+def queue_stats_api():
+    """API สถิติคิวงานและ pipeline"""
     return jsonify({
-        'id': job.id,
-        'status': job.status,
-        'last_run': job.last_run,
-        'video_url': job.video_url,
-        'tiktok_url': job.tiktok_url,
-        'error_message': job.error_message
+        'queue': job_queue.stats(),
+        'mode': EXECUTION_MODE,
+        'stages': job_runner.stats() if job_runner is not None else None,
+        'apis': {'gemini': gemini_guard.stats(), 'tiktok': tiktok_guard.stats()},
+        'generation_cache': generation_cache.stats(),
+        'generation_batches': generation_batcher.stats() if generation_batcher is not None else None,
+        'prompt_sampler': video_manager.prompt_sampler.stats(),
+        'chunked_upload': {name: uploader.stats() for name, uploader in tiktok_uploaders.items()},
+        'accounts': account_pool.stats(),
+        'upload_dispatch': upload_dispatcher.stats() if upload_dispatcher is not None else None,
+        'artifacts': artifact_store.stats(),
+        'job_archive': job_store.archive_stats(),
+        'events': event_bus.stats(),
+        'fragments': fragment_cache.stats(),
+        'scheduler': scheduler.stats(),
+        'log_export': log_sink.stats() if log_sink is not None else None
     })
 
-@app.route('/delete_job/<job_id>', methods=['POST'])
+def metrics_endpoint():
+    """Metrics รูปแบบ Prometheus text exposition"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def remove_job(job_id: str) -> bool:
+    """ลบ job ออกจาก store / scheduler แล้วแจ้ง subscribers (หน้าเว็บและ fragment cache ไม่แสดง job นี้อีก)
+
+    publish เองเสมอแม้ใน worker mode - StoreEventBridge เห็นแค่ jobs ที่ถูกแก้ไข ไม่เห็น jobs ที่ถูกลบ
+    """
+    if not job_store.delete_job(job_id):
+        return False
+    scheduler.cancel(job_id)
+    scheduler.cancel(UPLOAD_RETRY_PREFIX + job_id)
+    artifact_store.unpin(job_id)
+    event_bus.publish('job_deleted', {'id': job_id, 'counts': job_store.count_jobs()}, job_id=job_id)
+    return True
+
 def delete_job(job_id):
     """ลบ job"""
-    if job_id in jobs_storage:
-        del jobs_storage[job_id]
+    if remove_job(job_id):
         return jsonify({'success': True})
     return jsonify({'success': False, 'error': 'Job not found'})
 
-def run_scheduler():
-    """รัน scheduler ใน background"""
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # เช็คทุกนาที
+CONTROL_ROUTES = [
+    ('/auto_create', ['POST'], create_auto_job),
+    ('/mass_auto_create', ['POST'], create_mass_auto_jobs),
+    ('/enable_daily_auto', ['POST'], enable_daily_auto),
+    ('/disable_daily_auto', ['POST'], disable_daily_auto),
+    ('/schedule_status', ['GET'], schedule_status),
+    ('/create_job', ['GET', 'POST'], create_job),
+    ('/run_job/<job_id>', ['POST'], run_job_now),
+    ('/api/queue_stats', ['GET'], queue_stats_api),
+    ('/metrics', ['GET'], metrics_endpoint),
+    ('/delete_job/<job_id>', ['POST'], delete_job),
+]
+
+def prewarm():
+    """สร้าง clients ของ process นี้ล่วงหน้า (เรียกเองได้ หรือเปิด PREWARM_CLIENTS=1 ให้ create_app เรียก)"""
+    started = time.monotonic()
+    try:
+        video_manager.prewarm()
+        print(f"🔥 prewarm clients เสร็จใน {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        print(f"Error prewarming clients: {e}")
+
+def init_services():
+    """สร้าง components ของ process นี้ครั้งเดียว (เรียกซ้ำได้ไม่มีผล) - create_app / worker.py เรียกก่อนใช้งาน"""
+    global job_store, log_sink, account_pool, tiktok_uploaders, artifact_store, generation_cache, event_bus
+    global fragment_cache, metrics, stage_duration, jobs_finished, scheduler_lag, store_event_bridge
+    global generation_batcher, job_queue, upload_dispatcher, job_runner, scheduler, _services_ready
+    with _services_lock:
+        if _services_ready:
+            return
+
+        # Storage สำหรับ jobs และ logs (ค่าเริ่มต้น: SQLite)
+        job_store = create_job_store(JOB_STORE_BACKEND, JOB_STORE_PATH, LOG_BUFFER_CAPACITY, LOG_PER_JOB_QUOTA,
+                                     archive_dir=None if JOB_ARCHIVE_DIR == 'off' else JOB_ARCHIVE_DIR)
+
+        # Export logs เป็น JSONL (หมุนไฟล์อัตโนมัติ) สำหรับเครื่องมือภายนอก
+        log_sink = None
+        if LOG_EXPORT_PATH:
+            os.makedirs(os.path.dirname(LOG_EXPORT_PATH) or '.', exist_ok=True)
+            log_sink = JsonlLogSink(LOG_EXPORT_PATH, max_bytes=int(LOG_EXPORT_MAX_MB * 1024 * 1024),
+                                    backup_count=LOG_EXPORT_BACKUPS)
+
+        # บัญชี TikTok ที่โพสต์ได้ + โควตาโพสต์ (รายชั่วโมง / รายวัน) ของแต่ละบัญชี - นับใน job store ร่วมกันทุก process
+        account_pool = AccountPool(load_accounts(TIKTOK_ACCOUNTS_PATH, Account(
+            DEFAULT_ACCOUNT, TIKTOK_ACCESS_TOKEN, TIKTOK_USERNAME,
+            posts_per_hour=TIKTOK_POSTS_PER_HOUR, posts_per_day=TIKTOK_POSTS_PER_DAY
+        )), ledger=job_store)
+
+        # อัปโหลดไฟล์วิดีโอที่สร้างไว้ในเครื่องแบบ chunk (stream จาก disk ไม่โหลดทั้งไฟล์เข้า memory) - 1 ตัวต่อบัญชี
+        tiktok_uploaders = {
+            name: ChunkedUploader(account.access_token, base_url=TIKTOK_API_BASE,
+                                  chunk_size=int(TIKTOK_UPLOAD_CHUNK_MB * 1024 * 1024),
+                                  parallel=TIKTOK_UPLOAD_PARALLEL, guard=tiktok_guard)
+            for name, account in account_pool.accounts.items()
+        }
+
+        artifact_store = ArtifactStore(ARTIFACT_STORE_DIR, max_bytes=int(ARTIFACT_STORE_MAX_MB * 1024 * 1024))
+
+        generation_cache = GenerationCache(GENERATION_CACHE_DIR,
+                                           max_bytes=int(GENERATION_CACHE_MAX_MB * 1024 * 1024),
+                                           ttl_seconds=GENERATION_CACHE_TTL_HOURS * 3600)
+
+        # Push การเปลี่ยนแปลงของ jobs / logs ไปยังหน้าเว็บ (SSE ที่ /api/events)
+        event_bus = EventBus(history=int(os.getenv('EVENT_HISTORY', '500')))
+
+        # HTML ที่ render แล้ว (แถว job, การ์ดสถิติ, ทั้งหน้า) - events ของ job / log ทำให้ของเก่าหมดอายุ
+        fragment_cache = FragmentCache(int(os.getenv('FRAGMENT_CACHE_SIZE', '2000')))
+        event_bus.add_listener(fragment_cache.on_event)
+
+        # Metrics สำหรับ /metrics (Prometheus) - บันทึกแยกต่อ thread ไม่แย่ง lock ใน hot path
+        metrics = MetricsRegistry(prefix='asmr_')
+        stage_duration = metrics.histogram('stage_duration_seconds', 'เวลาที่ใช้ในแต่ละ stage ของ job',
+                                           ('stage', 'outcome'))
+        jobs_finished = metrics.counter('jobs_finished_total', 'jobs ที่ออกจาก pipeline แยกตามสถานะสุดท้าย', ('status',))
+        scheduler_lag = metrics.histogram('scheduler_lag_seconds', 'scheduler ปลุกงานช้ากว่ากำหนด',
+                                          buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60, 300))
+
+        # worker mode: การเปลี่ยนแปลงเกิดใน process อื่น จึงอ่านจาก job store แทนการ publish เอง
+        if EXECUTION_MODE == 'distributed':
+            store_event_bridge = StoreEventBridge(event_bus, job_store, lambda job: job_event_data(job, job_store))
+
+        # Batch generation: รวม prompts ของหลาย jobs ที่มาใกล้ๆ กันเป็น Gemini request เดียว
+        if GENERATION_BATCH_SIZE > 1:
+            generation_batcher = MicroBatcher(video_manager.generate_videos_batch,
+                                              max_batch_size=GENERATION_BATCH_SIZE,
+                                              max_wait=GENERATION_BATCH_WAIT_MS / 1000.0,
+                                              workers=GENERATION_CONCURRENCY,
+                                              name='gemini-batch')
+
+        # คิวงานและ pipeline (แต่ละ stage มีขีดจำกัดของตัวเองตาม stage_workers)
+        if EXECUTION_MODE == 'distributed':
+            # เว็บไม่รัน job เอง - worker.py จองงานจากคิวกลางด้วย lease
+            job_queue = StoreJobQueue(job_store, maxsize=JOB_QUEUE_MAXSIZE)
+            job_runner = None
+        elif EXECUTION_MODE == 'async':
+            # โหลด aiohttp เฉพาะเมื่อใช้ async mode
+            from async_backend import AsyncJobRunner, TikTokAsyncClient
+            job_queue = JobQueue(maxsize=JOB_QUEUE_MAXSIZE, max_deferred=JOB_QUEUE_DEFER_MAX)
+            upload_dispatcher = create_upload_dispatcher()
+            job_runner = AsyncJobRunner(
+                job_queue,
+                video_manager,
+                TikTokAsyncClient(TIKTOK_ACCESS_TOKEN, base_url=TIKTOK_API_BASE,
+                                  username=TIKTOK_USERNAME, pool_size=TIKTOK_HTTP_POOL_SIZE,
+                                  guard=tiktok_guard),
+                stage_limits=stage_workers,
+                max_in_flight=ASYNC_MAX_IN_FLIGHT,
+                stage_observer=video_manager.observe_stage,
+                upload_gate=upload_dispatcher
+            )
+        else:
+            job_queue = JobQueue(maxsize=JOB_QUEUE_MAXSIZE, max_deferred=JOB_QUEUE_DEFER_MAX)
+            upload_dispatcher = create_upload_dispatcher()
+            job_runner = JobPipeline(
+                job_queue,
+                [Stage(name, handler, workers=stage_workers[name], queue_size=PIPELINE_HANDOFF_SIZE,
+                       handoff=upload_dispatcher if name == 'upload' else None)
+                 for name, handler in video_manager.pipeline_stages()],
+                on_error=video_manager.handle_stage_error,
+                on_done=video_manager.finish_job
+            )
+
+        # Scheduler กลาง: jobs ที่ตั้งเวลาไว้ + ระบบอัปโหลดรายวัน (ตื่นตรงเวลาของงานถัดไป)
+        scheduler = Scheduler(on_fire=lambda _key, lag: scheduler_lag.observe(lag))
+
+        register_gauges()
+
+        _services_ready = True
+
+def create_app(prewarm_clients: bool = PREWARM_CLIENTS) -> Flask:
+    """Flask app เต็มรูปแบบ: หน้าแสดงผลจาก dashboard.py + routes สั่งงาน (Gemini client ยังไม่ถูกสร้างจนกว่าจะใช้)"""
+    init_services()
+    flask_app = Flask(__name__)
+    register_status_routes(flask_app, job_store, event_bus, store_event_bridge, artifact_store.path_for,
+                           fragments=fragment_cache)
+    for path, methods, view in CONTROL_ROUTES:
+        flask_app.add_url_rule(path, view_func=view, methods=methods)
+    if prewarm_clients:
+        threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
+    return flask_app
+
+# `app` (เช่น gunicorn app:app, test client) สร้างเมื่อถูกขอครั้งแรก ไม่ใช่ตอน import
+_app = Lazy(create_app, 'flask_app')
+
+def __getattr__(name):
+    if name == 'app':
+        return _app.get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    # เริ่ม scheduler ใน background thread
-    scheduler_thread = threading.Thread(target=run_scheduler)
-    scheduler_thread.daemon = True
-    scheduler_thread.start()
+    flask_app = create_app()
+    if EXECUTION_MODE != 'distributed':
+        recover_interrupted_jobs()  # worker mode ใช้ lease หมดอายุแทน
+    
+    # ตั้งเวลา jobs ทั้งหมดจาก job store แล้วเริ่ม scheduler ใน background thread
+    rebuild_schedule()
+    scheduler.start()
     
     # เริ่ม Flask app
-    app.run(debug=True, threaded=True)
\ No newline at end of file
+    flask_app.run(debug=True, threaded=True)
\ No newline at end of file
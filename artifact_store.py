@@ -0,0 +1,202 @@
+"""ที่เก็บไฟล์วิดีโอ / thumbnail ในเครื่องแบบ content-addressed (ชื่อไฟล์ = sha256 ของเนื้อหา)
+
+เขียนแบบ atomic, จำกัดขนาดรวมด้วย LRU และ pin ไฟล์ของ jobs ที่ยังต้องใช้ (ไม่ถูก evict)
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Iterable, Optional, Set
+
+COPY_BLOCK_SIZE = 1024 * 1024
+ARTIFACT_NAME = re.compile(r'^([0-9a-f]{64})(\.[0-9a-z]{1,8})?$')
+
+
+def locate(directory: str, digest: str) -> Optional[str]:
+    """หา path ของ artifact จาก disk โดยตรง (สำหรับ process ที่อ่านอย่างเดียว ไม่ได้ถือ index ของ store)"""
+    if not ARTIFACT_NAME.match(digest):
+        return None
+    try:
+        names = os.listdir(os.path.join(directory, digest[:2]))
+    except OSError:
+        return None
+    for name in names:
+        match = ARTIFACT_NAME.match(name)
+        if match and match.group(1) == digest:
+            return os.path.join(directory, digest[:2], name)
+    return None
+
+
+class ArtifactStore:
+    """ไฟล์อยู่ที่ <directory>/<2 ตัวแรกของ digest>/<digest><ext> - เนื้อหาเดียวกันเก็บครั้งเดียว"""
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()  # digest -> (ext, size) เรียงจากใช้ล่าสุดน้อยไปมาก
+        self._pins: Dict[str, Set[str]] = {}  # digest -> owners (job ids)
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self._pins_path = os.path.join(directory, 'pins.json')
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.directory, digest[:2], f'{digest}{ext}')
+
+    def _load(self):
+        """สร้าง index จากไฟล์ที่มีอยู่ (ลำดับ LRU หลัง restart ใช้ mtime) และโหลด pins"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                match = ARTIFACT_NAME.match(name)
+                if not match:
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                entries.append((stat.st_mtime, match.group(1), match.group(2) or '', stat.st_size))
+        for _, digest, ext, size in sorted(entries):
+            self._index[digest] = (ext, size)
+            self._total_bytes += size
+        try:
+            with open(self._pins_path, encoding='utf-8') as f:
+                self._pins = {digest: set(owners) for digest, owners in json.load(f).items()}
+        except (OSError, ValueError):
+            self._pins = {}
+
+    def _save_pins(self):
+        """ต้องถือ lock อยู่แล้ว"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({digest: sorted(owners) for digest, owners in self._pins.items()}, f)
+        os.replace(tmp_path, self._pins_path)
+
+    def put_stream(self, chunks: Iterable[bytes], ext: str = '', owner: Optional[str] = None) -> Dict:
+        """เขียนข้อมูลทีละ chunk (คำนวณ hash ไประหว่างเขียน ไม่ต้องถือทั้งไฟล์ใน memory)
+
+        คืน {'digest', 'path', 'size'} - ถ้ากำหนด owner จะ pin ให้ทันทีก่อนเริ่ม evict
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            digest = digest.hexdigest()
+            path = self._path(digest, ext)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            if digest in self._index:
+                self._total_bytes -= self._index.pop(digest)[1]
+            self._index[digest] = (ext, size)
+            self._total_bytes += size
+            if owner:
+                self._pin(digest, owner)
+            self._evict()
+        return {'digest': digest, 'path': path, 'size': size}
+
+    def put_file(self, source: BinaryIO, ext: str = '', owner: Optional[str] = None) -> Dict:
+        return self.put_stream(iter(lambda: source.read(COPY_BLOCK_SIZE), b''), ext, owner)
+
+    def put_path(self, source_path: str, owner: Optional[str] = None) -> Dict:
+        """นำไฟล์ในเครื่องเข้า store (คัดลอก - ไฟล์ต้นฉบับไม่ถูกแตะ)"""
+        with open(source_path, 'rb') as f:
+            return self.put_file(f, os.path.splitext(source_path)[1].lower(), owner)
+
+    def put_url(self, url: str, owner: Optional[str] = None, timeout: float = 120.0) -> Dict:
+        """ดาวน์โหลดไฟล์แบบ stream เข้า store"""
+        import requests
+
+        ext = os.path.splitext(url.split('?', 1)[0])[1].lower()
+        with requests.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            return self.put_stream(response.iter_content(COPY_BLOCK_SIZE), ext, owner)
+
+    def path_for(self, digest: Optional[str]) -> Optional[str]:
+        """path ของไฟล์ (None ถ้าไม่มี/ถูก evict ไปแล้ว) - นับเป็นการใช้งานล่าสุด"""
+        with self._lock:
+            entry = self._index.get(digest) if digest else None
+            if entry is None:
+                self._misses += 1
+                return None
+            path = self._path(digest, entry[0])
+            if not os.path.exists(path):
+                self._total_bytes -= self._index.pop(digest)[1]
+                self._misses += 1
+                return None
+            self._index.move_to_end(digest)
+            self._hits += 1
+            return path
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._index
+
+    def _pin(self, digest: str, owner: str):
+        owners = self._pins.setdefault(digest, set())
+        if owner not in owners:
+            owners.add(owner)
+            self._save_pins()
+
+    def pin(self, digest: str, owner: str):
+        """กัน artifact ไม่ให้ถูก evict จนกว่า owner (job) จะ unpin"""
+        with self._lock:
+            self._pin(digest, owner)
+
+    def unpin(self, owner: str, digest: Optional[str] = None):
+        """ปลด pin ของ owner (ทุกไฟล์ถ้าไม่ระบุ digest)"""
+        with self._lock:
+            changed = False
+            for pinned in [digest] if digest else list(self._pins):
+                owners = self._pins.get(pinned)
+                if owners and owner in owners:
+                    owners.discard(owner)
+                    if not owners:
+                        del self._pins[pinned]
+                    changed = True
+            if changed:
+                self._save_pins()
+                self._evict()
+
+    def _evict(self):
+        """ต้องถือ lock อยู่แล้ว - ลบไฟล์ที่ไม่ได้ pin ซึ่งใช้ล่าสุดน้อยที่สุดจนกว่าจะไม่เกิน max_bytes"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        for digest in list(self._index):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if digest in self._pins:
+                continue
+            ext, size = self._index.pop(digest)
+            self._total_bytes -= size
+            self._evictions += 1
+            try:
+                os.remove(self._path(digest, ext))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'artifacts': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'pinned': len(self._pins),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions
+            }
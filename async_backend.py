@@ -0,0 +1,279 @@
+"""Async execution mode: รันทั้ง lifecycle ของ job บน event loop เดียว
+
+ใช้ aiohttp (connection pool + keep-alive) สำหรับ TikTok Content Posting API
+และ generate_content_async ของ Gemini ทำให้ process เดียวถือ jobs ค้างไว้ได้หลายร้อยงาน
+โดยไม่ต้องใช้ OS thread ต่อ job
+"""
+import asyncio
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+import aiohttp
+
+
+class TikTokAsyncClient:
+    """Client ของ TikTok Content Posting API ที่ใช้ ClientSession ร่วมกัน (keep-alive)"""
+
+    def __init__(self, access_token: str, base_url: str = 'https://open.tiktokapis.com',
+                 username: str = 'autoasmr', pool_size: int = 100, timeout: float = 30.0,
+                 status_poll_interval: float = 2.0, status_poll_attempts: int = 10,
+                 guard=None):
+        self.access_token = access_token
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.status_poll_interval = status_poll_interval
+        self.status_poll_attempts = status_poll_attempts
+        self.guard = guard  # resilience.ApiGuard (rate limit + retry + circuit breaker)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """สร้าง session ครั้งแรกที่ใช้ (ต้องเรียกจากใน event loop)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Authorization': f'Bearer {self.access_token}'}
+            )
+        return self._session
+
+    async def _post(self, path: str, payload: Dict, on_retry=None, access_token: Optional[str] = None) -> Dict:
+        if self.guard is not None:
+            return await self.guard.call_async(lambda: self._post_once(path, payload, access_token),
+                                               on_retry=on_retry)
+        return await self._post_once(path, payload, access_token)
+
+    async def _post_once(self, path: str, payload: Dict, access_token: Optional[str] = None) -> Dict:
+        """access_token: token ของบัญชีอื่น (ไม่ระบุ = token ของ session)"""
+        headers = {'Authorization': f'Bearer {access_token}'} if access_token else None
+        async with self._get_session().post(f'{self.base_url}{path}', json=payload, headers=headers) as response:
+            body = await response.json(content_type=None)
+            error = body.get('error') or {}
+            if response.status >= 400 or error.get('code', 'ok') != 'ok':
+                raise RuntimeError(f"TikTok API {response.status}: {error.get('message') or error.get('code')}")
+            return body.get('data') or {}
+
+    async def upload(self, video_url: str, post_info: Dict, publish_id: Optional[str] = None,
+                     on_retry=None, access_token: Optional[str] = None, username: Optional[str] = None) -> Dict:
+        """โพสต์วิดีโอแบบ PULL_FROM_URL แล้วรอจนเผยแพร่ (ผลลัพธ์รูปแบบเดียวกับ upload_to_tiktok)
+
+        ถ้ามี publish_id จาก checkpoint แล้ว จะข้ามการ init และเช็คสถานะต่อเลย (ไม่โพสต์ซ้ำ)
+        access_token / username ใช้โพสต์ในนามบัญชีอื่น (ใช้ connection pool เดียวกัน)
+        """
+        try:
+            if not publish_id:
+                init = await self._post('/v2/post/publish/video/init/', {
+                    'post_info': post_info,
+                    'source_info': {'source': 'PULL_FROM_URL', 'video_url': video_url}
+                }, on_retry, access_token)
+                publish_id = init['publish_id']
+
+            post_id = None
+            for _ in range(self.status_poll_attempts):
+                status = await self._post_once('/v2/post/publish/status/fetch/', {'publish_id': publish_id},
+                                               access_token)
+                if status.get('status') == 'FAILED':
+                    publish_id = None  # โพสต์นี้ใช้ไม่ได้แล้ว ครั้งหน้าต้อง init ใหม่
+                    raise RuntimeError(f"TikTok publish failed: {status.get('fail_reason')}")
+                if status.get('status') == 'PUBLISH_COMPLETE':
+                    post_ids = status.get('publicaly_available_post_id') or []
+                    post_id = post_ids[0] if post_ids else None
+                    break
+                await asyncio.sleep(self.status_poll_interval)
+
+            tiktok_url = f'https://www.tiktok.com/@{username or self.username}/video/{post_id}' if post_id else None
+            return {
+                'success': True,
+                'tiktok_url': tiktok_url,
+                'embed_url': tiktok_url,
+                'publish_id': publish_id
+            }
+
+        except Exception as e:
+            return {'success': False, 'error': str(e), 'publish_id': publish_id}
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class AsyncJobRunner:
+    """รัน jobs จาก JobQueue เป็น coroutine บน event loop เดียว (แทน JobPipeline แบบ thread)"""
+
+    def __init__(self, job_queue, manager, tiktok_client: TikTokAsyncClient,
+                 stage_limits: Dict[str, int], max_in_flight: int = 200, stage_observer=None,
+                 upload_gate=None):
+        self.job_queue = job_queue
+        self.manager = manager
+        self.tiktok_client = tiktok_client
+        self.stage_limits = dict(stage_limits)
+        self.stage_observer = stage_observer  # stage_observer(stage, seconds, outcome) สำหรับ metrics
+        self.max_in_flight = max_in_flight
+        self.upload_gate = upload_gate  # accounts.FairDispatcher: คิวต่อบัญชี + โควตาก่อนเข้า stage upload
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores = {}
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._active = {stage: 0 for stage in stage_limits}
+        self._processed = {stage: 0 for stage in stage_limits}
+        self._running_jobs = 0
+        self._lock = threading.Lock()
+        self._started = False
+        self._stopping = threading.Event()
+
+    def start(self):
+        """เริ่ม event loop thread และ dispatcher thread (เรียกซ้ำได้ไม่มีผล)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        self.loop = asyncio.new_event_loop()
+        self._semaphores = {stage: asyncio.Semaphore(limit) for stage, limit in self.stage_limits.items()}
+        self._gate_space = asyncio.Event()  # set เมื่อ _release_uploads ดึงงานออกจาก upload_gate (มีที่ว่าง)
+
+        loop_thread = threading.Thread(target=self.loop.run_forever, name='async-job-loop')
+        loop_thread.daemon = True
+        loop_thread.start()
+
+        dispatcher = threading.Thread(target=self._dispatch, name='async-job-dispatcher')
+        dispatcher.daemon = True
+        dispatcher.start()
+
+        if self.upload_gate is not None:
+            gate = threading.Thread(target=self._release_uploads, name='async-upload-gate')
+            gate.daemon = True
+            gate.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        if self.loop is not None:
+            future = asyncio.run_coroutine_threadsafe(self.tiktok_client.close(), self.loop)
+            future.result(timeout)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _dispatch(self):
+        """ดึงงานจาก JobQueue แล้วส่งเข้า event loop (จำกัดจำนวนงานค้างด้วย max_in_flight)"""
+        while not self._stopping.is_set():
+            if not self._in_flight.acquire(timeout=1.0):
+                continue
+            job = self.job_queue.get(timeout=1.0)
+            if job is None:
+                self._in_flight.release()
+                continue
+            asyncio.run_coroutine_threadsafe(self._run_job(job), self.loop)
+
+    def _release_uploads(self):
+        """ปล่อย jobs ที่ upload_gate เลือกแล้ว (ตามลำดับ fair queueing และโควตาของบัญชี) ให้เริ่ม stage upload"""
+        while not self._stopping.is_set():
+            try:
+                _, _, admitted = self.upload_gate.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            self.loop.call_soon_threadsafe(admitted.set_result, True)
+            self.loop.call_soon_threadsafe(self._gate_space.set)
+
+    async def _admit_upload(self, job, ctx) -> bool:
+        """รอคิวของบัญชี - False ถ้า job ถูกเลื่อนไปเพราะโควตาของบัญชีต้องรอนานเกินไป"""
+        admitted = self.loop.create_future()
+        while True:
+            # put แบบไม่บล็อก (ใช้ thread แค่ช่วงสั้น ๆ เพราะ on_deferred อาจเขียน job store) - คิวเต็มก็รอบน loop
+            self._gate_space.clear()
+            try:
+                if not await asyncio.to_thread(self.upload_gate.put, (job, ctx, admitted), False):
+                    return False
+                break
+            except queue.Full:
+                try:
+                    await asyncio.wait_for(self._gate_space.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+        return await admitted
+
+    async def _stage(self, name: str, coro_factory):
+        """รัน coroutine ภายใต้ semaphore ของ stage พร้อมนับสถิติ"""
+        async with self._semaphores[name]:
+            with self._lock:
+                self._active[name] += 1
+            started = time.monotonic()
+            outcome = 'error'
+            try:
+                result = await coro_factory()
+                failed = result is False or (isinstance(result, dict) and not result.get('success', True))
+                outcome = 'stopped' if failed else 'passed'
+                return result
+            finally:
+                with self._lock:
+                    self._active[name] -= 1
+                    self._processed[name] += 1
+                if self.stage_observer:
+                    self.stage_observer(name, time.monotonic() - started, outcome)
+
+    async def _run_job(self, job):
+        manager = self.manager
+        ctx = {}
+        with self._lock:
+            self._running_jobs += 1
+        try:
+            # ขั้นตอนของ manager ที่ไม่ใช่ async (บันทึก job ลง store, เขียน log, hash/คัดลอก/ดาวน์โหลด artifacts)
+            # รันใน thread แยกทั้งหมด - commit หรือดาวน์โหลดที่ช้าจะได้ไม่หยุด jobs อื่นบน event loop
+            async def generate():
+                if not await asyncio.to_thread(manager.begin_generation, job):
+                    return None  # มีวิดีโอจาก checkpoint แล้ว
+                return await manager.generate_video_async(job.prompt_text, job.id, job.use_cache)
+
+            video_result = await self._stage('generation', generate)
+            if video_result is not None and not await asyncio.to_thread(manager.complete_generation,
+                                                                        job, ctx, video_result):
+                return
+
+            async def caption():
+                return await asyncio.to_thread(manager.stage_caption, job, ctx)
+
+            if not await self._stage('caption', caption):
+                return
+
+            if self.upload_gate is not None and not await self._admit_upload(job, ctx):
+                return  # โควตาของบัญชีหมด - job ถูกเลื่อนเวลาไปแล้ว
+
+            async def upload():
+                await asyncio.to_thread(manager.log_job_activity, job.id, '📱 กำลังอัปโหลดไป TikTok...', 'info')
+                if manager.local_video_path(job):
+                    # ไฟล์ในเครื่อง: FILE_UPLOAD ทีละ chunk (blocking I/O จึงรันใน thread แยก)
+                    return await asyncio.to_thread(manager.upload_file_to_tiktok, job)
+                account = manager.account_for(job)
+                return await self.tiktok_client.upload(job.video_url,
+                                                       manager.build_tiktok_post_info(job.caption),
+                                                       publish_id=job.publish_id,
+                                                       on_retry=manager.retry_logger(job.id, 'TikTok'),
+                                                       access_token=account.access_token,
+                                                       username=account.username)
+
+            upload_result = await self._stage('upload', upload)
+            await asyncio.to_thread(manager.complete_upload, job, ctx, upload_result)
+
+        except Exception as e:
+            await asyncio.to_thread(manager.handle_stage_error, job, e)
+        finally:
+            try:
+                await asyncio.to_thread(manager.finish_job, job, ctx)
+            finally:
+                with self._lock:
+                    self._running_jobs -= 1
+                self._in_flight.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stages = {
+                stage: {
+                    'limit': self.stage_limits[stage],
+                    'active': self._active[stage],
+                    'processed': self._processed[stage]
+                }
+                for stage in self.stage_limits
+            }
+            stages['in_flight'] = {'jobs': self._running_jobs, 'limit': self.max_in_flight}
+            return stages
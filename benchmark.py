@@ -0,0 +1,372 @@
+"""Load test / benchmark แบบ offline: ยิง /auto_create, /mass_auto_create, /api/job_status และหน้า dashboard
+ผ่าน Flask test client โดยแทน Gemini / TikTok ด้วย backend ปลอมที่กำหนด latency และอัตรา error ได้
+
+    python benchmark.py --requests 200 --concurrency 16
+    python benchmark.py --mode async --gemini-latency lognormal:0.5:0.6 --gemini-error-rate 0.05 --json
+
+latency: "0.2" (คงที่), "fixed:0.2", "uniform:0.1:0.5" หรือ "lognormal:<median>:<sigma>" (วินาที)
+ไม่ต้องต่อ network: storage, cache และ artifacts ถูกสร้างใน temp directory แยกทุกครั้ง
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+TERMINAL_STATUSES = ('completed', 'failed', 'partial_success')
+
+
+class ServiceUnavailable(Exception):
+    """error ชั่วคราวปลอม (ชื่อตรงกับที่ resilience ถือว่าลองใหม่ได้)"""
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """แปลงข้อความ latency เป็นฟังก์ชันสุ่มเวลา (วินาที)"""
+    kind, _, args = spec.partition(':')
+    try:
+        if not args:
+            value = float(kind)
+            return lambda: value
+        params = [float(part) for part in args.split(':')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'latency ไม่ถูกต้อง: {spec}')
+    if kind == 'fixed':
+        return lambda: params[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(params[0], params[1])
+    if kind == 'lognormal':
+        median, sigma = params
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    raise argparse.ArgumentTypeError(f'ไม่รู้จัก latency แบบ {kind}')
+
+
+class FakeBackend:
+    """จำลองการเรียก API ภายนอก: หน่วงเวลาตาม latency แล้ว raise ServiceUnavailable ตาม error_rate"""
+
+    def __init__(self, name: str, latency: Callable[[], float], error_rate: float):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _outcome(self):
+        with self._lock:
+            self.calls += 1
+            failed = random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return self.latency(), failed
+
+    def call(self):
+        delay, failed = self._outcome()
+        time.sleep(delay)
+        if failed:
+            raise ServiceUnavailable(f'{self.name}: 503 (จำลอง)')
+
+    async def call_async(self):
+        delay, failed = self._outcome()
+        await asyncio.sleep(delay)
+        if failed:
+            raise ServiceUnavailable(f'{self.name}: 503 (จำลอง)')
+
+    def stats(self) -> Dict:
+        return {'calls': self.calls, 'errors': self.errors}
+
+
+class FakeResponse:
+    text = ''  # ไม่มีผลแยกรายการ - batch ถือว่าสำเร็จทั้งก้อน
+
+
+class FakeGeminiModel:
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+
+    def generate_content(self, prompt):
+        self.backend.call()
+        return FakeResponse()
+
+    async def generate_content_async(self, prompt):
+        await self.backend.call_async()
+        return FakeResponse()
+
+
+class FakeTikTokAsyncClient:
+    """แทน TikTokAsyncClient ใน async mode (ผลลัพธ์รูปแบบเดียวกัน)"""
+
+    def __init__(self, backend: FakeBackend, guard):
+        self.backend = backend
+        self.guard = guard
+
+    async def upload(self, video_url: str, post_info: Dict, publish_id=None, on_retry=None,
+                     access_token=None, username=None) -> Dict:
+        try:
+            await self.guard.call_async(self.backend.call_async, on_retry=on_retry)
+        except Exception as e:
+            return {'success': False, 'error': str(e), 'publish_id': publish_id}
+        post_id = random.randint(7000000000000000000, 7999999999999999999)
+        url = f'https://www.tiktok.com/@bench/video/{post_id}'
+        return {'success': True, 'tiktok_url': url, 'embed_url': url, 'publish_id': f'bench_{post_id}'}
+
+    async def close(self):
+        pass
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(pct / 100.0 * len(ordered))) - 1)]
+
+
+class Recorder:
+    """เก็บ latency / status code ต่อ endpoint"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed: float) -> Dict:
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': len(values),
+                    'errors': self.errors.get(endpoint, 0),
+                    'throughput_rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+                    'p50_ms': round(percentile(values, 50) * 1000, 2),
+                    'p99_ms': round(percentile(values, 99) * 1000, 2),
+                    'max_ms': round(max(values) * 1000, 2)
+                }
+                for endpoint, values in sorted(self.samples.items())
+            }
+
+
+def rss_bytes() -> int:
+    """หน่วยความจำที่ process ใช้อยู่ (Linux) - 0 ถ้าอ่านไม่ได้"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def configure_environment(args, workdir: str):
+    """ตั้งค่า env ก่อน import app (ค่าที่ผู้ใช้ตั้งไว้เองจะไม่ถูกทับ)"""
+    os.environ['EXECUTION_MODE'] = args.mode
+    os.environ['JOB_STORE_BACKEND'] = args.store
+    defaults = {
+        'JOB_STORE_PATH': os.path.join(workdir, 'jobs.db'),
+        'GENERATION_CACHE_DIR': os.path.join(workdir, 'generation_cache'),
+        'ARTIFACT_STORE_DIR': os.path.join(workdir, 'artifacts'),
+        'PROMPT_HISTORY_PATH': '',
+        'TIKTOK_ACCOUNTS_PATH': os.path.join(workdir, 'tiktok_accounts.json'),  # ไม่มีไฟล์ = บัญชีเดียว
+        'LOG_EXPORT_PATH': '',
+        'JOB_QUEUE_MAXSIZE': str(max(1000, args.requests + args.mass_requests * args.mass_count)),
+        'GEMINI_API_KEY': 'benchmark',
+        'TIKTOK_ACCESS_TOKEN': 'benchmark',
+        # rate limit ของจริงจะกลายเป็นคอขวดแทนระบบที่ต้องการวัด
+        'GEMINI_RATE_PER_MIN': '6000000', 'GEMINI_BURST': '100000', 'GEMINI_RETRY_BASE_DELAY': '0.05',
+        'TIKTOK_RATE_PER_MIN': '6000000', 'TIKTOK_BURST': '100000', 'TIKTOK_RETRY_BASE_DELAY': '0.05',
+        'TIKTOK_POSTS_PER_HOUR': '1000000', 'TIKTOK_POSTS_PER_DAY': '1000000',
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+def install_fakes(web, gemini: FakeBackend, tiktok: FakeBackend):
+    """แทน Gemini model และ TikTok client ด้วย backend ปลอม"""
+    web.video_manager.model = FakeGeminiModel(gemini)
+
+    def post_to_tiktok(upload_payload: Dict, account=None) -> Dict:
+        tiktok.call()
+        post_id = random.randint(7000000000000000000, 7999999999999999999)
+        return {
+            'publish_id': f'bench_{post_id}',
+            'share_url': f'https://vm.tiktok.com/{post_id}',
+            'embed_url': f'https://www.tiktok.com/@bench/video/{post_id}',
+            'status': 'PUBLISHED'
+        }
+
+    web.video_manager.post_to_tiktok = post_to_tiktok
+    if web.EXECUTION_MODE == 'async':
+        web.job_runner.tiktok_client = FakeTikTokAsyncClient(tiktok, web.tiktok_guard)
+
+
+def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix='asmr-bench-')
+    configure_environment(args, workdir)
+    if args.mode == 'distributed':
+        raise SystemExit('benchmark รองรับเฉพาะ threads / async (distributed ต้องรัน worker.py แยก process)')
+
+    import app as web
+    web.init_services()
+
+    gemini = FakeBackend('gemini', args.gemini_latency, args.gemini_error_rate)
+    tiktok = FakeBackend('tiktok', args.tiktok_latency, args.tiktok_error_rate)
+    install_fakes(web, gemini, tiktok)
+
+    recorder = Recorder()
+    local = threading.local()
+    job_ids: List[str] = []
+    ids_lock = threading.Lock()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = web.app.test_client()
+        return local.client
+
+    def timed(endpoint: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        response = getattr(client(), method)(path, **kwargs)
+        recorder.record(endpoint, time.perf_counter() - started, response.status_code < 400)
+        return response
+
+    def create_one(_):
+        response = timed('POST /auto_create', 'post', '/auto_create', json={'use_cache': False})
+        data = response.get_json(silent=True) or {}
+        if data.get('success'):
+            with ids_lock:
+                job_ids.append(data['job_id'])
+
+    def create_mass(_):
+        response = timed('POST /mass_auto_create', 'post', '/mass_auto_create',
+                         json={'count': args.mass_count, 'use_cache': False})
+        data = response.get_json(silent=True) or {}
+        if data.get('success'):
+            with ids_lock:
+                job_ids.extend(data['created_jobs'])
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(create_one, range(args.requests)))
+        list(pool.map(create_mass, range(args.mass_requests)))
+    submitted_at = time.perf_counter()
+
+    # ระหว่างรอ jobs เสร็จ: ผู้ใช้จำลองเปิด dashboard และ poll สถานะ
+    finished: Dict[str, float] = {}
+    pending = list(job_ids)
+    deadline = submitted_at + args.timeout
+
+    def poll(job_id: str):
+        response = timed('GET /api/job_status', 'get', f'/api/job_status/{job_id}')
+        status = (response.get_json(silent=True) or {}).get('status')
+        if status in TERMINAL_STATUSES:
+            finished.setdefault(job_id, time.perf_counter())
+            return None
+        return job_id
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        while pending and time.perf_counter() < deadline:
+            dashboards = [pool.submit(timed, 'GET /', 'get', '/') for _ in range(args.dashboard_clients)]
+            pending = [job_id for job_id in pool.map(poll, pending) if job_id is not None]
+            for future in dashboards:
+                future.result()
+            if pending:
+                time.sleep(args.poll_interval)
+    elapsed = time.perf_counter() - started
+    rss_after = rss_bytes()
+
+    counts = web.job_store.count_jobs()
+    completed_jobs = len(finished)
+    job_seconds = [finished[job_id] - submitted_at for job_id in finished]
+    report = {
+        'config': {
+            'mode': web.EXECUTION_MODE,
+            'store': args.store,
+            'requests': args.requests,
+            'mass_requests': args.mass_requests,
+            'mass_count': args.mass_count,
+            'concurrency': args.concurrency,
+            'stage_workers': web.stage_workers,
+            'gemini_error_rate': args.gemini_error_rate,
+            'tiktok_error_rate': args.tiktok_error_rate
+        },
+        'elapsed_s': round(elapsed, 2),
+        'endpoints': recorder.report(elapsed),
+        'jobs': {
+            'submitted': len(job_ids),
+            'finished': completed_jobs,
+            'timed_out': len(pending),
+            'by_status': {status: counts.get(status, 0) for status in TERMINAL_STATUSES},
+            'throughput_jobs_per_s': round(completed_jobs / elapsed, 2) if elapsed else 0.0,
+            'drain_p50_s': round(percentile(job_seconds, 50), 3),
+            'drain_p99_s': round(percentile(job_seconds, 99), 3)
+        },
+        'memory': {
+            'rss_before_mb': round(rss_before / 1024 / 1024, 1),
+            'rss_after_mb': round(rss_after / 1024 / 1024, 1),
+            'bytes_per_job': int((rss_after - rss_before) / len(job_ids)) if job_ids else 0
+        },
+        'backends': {'gemini': gemini.stats(), 'tiktok': tiktok.stats()},
+        'workdir': workdir
+    }
+    if web.job_runner is not None:
+        web.job_runner.stop(timeout=5)
+    return report
+
+
+def print_report(report: Dict):
+    config = report['config']
+    print(f"⏱️  mode={config['mode']} store={config['store']} concurrency={config['concurrency']} "
+          f"elapsed={report['elapsed_s']}s")
+    print(f"{'endpoint':<28}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<28}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p99_ms']:>10}")
+    jobs = report['jobs']
+    print(f"📦 jobs: {jobs['finished']}/{jobs['submitted']} เสร็จ ({jobs['by_status']}) "
+          f"{jobs['throughput_jobs_per_s']} jobs/s, drain p50 {jobs['drain_p50_s']}s p99 {jobs['drain_p99_s']}s"
+          + (f", ค้าง {jobs['timed_out']}" if jobs['timed_out'] else ''))
+    memory = report['memory']
+    print(f"🧠 RSS {memory['rss_before_mb']} -> {memory['rss_after_mb']} MB (~{memory['bytes_per_job']} bytes/job)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark แบบ offline ด้วย Gemini / TikTok ปลอม')
+    parser.add_argument('--mode', choices=('threads', 'async'), default=os.getenv('EXECUTION_MODE', 'threads'))
+    parser.add_argument('--store', choices=('sqlite', 'memory'), default='sqlite')
+    parser.add_argument('--requests', type=int, default=100, help='จำนวน POST /auto_create')
+    parser.add_argument('--mass-requests', type=int, default=5, help='จำนวน POST /mass_auto_create')
+    parser.add_argument('--mass-count', type=int, default=10, help='jobs ต่อ 1 mass request')
+    parser.add_argument('--concurrency', type=int, default=8, help='client พร้อมกัน')
+    parser.add_argument('--dashboard-clients', type=int, default=2, help='เปิด dashboard พร้อมกันต่อรอบ poll')
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    parser.add_argument('--timeout', type=float, default=300.0, help='รอ jobs เสร็จนานสุด (วินาที)')
+    parser.add_argument('--gemini-latency', type=parse_latency, default=parse_latency('lognormal:0.3:0.5'))
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--tiktok-latency', type=parse_latency, default=parse_latency('lognormal:0.2:0.5'))
+    parser.add_argument('--tiktok-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='พิมพ์ผลเป็น JSON (ไว้เทียบ regression)')
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    report = run(args)
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""Entry point แบบเบา: dashboard + status APIs ที่อ่านจาก job store อย่างเดียว (ไม่ import Gemini / TikTok / pipeline)
+
+ใช้เป็น replica สำหรับแสดงผลคู่กับ app.py / worker.py ที่ใช้ JOB_STORE_PATH เดียวกัน
+ส่วน request ที่สั่งงาน (POST /create_job, /run_job/..., /auto_create, /schedule_status ฯลฯ) ให้ proxy ไปที่ app.py:
+
+    EXECUTION_MODE=distributed python app.py
+    python dashboard.py
+"""
+import gzip
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Hashable, Optional
+
+from flask import Flask, Response, abort, jsonify, render_template, request, send_file
+from markupsafe import Markup
+
+from artifact_store import locate
+from events import EventBus, StoreEventBridge
+from fragment_cache import FragmentCache, GZIP_LEVEL, GZIP_MIN_BYTES
+from job_store import create_job_store
+from models import Job
+
+# Configuration (ชื่อ env เดียวกับ app.py)
+JOB_STORE_BACKEND = os.getenv('JOB_STORE_BACKEND', 'sqlite')
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', 'data/jobs.db')
+LOG_BUFFER_CAPACITY = int(os.getenv('LOG_BUFFER_CAPACITY', '1000'))
+LOG_PER_JOB_QUOTA = int(os.getenv('LOG_PER_JOB_QUOTA', '200'))
+JOBS_PER_PAGE = int(os.getenv('JOBS_PER_PAGE', '50'))
+MAX_JOBS_PER_PAGE = int(os.getenv('MAX_JOBS_PER_PAGE', '200'))
+EVENT_HISTORY = int(os.getenv('EVENT_HISTORY', '500'))
+ARTIFACT_STORE_DIR = os.getenv('ARTIFACT_STORE_DIR', 'data/artifacts')
+FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', '2000'))  # HTML ที่ render แล้วเก็บได้สูงสุด (entries)
+WEB_PORT = int(os.getenv('WEB_PORT', '5001'))
+
+JOB_FILTERS = ('status', 'schedule_time', 'from', 'to')
+COMPRESSIBLE_TYPES = ('text/html', 'application/json', 'text/plain')
+
+# endpoints ของ app.py ที่ templates ลิงก์ถึง - replica นี้ไม่มี จึงสร้าง URL ตรงๆ ให้ proxy ส่งต่อ
+CONTROL_ENDPOINTS = {'create_job': '/create_job'}
+
+
+def job_event_data(job: Job, store) -> Dict:
+    """ข้อมูลที่หน้าเว็บต้องใช้อัปเดตแถว/สถานะของ job"""
+    return {
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'last_run': job.last_run,
+        'video_url': job.video_url,
+        'tiktok_url': job.tiktok_url,
+        'error_message': job.error_message,
+        'caption': job.caption,
+        'counts': store.count_jobs()
+    }
+
+
+def job_summary(job: Job) -> Dict:
+    """ข้อมูล job แบบย่อสำหรับตารางรายการ"""
+    prompt = job.prompt_text
+    return {
+        'id': job.id,
+        'name': job.name,
+        'prompt_preview': prompt[:50] + ('...' if len(prompt) > 50 else ''),
+        'schedule_time': job.schedule_time,
+        'status': job.status,
+        'created_at': job.created_at[:19],
+        'last_run': job.last_run
+    }
+
+
+def parse_date_arg(name: str) -> Optional[str]:
+    """อ่านวันที่ YYYY-MM-DD จาก query string (ValueError ถ้ารูปแบบผิด)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+
+
+def accepts_gzip() -> bool:
+    return 'gzip' in request.accept_encodings
+
+
+def page_response(fragments: FragmentCache, key: Hashable, render: Callable[[], str]) -> Response:
+    """หน้า HTML จาก fragment cache พร้อม ETag (304 ถ้า browser มีหน้านี้แล้ว ไม่ต้อง render) และ gzip"""
+    etag = fragments.etag(key)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        body, compressed = fragments.page(key, render, accepts_gzip())
+        response = Response(body, mimetype='text/html')
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag, weak=True)  # weak: gzip / ไม่ gzip เป็นหน้าเดียวกัน
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True
+    return response
+
+
+def compress_response(response: Response) -> Response:
+    """after_request: gzip HTML / JSON ที่ยังไม่ได้บีบอัด (ข้าม SSE, ไฟล์ และ response เล็กๆ)"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES
+            or not accepts_gzip()):
+        return response
+    body = response.get_data()
+    if len(body) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(body, GZIP_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)  # ETag ของเนื้อหาก่อนบีบอัด - ใช้เทียบแบบ weak ได้
+    return response
+
+
+def register_status_routes(app: Flask, job_store, event_bus: EventBus,
+                           store_event_bridge: Optional[StoreEventBridge] = None,
+                           artifact_path: Optional[Callable[[str], Optional[str]]] = None,
+                           fragments: Optional[FragmentCache] = None) -> FragmentCache:
+    """routes แบบอ่านอย่างเดียว (ใช้ทั้งใน app.py และ replica นี้)
+
+    artifact_path(digest) คืน path ของไฟล์ใน artifact store (None = ไม่มี)
+    fragments = cache ของ HTML ที่ render แล้ว (ไม่ส่งมา = สร้างใหม่และล้างตาม events ของ event_bus)
+    """
+    if fragments is None:
+        fragments = FragmentCache(FRAGMENT_CACHE_SIZE)
+        event_bus.add_listener(fragments.on_event)
+
+    @app.before_request
+    def start_store_event_bridge():
+        """เริ่มอ่าน events จาก job store เมื่อ process นี้รับ request แรก (worker ไม่เคยรับ request)"""
+        if store_event_bridge is not None:
+            store_event_bridge.start()
+
+    app.after_request(compress_response)
+
+    def job_row(job: Job) -> Markup:
+        return Markup(fragments.fragment(('job_row', job.id, fragments.version(job.id)),
+                                         lambda: render_template('_job_row.html', job=job)))
+
+    @app.route('/')
+    def dashboard():
+        """หน้าแดชบอร์ด (ทั้งหน้าเปลี่ยนเมื่อมี event ใดๆ - แถว job ที่ไม่เปลี่ยนใช้ HTML เดิม)"""
+        generation = fragments.generation
+
+        def render():
+            last_event_id = event_bus.stats()['last_event_id']
+            stats = job_store.count_jobs()
+            return render_template(
+                'dashboard.html',
+                schedule_table=Markup(fragments.fragment(('schedule_table',),
+                                                         lambda: render_template('_weekly_schedule.html'))),
+                stats_cards=Markup(fragments.fragment(('stats_cards', generation),
+                                                      lambda: render_template('_stats_cards.html', stats=stats))),
+                job_rows=[job_row(job) for job in job_store.list_jobs(limit=5)],
+                last_event_id=last_event_id)
+
+        return page_response(fragments, ('dashboard', generation), render)
+
+    @app.route('/jobs')
+    def jobs_list():
+        """รายการ jobs (ตารางโหลดทีละหน้าจาก /api/jobs - หน้านี้ขึ้นกับ filters อย่างเดียว)"""
+        filters = {name: request.args.get(name) or None for name in JOB_FILTERS}
+        return page_response(fragments, ('jobs', tuple(filters.values())),
+                             lambda: render_template('jobs.html', filters=filters))
+
+    @app.route('/api/jobs')
+    def jobs_api():
+        """API รายการ jobs แบบแบ่งหน้า (?cursor= &limit= &status= &schedule_time= &from= &to=)"""
+        try:
+            limit = min(max(int(request.args.get('limit', JOBS_PER_PAGE)), 1), MAX_JOBS_PER_PAGE)
+            created_from = parse_date_arg('from')
+            created_to = parse_date_arg('to')
+        except ValueError:
+            return jsonify({'error': 'limit ต้องเป็นตัวเลข และวันที่ต้องอยู่ในรูปแบบ YYYY-MM-DD'}), 400
+        if created_to is not None:
+            # รวมทั้งวันของ to (created_at < วันถัดไป)
+            created_to = (datetime.fromisoformat(created_to) + timedelta(days=1)).date().isoformat()
+
+        jobs, next_cursor = job_store.page_jobs(status=request.args.get('status') or None,
+                                                cursor=request.args.get('cursor') or None,
+                                                limit=limit,
+                                                schedule_time=request.args.get('schedule_time') or None,
+                                                created_from=created_from,
+                                                created_to=created_to)
+
+        response = jsonify({'jobs': [job_summary(job) for job in jobs], 'next_cursor': next_cursor})
+        # ETag จากเนื้อหา - browser ส่ง If-None-Match มาแล้วได้ 304 ถ้าหน้านี้ไม่เปลี่ยน
+        response.add_etag()
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    @app.route('/job/<job_id>')
+    def job_detail(job_id):
+        """รายละเอียด job (render ใหม่เมื่อ job นี้ถูกบันทึกหรือมี log ใหม่เท่านั้น)"""
+        version = fragments.version(job_id)
+        # SSE ของหน้านี้กรองเฉพาะ job นี้ จึงใช้ id ของ event ล่าสุดของ job (เปลี่ยนพร้อม version)
+        # ไม่ใช่ id ล่าสุดของทั้ง bus ซึ่งเปลี่ยนทุก event และจะเก่าทันทีเมื่อหน้านี้ถูกใช้ซ้ำจาก cache
+        last_event_id = fragments.last_event_id(job_id)
+
+        def render():
+            # อ่าน job เฉพาะตอน render (job ที่ถูกลบทำให้ version เปลี่ยน หน้าเดิมใน cache จึงไม่ถูกใช้อีก)
+            job = job_store.get_job(job_id)
+            if not job:
+                abort(Response("Job not found", 404))
+
+            # ดึง logs ของ job นี้ (ใช้ index ตาม job_id)
+            job_specific_logs = job_store.get_logs(job_id)
+            return render_template('job_detail.html', job=job, logs=job_specific_logs,
+                                   last_event_id=last_event_id)
+
+        return page_response(fragments, ('job_detail', job_id, version), render)
+
+    @app.route('/logs')
+    def logs_page():
+        """หน้า logs (แสดง 100 entries ล่าสุด)"""
+        return page_response(fragments, ('logs', fragments.generation),
+                             lambda: render_template('logs.html', logs=job_store.recent_logs(100)))
+
+    @app.route('/api/job_status/<job_id>')
+    def job_status_api(job_id):
+        """API สำหรับเช็คสถานะ job"""
+        job = job_store.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+
+        return jsonify({
+            'id': job.id,
+            'status': job.status,
+            'last_run': job.last_run,
+            'video_url': job.video_url,
+            'tiktok_url': job.tiktok_url,
+            'error_message': job.error_message
+        })
+
+    @app.route('/api/events')
+    def events_stream():
+        """Server-Sent Events: การเปลี่ยนสถานะ job และ logs ใหม่ (กรองด้วย ?job_id= และ ?types=job,log ได้)"""
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        types = request.args.get('types')
+        sub = event_bus.subscribe(job_id=request.args.get('job_id'),
+                                  event_types=set(types.split(',')) if types else None,
+                                  last_event_id=int(last_event_id) if last_event_id and last_event_id.isdigit() else None)
+        return Response(event_bus.stream(sub), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/artifacts/<name>')
+    def artifact_file(name):
+        """ไฟล์จาก artifact store (เนื้อหาไม่เปลี่ยนตาม digest จึง cache ได้ตลอด, รองรับ Range สำหรับ <video>)"""
+        valid = artifact_path is not None and re.fullmatch(r'[0-9a-f]{64}', name)
+        path = artifact_path(name) if valid else None
+        if path is None:
+            abort(404)
+        response = send_file(path, conditional=True, max_age=365 * 24 * 3600)
+        response.cache_control.immutable = True
+        return response
+
+    return fragments
+
+
+def control_endpoint_url(error, endpoint: str, values: Dict) -> Optional[str]:
+    """url_for() ของ endpoint ที่อยู่ใน app.py เท่านั้น - คืน path ตรงๆ (None = ให้ Flask raise ตามปกติ)"""
+    return CONTROL_ENDPOINTS.get(endpoint)
+
+
+def create_dashboard_app() -> Flask:
+    """Flask app ของ replica แบบอ่านอย่างเดียว"""
+    if JOB_STORE_BACKEND != 'sqlite':
+        raise SystemExit('dashboard.py ต้องใช้ JOB_STORE_BACKEND=sqlite (อ่าน jobs ที่ process อื่นเขียนไว้)')
+    app = Flask(__name__)
+    job_store = create_job_store(JOB_STORE_BACKEND, JOB_STORE_PATH, LOG_BUFFER_CAPACITY, LOG_PER_JOB_QUOTA)
+    event_bus = EventBus(history=EVENT_HISTORY)
+    # jobs ถูกรันใน process อื่นเสมอ จึงอ่านการเปลี่ยนแปลงจาก job store
+    bridge = StoreEventBridge(event_bus, job_store, lambda job: job_event_data(job, job_store))
+    # อ่านไฟล์จาก disk ตรงๆ - replica ไม่ถือ index / ไม่ evict ไฟล์ของ app.py
+    register_status_routes(app, job_store, event_bus, bridge, lambda digest: locate(ARTIFACT_STORE_DIR, digest))
+    app.url_build_error_handlers.append(control_endpoint_url)
+    return app
+
+
+if __name__ == '__main__':
+    create_dashboard_app().run(port=WEB_PORT, threaded=True)
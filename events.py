@@ -0,0 +1,131 @@
+"""Event bus สำหรับส่งการเปลี่ยนแปลงของ jobs และ logs ไปยังหน้าเว็บแบบ Server-Sent Events"""
+import json
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+
+class Subscription:
+    """ผู้ฟัง 1 ราย (1 connection ของ browser) - ถ้าอ่านไม่ทันจนคิวเต็มจะถูกตัดออก"""
+
+    def __init__(self, job_id: Optional[str], event_types: Optional[Set[str]], maxsize: int):
+        self.job_id = job_id
+        self.event_types = event_types
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def wants(self, event: Dict) -> bool:
+        if self.event_types is not None and event['type'] not in self.event_types:
+            return False
+        return self.job_id is None or event['job_id'] == self.job_id
+
+
+class EventBus:
+    """Fan-out events ไปยังทุก subscription และเก็บ events ล่าสุดไว้ replay เมื่อ reconnect (Last-Event-ID)"""
+
+    def __init__(self, history: int = 500, subscriber_queue_size: int = 1000):
+        self.subscriber_queue_size = subscriber_queue_size
+        self._history = deque(maxlen=history)
+        self._subscribers: List[Subscription] = []
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, data: Dict, job_id: Optional[str] = None):
+        with self._lock:
+            self._seq += 1
+            event = {'id': self._seq, 'type': event_type, 'job_id': job_id, 'data': data}
+            self._history.append(event)
+            for sub in list(self._subscribers):
+                if not sub.wants(event):
+                    continue
+                try:
+                    sub.queue.put_nowait(event)
+                except queue.Full:
+                    # client ช้าเกินไป - ตัดทิ้งแล้วให้ browser reconnect มาเอา state ใหม่
+                    sub.overflowed = True
+                    self._subscribers.remove(sub)
+        for listener in self._listeners:
+            listener(event)
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """เรียก listener(event) ทุกครั้งที่ publish ใน thread ที่ publish (ต้องทำงานเร็ว เช่นล้าง cache)"""
+        self._listeners.append(listener)
+
+    def subscribe(self, job_id: Optional[str] = None, event_types: Optional[Set[str]] = None,
+                  last_event_id: Optional[int] = None) -> Subscription:
+        sub = Subscription(job_id, event_types, self.subscriber_queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event['id'] > last_event_id and sub.wants(event) and not sub.queue.full():
+                        sub.queue.put_nowait(event)
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def stream(self, sub: Subscription, heartbeat: float = 15.0) -> Iterator[str]:
+        """generator ของข้อความ SSE (ส่ง comment เป็น heartbeat กัน proxy ตัด connection)"""
+        try:
+            yield 'retry: 3000\n\n'
+            while not sub.overflowed:
+                try:
+                    event = sub.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                payload = json.dumps(event['data'], ensure_ascii=False)
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'last_event_id': self._seq}
+
+
+class StoreEventBridge:
+    """ใน worker mode jobs ถูกรันใน process อื่น - thread นี้อ่าน logs / jobs ที่เปลี่ยนจาก job store
+    แล้วส่งเข้า EventBus ของ process เว็บ (เริ่มเมื่อ process เว็บรับ request แรก - before_request ใน dashboard.py)
+
+    ไล่ตาม change_seq ที่ trigger ของ store กำหนดให้ (ไม่ใช้เวลาจากนาฬิกาของแต่ละ process) และ id ของ logs
+    jobs ที่ถูกลบไม่มีในนี้ - ผู้ลบ publish 'job_deleted' เอง
+    """
+
+    def __init__(self, bus: EventBus, store, job_event_data, interval: float = 1.0):
+        self.bus = bus
+        self.store = store
+        self.job_event_data = job_event_data
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            # เริ่มจาก "ตอนนี้" - ของเก่าหน้าเว็บ render ไปแล้ว
+            self._last_log_id = self.store.last_log_id()
+            self._last_change = self.store.last_change_seq()
+            self._thread = threading.Thread(target=self._run, name='store-event-bridge')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                for change_seq, job in self.store.jobs_changed_after(self._last_change):
+                    self._last_change = change_seq
+                    self.bus.publish('job', self.job_event_data(job), job_id=job.id)
+                for entry in self.store.logs_after(self._last_log_id):
+                    self._last_log_id = entry.pop('id')
+                    self.bus.publish('log', entry, job_id=entry['job_id'])
+            except Exception as e:
+                print(f"Error bridging store events: {e}")
+            time.sleep(self.interval)
@@ -0,0 +1,94 @@
+"""Cache ของ HTML ที่ render แล้ว (แถว job, ตารางเวลา, การ์ดสถิติ, ทั้งหน้า) ล้างตาม events ของ EventBus
+
+key ของ fragment ใส่ version ไว้ด้วย: version ของ job เปลี่ยนเมื่อ job นั้นถูกบันทึกหรือมี log ใหม่
+ส่วน generation เปลี่ยนทุก event (ใช้กับ fragment ที่ขึ้นกับทุก job) - ของเก่าไม่ต้องลบ แค่ไม่มีใครขออีกแล้วหลุด LRU ไปเอง
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+GZIP_MIN_BYTES = 1024  # เล็กกว่านี้ไม่คุ้มบีบอัด
+GZIP_LEVEL = 6
+
+
+class FragmentCache:
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> [html, gzip ของ html หรือ None] เรียงจากใช้ล่าสุดน้อยไปมาก
+        self._versions = OrderedDict()  # job id -> (generation, id ของ event) ตอนที่ job เปลี่ยนล่าสุด
+        self._floor = (0, 0)  # ของ job ที่ไม่ได้อยู่ใน _versions (เลื่อนขึ้นเมื่อ _versions ล้น)
+        self._last_event_id = 0
+        self.generation = 0
+        self._boot = os.urandom(4).hex()  # ETag ไม่ชนกับของ process ก่อน restart
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def on_event(self, event: Dict):
+        """listener ของ EventBus: job / log / job_deleted ทำให้ fragment ของ job นั้น (และ generation) เก่า"""
+        self.invalidate(event.get('job_id'), event.get('id'))
+
+    def invalidate(self, job_id: Optional[str] = None, event_id: Optional[int] = None):
+        with self._lock:
+            self.generation += 1
+            if event_id is not None:
+                self._last_event_id = max(self._last_event_id, event_id)
+            if job_id is None:
+                return
+            self._versions[job_id] = (self.generation, self._last_event_id)
+            self._versions.move_to_end(job_id)
+            if len(self._versions) > self.max_entries:
+                self._versions.popitem(last=False)
+                # job ที่หลุดไปได้ version ใหม่ที่มากกว่าของเดิมเสมอ และ events ของมันอยู่ก่อน _last_event_id ทั้งหมด
+                self._floor = (self.generation, self._last_event_id)
+
+    def version(self, job_id: str) -> int:
+        with self._lock:
+            return self._versions.get(job_id, self._floor)[0]
+
+    def last_event_id(self, job_id: str) -> int:
+        """id ของ event ล่าสุดของ job (เปลี่ยนพร้อม version) - หน้าที่ cache ตาม version ใส่ค่านี้ได้โดยไม่เก่า"""
+        with self._lock:
+            return self._versions.get(job_id, self._floor)[1]
+
+    def _lookup(self, key: Hashable, render: Callable[[], str]) -> list:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            self._misses += 1
+        entry = [render(), None]  # render นอก lock (หลาย thread อาจ render key เดียวกันพร้อมกันได้ - ผลเหมือนกัน)
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def fragment(self, key: Hashable, render: Callable[[], str]) -> str:
+        """HTML ของ key (render ครั้งแรกครั้งเดียว)"""
+        return self._lookup(key, render)[0]
+
+    def page(self, key: Hashable, render: Callable[[], str], compress: bool) -> Tuple[bytes, bool]:
+        """เนื้อหาของทั้งหน้า คืน (bytes, บีบอัดแล้วหรือไม่) - เก็บ gzip ไว้ด้วยจะได้บีบครั้งเดียว"""
+        entry = self._lookup(key, render)
+        body = entry[0].encode('utf-8')
+        if not compress or len(body) < GZIP_MIN_BYTES:
+            return body, False
+        if entry[1] is None:
+            entry[1] = gzip.compress(body, GZIP_LEVEL, mtime=0)
+        return entry[1], True
+
+    def etag(self, key: Hashable) -> str:
+        return f'{self._boot}-' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {'entries': len(self._entries), 'generation': self.generation,
+                    'hits': self._hits, 'misses': self._misses,
+                    'hit_rate': round(self._hits / total, 3) if total else None}
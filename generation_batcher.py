@@ -0,0 +1,107 @@
+"""รวมคำขอที่เข้ามาใกล้ๆ กันเป็น micro-batch แล้วส่งไปประมวลผลทีเดียว (ใช้รวม prompts หลาย job ไว้ใน Gemini request เดียว)"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class MicroBatcher:
+    """รวม items เป็น batch เมื่อครบ max_batch_size หรือเมื่อ item แรกรอครบ max_wait วินาที
+
+    process_batch(items) ต้องคืน list ผลลัพธ์ที่ยาวเท่ากับ items (ตำแหน่งเดียวกัน)
+    ถ้า process_batch raise ทุก item ใน batch นั้นจะได้ exception เดียวกัน
+    """
+
+    def __init__(self, process_batch: Callable[[List], List], max_batch_size: int = 8,
+                 max_wait: float = 0.5, workers: int = 1, name: str = 'batcher'):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.workers = workers
+        self.name = name
+        self._pending: List = []  # (item, future, เวลาที่เข้ามา)
+        self._cond = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread = None
+        self._stopping = False
+        self._batches = 0
+        self._items = 0
+        self._in_flight = 0
+
+    def submit(self, item) -> Future:
+        """ส่ง item เข้า batch ถัดไป - คืน Future ของผลลัพธ์ของ item นี้"""
+        self.start()
+        future = Future()
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError(f'{self.name} หยุดทำงานแล้ว')
+            self._pending.append((item, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            self._thread = threading.Thread(target=self._collect, name=f'{self.name}-collector')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """ส่ง items ที่ค้างอยู่ออกไปให้หมดแล้วหยุด"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread, executor = self._thread, self._executor
+        if thread is not None:
+            thread.join(timeout)
+            executor.shutdown(wait=True)
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # รอจนเต็ม batch หรือ item แรกรอครบ max_wait (ตอนหยุดทำงานส่งเลยไม่ต้องรอ)
+                deadline = self._pending[0][2] + self.max_wait
+                while len(self._pending) < self.max_batch_size and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                self._batches += 1
+                self._items += len(batch)
+                self._in_flight += 1
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List):
+        try:
+            results = self.process_batch([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f'ได้ผลลัพธ์ {len(results)} รายการ แต่ส่งไป {len(batch)} รายการ')
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'pending': len(self._pending),
+                'in_flight_batches': self._in_flight,
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': round(self._items / self._batches, 2) if self._batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait': self.max_wait
+            }
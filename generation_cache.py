@@ -0,0 +1,115 @@
+"""Cache ผลการสร้างวิดีโอบน disk (content-addressed ด้วย hash ของ prompt + model parameters)"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def normalize_prompt(prompt: str) -> str:
+    """ทำให้ prompt ที่ต่างกันแค่ช่องว่าง/ตัวพิมพ์ได้ key เดียวกัน"""
+    return re.sub(r'\s+', ' ', prompt).strip().casefold()
+
+
+class GenerationCache:
+    """LRU cache บน disk จำกัดทั้งขนาดรวมและอายุ (TTL) พร้อมสถิติ hit rate"""
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._index = OrderedDict()  # key -> (size, created_at) เรียงจากใช้ล่าสุดน้อยไปมาก
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key_for(optimized_prompt: str, params: Dict) -> str:
+        payload = json.dumps({'prompt': normalize_prompt(optimized_prompt), 'params': params}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def _load_index(self):
+        """สร้าง index จากไฟล์ที่มีอยู่ (mtime = เวลาที่สร้าง, ลำดับ LRU หลัง restart จะเริ่มจากเก่าไปใหม่)"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        for created_at, key, size in sorted(entries):
+            self._index[key] = (size, created_at)
+            self._total_bytes += size
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if time.time() - entry[1] > self.ttl_seconds:
+                self._remove(key)
+                self._misses += 1
+                return None
+            self._index.move_to_end(key)
+            self._hits += 1
+
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._remove(key)
+            return None
+
+    def put(self, key: str, data: Dict):
+        """เขียนแบบ atomic (เขียนไฟล์ชั่วคราวแล้ว rename) แล้ว evict ตาม LRU ถ้าเกินขนาด"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            if key in self._index:
+                self._total_bytes -= self._index.pop(key)[0]
+            self._index[key] = (size, time.time())
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._index) > 1:
+                self._remove(next(iter(self._index)))
+                self._evictions += 1
+
+    def _remove(self, key: str):
+        """ต้องถือ lock อยู่แล้ว"""
+        size, _ = self._index.pop(key)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0
+            }
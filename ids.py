@@ -0,0 +1,62 @@
+"""สร้าง job id แบบ ULID: เรียงตามเวลาได้, ไม่ชนกัน และเพิ่มขึ้นเสมอภายใน process เดียวกัน"""
+import hashlib
+import os
+import threading
+import time
+
+# Crockford base32 (ไม่มี I L O U) - เรียงตามตัวอักษรแล้วได้ลำดับเดียวกับตัวเลข
+ENCODING = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+RANDOM_BITS = 80
+RANDOM_MAX = (1 << RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ENCODING[index])
+    return ''.join(reversed(chars))
+
+
+def _format(timestamp_ms: int, random_part: int) -> str:
+    return _encode(timestamp_ms, 10) + _encode(random_part, 16)
+
+
+def new_id() -> str:
+    """ULID 26 ตัวอักษร (48 bit เวลาเป็น ms + 80 bit สุ่ม)
+
+    ถ้าสร้างหลายตัวใน ms เดียวกัน จะบวกส่วนสุ่มทีละ 1 เพื่อให้เรียงตามลำดับที่สร้าง
+    """
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms:
+            # ms เดิม (หรือนาฬิกาถอยหลัง): ใช้เวลาเดิมแล้วเลื่อนส่วนสุ่ม
+            now_ms = _last_ms
+            _last_random += 1
+            if _last_random > RANDOM_MAX:
+                now_ms += 1
+                _last_random = int.from_bytes(os.urandom(10), 'big') >> 1
+        else:
+            # เว้นครึ่งบนไว้ให้บวกต่อได้โดยไม่ล้น
+            _last_random = int.from_bytes(os.urandom(10), 'big') >> 1
+        _last_ms = now_ms
+        return _format(now_ms, _last_random)
+
+
+def id_for(timestamp: float, seed: str) -> str:
+    """ULID ที่คำนวณได้ซ้ำ (เวลา + seed เดียวกัน = id เดียวกัน) ใช้กับงานที่ต้องไม่ถูกสร้างซ้ำ เช่น daily slot"""
+    digest = hashlib.sha256(seed.encode('utf-8')).digest()
+    return _format(int(timestamp * 1000), int.from_bytes(digest[:10], 'big'))
+
+
+def id_timestamp(job_id: str) -> float:
+    """เวลาที่ฝังอยู่ใน ULID (วินาที)"""
+    value = 0
+    for char in job_id[:10]:
+        value = value * 32 + ENCODING.index(char)
+    return value / 1000.0
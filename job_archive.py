@@ -0,0 +1,124 @@
+"""ที่เก็บ jobs ที่จบแล้ว (completed / failed / partial_success) ใน segment ไฟล์แบบ append-only ที่บีบอัดแล้ว
+
+แต่ละ record = zlib(JSON ของ job) ต่อท้ายไฟล์เรื่อยๆ ในหน่วยความจำเหลือแค่ id -> (offset, ความยาว)
+ของ record ล่าสุด และอ่าน/คลาย record เฉพาะตอนที่มีคนขอ job นั้น (หน้า job detail, แบ่งหน้า ฯลฯ)
+record ที่ถูกแทนหรือลบแล้วจะถูกตัดทิ้งตอน compact เมื่อกินพื้นที่เกินครึ่งของไฟล์
+
+ใช้กับ MemoryJobStore เท่านั้น (JOB_STORE_BACKEND=memory) - SQLite backend ซึ่งเป็นค่าเริ่มต้นเก็บ jobs
+ทั้งหมดบนดิสก์อยู่แล้ว ไม่ได้ถือ jobs ที่จบแล้วไว้ใน RAM จึงไม่มี archive
+"""
+import json
+import os
+import tempfile
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+
+from models import Job, job_from_dict, job_to_dict
+
+# preset dictionary ของ zlib: ชื่อ field / ค่าที่ทุก record มีเหมือนกัน - record ขนาดไม่กี่ร้อย bytes
+# จึงบีบอัดได้ดีแม้บีบทีละ job (เปลี่ยนแล้วอ่าน segment เดิมไม่ได้ แต่ segment อยู่แค่ใน process เดียว)
+ZDICT = json.dumps({
+    'id': '', 'name': 'Auto ASMR', 'prompt': 'auto', 'schedule_time': 'manual', 'status': 'completed',
+    'created_at': '2025-01-01T00:00:00.000000', 'last_run': '2025-01-01T00:00:00.000000',
+    'video_url': 'https://storage.googleapis.com/asmr_videos/video_.mp4',
+    'tiktok_url': 'https://www.tiktok.com/@/video/', 'error_message': '', 'use_cache': True,
+    'account': 'default', 'prompt_key': 'glass_fruits:creative_materials:satisfying_textures:',
+    'video_data': {'video_url': '', 'duration': 10, 'format': 'mp4', 'resolution': '1080x1920',
+                   'audio_included': True, 'generated_at': '', 'video_artifact': '', 'thumbnail_artifact': '',
+                   'file_path': '', 'thumbnail_path': '', 'thumbnail_url': ''},
+    'caption': '#ASMR #satisfying #oddlysatisfying #asmrvideo #relaxing #fyp #foryou #viral',
+    'publish_id': 'v_pub_file~'
+}, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'partial_success failed'
+
+
+class JobArchive:
+    """segment เป็นไฟล์ชั่วคราว (ลบเองเมื่อ process จบ) - ใช้คู่กับ memory store ที่ไม่เก็บข้อมูลข้าม restart"""
+
+    def __init__(self, directory: Optional[str] = None, level: int = 6,
+                 compact_min_bytes: int = 4 * 1024 * 1024):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory or None
+        self.level = level
+        self.compact_min_bytes = compact_min_bytes
+        self._file = tempfile.TemporaryFile(prefix='jobs-archive-', dir=self.directory)
+        self._index: Dict[str, Tuple[int, int]] = {}  # job id -> (offset, ความยาว)
+        self._end = 0
+        self._dead_bytes = 0
+        self._raw_bytes = 0      # ขนาด JSON ก่อนบีบอัดของทุก record ที่เคยเขียน (เทียบกับ _written)
+        self._written = 0
+        self._compactions = 0
+        self._lock = threading.Lock()
+
+    def put(self, job: Job):
+        """เพิ่ม/แทน record ของ job (ต่อท้าย segment เสมอ)"""
+        raw = json.dumps(job_to_dict(job), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        compressor = zlib.compressobj(self.level, zdict=ZDICT)
+        record = compressor.compress(raw) + compressor.flush()
+        with self._lock:
+            os.pwrite(self._file.fileno(), record, self._end)
+            old = self._index.get(job.id)
+            if old is not None:
+                self._dead_bytes += old[1]
+            self._index[job.id] = (self._end, len(record))
+            self._end += len(record)
+            self._raw_bytes += len(raw)
+            self._written += len(record)
+            self._maybe_compact()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """อ่าน job จาก segment (คืน object ใหม่ทุกครั้ง - แก้ไขแล้วต้อง put กลับ)"""
+        with self._lock:
+            location = self._index.get(job_id)
+            if location is None:
+                return None
+            offset, length = location
+            record = os.pread(self._file.fileno(), length, offset)
+        decompressor = zlib.decompressobj(zdict=ZDICT)
+        return job_from_dict(json.loads(decompressor.decompress(record) + decompressor.flush()))
+
+    def discard(self, job_id: str) -> bool:
+        with self._lock:
+            location = self._index.pop(job_id, None)
+            if location is None:
+                return False
+            self._dead_bytes += location[1]
+            self._maybe_compact()
+            return True
+
+    def _maybe_compact(self):
+        """ต้องถือ lock อยู่แล้ว - เขียน segment ใหม่เฉพาะ record ที่ยังใช้ เมื่อ record ที่ตายแล้วเกินครึ่งไฟล์"""
+        if self._end < self.compact_min_bytes or self._dead_bytes * 2 < self._end:
+            return
+        source = self._file.fileno()
+        compacted = tempfile.TemporaryFile(prefix='jobs-archive-', dir=self.directory)
+        index, end = {}, 0
+        for job_id, (offset, length) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            os.pwrite(compacted.fileno(), os.pread(source, length, offset), end)
+            index[job_id] = (end, length)
+            end += length
+        self._file.close()
+        self._file, self._index, self._end = compacted, index, end
+        self._dead_bytes = 0
+        self._compactions += 1
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'jobs': len(self._index),
+                'segment_bytes': self._end,
+                'dead_bytes': self._dead_bytes,
+                'compression_ratio': round(self._raw_bytes / max(1, self._written), 2),
+                'compactions': self._compactions
+            }
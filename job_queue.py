@@ -0,0 +1,320 @@
+"""ระบบคิวงานและ pipeline แบบหลาย stage สำหรับรัน video jobs"""
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+# ระดับความสำคัญ (ตัวเลขน้อย = รันก่อน)
+PRIORITY_HIGH = 0      # daily / scheduled jobs
+PRIORITY_NORMAL = 5    # manual jobs
+PRIORITY_LOW = 10      # mass batch jobs
+
+
+class QueueFullError(Exception):
+    """คิวเต็ม (รวมคิวสำรองแล้ว) ไม่สามารถรับงานเพิ่มได้"""
+
+
+class JobQueue:
+    """Priority queue แบบจำกัดขนาด พร้อม backpressure และสถิติ"""
+
+    def __init__(self, maxsize: int = 100, max_deferred: int = 0, stats_window: int = 500):
+        self.maxsize = maxsize
+        self.max_deferred = max_deferred
+        self._heap = []
+        self._deferred = deque()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._wait_times = deque(maxlen=stats_window)
+        self._submitted = 0
+        self._rejected = 0
+        self._dispatched = 0
+
+    def put(self, job, priority: int = PRIORITY_NORMAL):
+        """เพิ่มงานเข้าคิว - ถ้าคิวหลักเต็มจะพักไว้ในคิวสำรอง ถ้าเต็มทั้งคู่จะ raise QueueFullError"""
+        with self._cond:
+            entry = (priority, next(self._seq), time.monotonic(), job)
+            if len(self._heap) < self.maxsize:
+                heapq.heappush(self._heap, entry)
+                self._cond.notify()
+            elif len(self._deferred) < self.max_deferred:
+                self._deferred.append(entry)
+            else:
+                self._rejected += 1
+                raise QueueFullError(f'คิวเต็ม ({self.maxsize} งาน + รอ {self.max_deferred} งาน)')
+            self._submitted += 1
+
+    def get(self, timeout: Optional[float] = None):
+        """ดึงงานที่สำคัญที่สุดออกจากคิว คืน None ถ้าหมดเวลารอ"""
+        with self._cond:
+            if not self._heap:
+                self._cond.wait(timeout)
+                if not self._heap:
+                    return None
+            _, _, enqueued_at, job = heapq.heappop(self._heap)
+
+            # ย้ายงานจากคิวสำรองเข้าคิวหลักเมื่อมีที่ว่าง
+            if self._deferred:
+                heapq.heappush(self._heap, self._deferred.popleft())
+
+            self._wait_times.append(time.monotonic() - enqueued_at)
+            self._dispatched += 1
+            return job
+
+    def free_slots(self) -> int:
+        """จำนวนงานที่ยังรับเพิ่มได้ก่อนถูกปฏิเสธ"""
+        with self._cond:
+            return (self.maxsize - len(self._heap)) + (self.max_deferred - len(self._deferred))
+
+    def __len__(self):
+        with self._cond:
+            return len(self._heap) + len(self._deferred)
+
+    def stats(self) -> Dict:
+        """สถิติความลึกคิวและเวลารอ"""
+        with self._cond:
+            waits = sorted(self._wait_times)
+            return {
+                'depth': len(self._heap),
+                'deferred': len(self._deferred),
+                'maxsize': self.maxsize,
+                'max_deferred': self.max_deferred,
+                'submitted': self._submitted,
+                'dispatched': self._dispatched,
+                'rejected': self._rejected,
+                'wait_avg_s': round(sum(waits) / len(waits), 3) if waits else 0.0,
+                'wait_p95_s': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                'wait_max_s': round(waits[-1], 3) if waits else 0.0
+            }
+
+
+class StoreJobQueue:
+    """คิวฝั่งเว็บใน worker mode: แค่ใส่ job id ลงคิวกลางใน job store ให้ worker processes มาจอง"""
+
+    def __init__(self, store, maxsize: int = 100):
+        self.store = store
+        self.maxsize = maxsize
+        self._submitted = 0
+        self._rejected = 0
+
+    def put(self, job, priority: int = PRIORITY_NORMAL):
+        if self.store.queue_depth()['pending'] >= self.maxsize:
+            self._rejected += 1
+            raise QueueFullError(f'คิวกลางเต็ม ({self.maxsize} งาน) - ลองใหม่ภายหลัง')
+        self.store.enqueue(job.id, priority)
+        self._submitted += 1
+
+    def free_slots(self) -> int:
+        return max(0, self.maxsize - self.store.queue_depth()['pending'])
+
+    def __len__(self):
+        return self.store.queue_depth()['pending']
+
+    def stats(self) -> Dict:
+        return {**self.store.queue_depth(), 'maxsize': self.maxsize,
+                'submitted': self._submitted, 'rejected': self._rejected}
+
+
+class LeasedJobSource:
+    """แหล่งงานของ JobPipeline ใน worker process: จอง job จากคิวกลางด้วย lease แล้วต่ออายุเป็นระยะ
+
+    ถ้า worker ตาย lease จะหมดอายุและ worker ตัวอื่นจองต่อได้ (รันต่อจาก checkpoint)
+    ถ้า lease หลุดมือ (เช่น heartbeat ไม่ทัน) owns() จะคืน False เพื่อให้หยุดก่อนอัปโหลดซ้ำ
+    """
+
+    def __init__(self, store, load_job: Callable, owner: str, lease_seconds: float = 60.0,
+                 poll_interval: float = 1.0, max_attempts: int = 3,
+                 on_exhausted: Optional[Callable] = None):
+        self.store = store
+        self.load_job = load_job
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.on_exhausted = on_exhausted
+        self._held = set()
+        self._claimed = 0
+        self._lost = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name=f'{owner}-heartbeat')
+        self._heartbeat.daemon = True
+        self._heartbeat.start()
+
+    def get(self, timeout: Optional[float] = None):
+        """interface เดียวกับ JobQueue.get() - คืน job หรือ None ถ้ายังไม่มีงาน"""
+        if self._stopping.is_set():
+            return None
+        claimed = self.store.claim(self.owner, self.lease_seconds)
+        if claimed is None:
+            self._stopping.wait(min(timeout or self.poll_interval, self.poll_interval))
+            return None
+        job_id, attempts = claimed
+        job = self.load_job(job_id)
+        if job is None or attempts > self.max_attempts:
+            # job ถูกลบ หรือทำให้ worker ตายซ้ำหลายรอบแล้ว
+            if job is not None and self.on_exhausted:
+                self.on_exhausted(job, attempts - 1)
+            self.store.complete(job_id, self.owner)
+            return None
+        with self._lock:
+            self._held.add(job_id)
+            self._claimed += 1
+        return job
+
+    def owns(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._held
+
+    def release(self, job_id: str):
+        """ทำเสร็จแล้ว: เอาออกจากคิวกลาง (ถ้า lease ยังเป็นของเรา)"""
+        with self._lock:
+            held = job_id in self._held
+            self._held.discard(job_id)
+        if held:
+            self.store.complete(job_id, self.owner)
+
+    def _heartbeat_loop(self):
+        while not self._stopping.wait(self.lease_seconds / 3):
+            with self._lock:
+                held = list(self._held)
+            for job_id in held:
+                try:
+                    renewed = self.store.renew_lease(job_id, self.owner, self.lease_seconds)
+                except Exception as e:
+                    print(f"Error renewing lease of {job_id}: {e}")
+                    continue
+                if not renewed:
+                    with self._lock:
+                        self._held.discard(job_id)
+                        self._lost += 1
+
+    def stop(self):
+        self._stopping.set()
+
+    def __len__(self):
+        return self.store.queue_depth()['pending']
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'owner': self.owner, 'held': len(self._held), 'claimed': self._claimed,
+                    'lost_leases': self._lost, **self.store.queue_depth()}
+
+
+class Stage:
+    """หนึ่งขั้นตอนของ pipeline: handler(job, ctx) -> bool และจำนวน worker ของขั้นตอนนี้
+
+    handoff: คิวรับงานจาก stage ก่อนหน้าแบบกำหนดเอง (put / get(timeout) / qsize เหมือน queue.Queue)
+    เช่น accounts.FairDispatcher - ไม่ระบุ = queue.Queue ขนาด queue_size
+    """
+
+    def __init__(self, name: str, handler: Callable, workers: int = 1, queue_size: int = 10,
+                 handoff=None):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.handoff = handoff
+
+
+class JobPipeline:
+    """Pipeline หลาย stage - แต่ละ stage มี worker threads ของตัวเอง และส่งงานต่อกันผ่านคิวจำกัดขนาด
+
+    stage แรกดึงงานจาก JobQueue (priority) ส่วน stage ถัดไปรับงานผ่าน hand-off queue
+    ถ้า hand-off queue เต็ม stage ก่อนหน้าจะรอ (backpressure) ทำให้ throughput
+    ถูกจำกัดด้วย stage ที่ช้าที่สุด แทนที่จะเป็นผลรวมของทุก stage
+    """
+
+    def __init__(self, job_queue: JobQueue, stages: List[Stage],
+                 on_error: Optional[Callable] = None, on_done: Optional[Callable] = None,
+                 name: str = 'pipeline'):
+        self.job_queue = job_queue
+        self.stages = stages
+        self.on_error = on_error
+        self.on_done = on_done
+        self.name = name
+        # hand-off queue ของ stage ที่ 2 เป็นต้นไป
+        self._handoff = [None] + [stage.handoff if stage.handoff is not None else queue.Queue(maxsize=stage.queue_size)
+                                  for stage in stages[1:]]
+        self._active = {stage.name: 0 for stage in stages}
+        self._processed = {stage.name: 0 for stage in stages}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        """เริ่ม worker threads ของทุก stage (เรียกซ้ำได้ไม่มีผล)"""
+        with self._lock:
+            if self._threads:
+                return
+            for index, stage in enumerate(self.stages):
+                for i in range(stage.workers):
+                    thread = threading.Thread(target=self._run, args=(index,),
+                                              name=f'{self.name}-{stage.name}-{i}')
+                    thread.daemon = True
+                    thread.start()
+                    self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _next_item(self, index: int):
+        if index == 0:
+            job = self.job_queue.get(timeout=1.0)
+            return (job, {}) if job is not None else None
+        try:
+            return self._handoff[index].get(timeout=1.0)
+        except queue.Empty:
+            return None
+
+    def _run(self, index: int):
+        stage = self.stages[index]
+        is_last = index == len(self.stages) - 1
+
+        while not self._stopping.is_set():
+            item = self._next_item(index)
+            if item is None:
+                continue
+            job, ctx = item
+
+            with self._lock:
+                self._active[stage.name] += 1
+            try:
+                passed = stage.handler(job, ctx)
+            except Exception as e:
+                passed = False
+                if self.on_error:
+                    self.on_error(job, e)
+                else:
+                    print(f"Error in stage {stage.name}: {e}")
+            finally:
+                with self._lock:
+                    self._active[stage.name] -= 1
+                    self._processed[stage.name] += 1
+
+            if passed and not is_last:
+                # รอจนกว่า stage ถัดไปมีที่ว่าง (backpressure)
+                self._handoff[index + 1].put((job, ctx))
+            elif self.on_done:
+                try:
+                    self.on_done(job, ctx)
+                except Exception as e:
+                    print(f"Error finishing job in stage {stage.name}: {e}")
+
+    def stats(self) -> Dict:
+        """สถานะของแต่ละ stage: worker ที่ทำงานอยู่ และงานที่รอใน hand-off queue"""
+        with self._lock:
+            return {
+                stage.name: {
+                    'workers': stage.workers,
+                    'active': self._active[stage.name],
+                    'processed': self._processed[stage.name],
+                    'waiting': len(self.job_queue) if index == 0 else self._handoff[index].qsize()
+                }
+                for index, stage in enumerate(self.stages)
+            }
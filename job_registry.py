@@ -0,0 +1,120 @@
+"""Registry ของ jobs ในหน่วยความจำ: lookup ด้วย id แบบ O(1) และ index แยกตามสถานะสำหรับแบ่งหน้าแบบ cursor"""
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+from job_archive import JobArchive
+from models import Job
+
+SortKey = Tuple[str, str]  # (created_at, id) - เรียงจากเก่าไปใหม่
+
+
+def sort_key(job: Job) -> SortKey:
+    return job.created_at, job.id
+
+
+class JobRegistry:
+    """เก็บ jobs เรียงตาม (created_at, id) ทั้งแบบรวมและแยกตามสถานะ
+
+    get() อ่าน dict ตรงๆ ไม่ต้องรอ lock ส่วนการเขียนและการแบ่งหน้าถือ lock สั้นๆ
+    job ใหม่ (ULID) ต่อท้าย list เสมอ การเพิ่มจึงแทบเป็น O(1) และอ่านหน้าละ k รายการใน O(log n + k)
+    ถ้ามี archive: job ที่จบแล้วเหลือแค่ index ในหน่วยความจำ ตัว job ย้ายไปอยู่ใน archive (อ่านเมื่อถูกขอ)
+    """
+
+    def __init__(self, archive: Optional[JobArchive] = None):
+        self._archive = archive
+        self._jobs: Dict[str, Job] = {}  # เฉพาะ jobs ที่ยังไม่จบ (หรือทุก job ถ้าไม่มี archive)
+        self._index: Dict[str, Tuple[SortKey, str]] = {}  # id -> (sort key, สถานะที่ index ไว้)
+        self._order: List[SortKey] = []
+        self._by_status: Dict[str, List[SortKey]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None and self._archive is not None:
+            return self._archive.get(job_id)
+        return job
+
+    def put(self, job: Job):
+        """เพิ่มหรืออัปเดต job (ย้าย bucket ถ้าสถานะเปลี่ยน)"""
+        with self._lock:
+            indexed = self._index.get(job.id)
+            if indexed is None:
+                key = sort_key(job)
+                insort(self._order, key)
+                insort(self._by_status.setdefault(job.status, []), key)
+            else:
+                key, old_status = indexed
+                if old_status != job.status:
+                    self._discard(self._by_status[old_status], key)
+                    insort(self._by_status.setdefault(job.status, []), key)
+            self._index[job.id] = (key, job.status)
+            # เขียนที่ใหม่ก่อนแล้วค่อยเอาออกจากที่เดิม get() ที่ไม่ถือ lock จึงเจอ job เสมอ
+            if self._archive is not None and job.is_terminal:
+                self._archive.put(job)
+                self._jobs.pop(job.id, None)
+            else:
+                self._jobs[job.id] = job
+                if self._archive is not None:
+                    self._archive.discard(job.id)
+
+    def remove(self, job_id: str) -> bool:
+        with self._lock:
+            indexed = self._index.pop(job_id, None)
+            if indexed is None:
+                return False
+            key, status = indexed
+            self._discard(self._order, key)
+            self._discard(self._by_status[status], key)
+            if self._jobs.pop(job_id, None) is None and self._archive is not None:
+                self._archive.discard(job_id)
+            return True
+
+    @staticmethod
+    def _discard(keys: List[SortKey], key: SortKey):
+        position = bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            del keys[position]
+
+    def page(self, status: Optional[str] = None, before: Optional[SortKey] = None,
+             limit: int = 50, offset: int = 0, after: Optional[SortKey] = None,
+             where: Optional[Callable[[Job], bool]] = None) -> List[Job]:
+        """jobs เรียงจากใหม่ไปเก่า ในช่วง after <= key < before ข้ามไป offset รายการ
+
+        where กรองเพิ่มเติมแบบไล่ทีละรายการ (ใช้กับ field ที่ไม่มี index)
+        """
+        with self._lock:
+            keys = self._order if status is None else self._by_status.get(status, [])
+            end = bisect_left(keys, before) if before is not None else len(keys)
+            start = bisect_left(keys, after) if after is not None else 0
+            if where is None:
+                end = max(start, end - offset)
+                selected = keys[max(start, end - limit):end]
+                return [self._load(job_id) for _, job_id in reversed(selected)]
+
+            jobs, skipped = [], 0
+            for position in range(end - 1, start - 1, -1):
+                job = self._load(keys[position][1])
+                if not where(job):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                jobs.append(job)
+                if len(jobs) >= limit:
+                    break
+            return jobs
+
+    def _load(self, job_id: str) -> Job:
+        """ต้องถือ lock อยู่แล้ว - job ที่อยู่ใน index (จาก dict หรือ archive)"""
+        job = self._jobs.get(job_id)
+        return job if job is not None else self._archive.get(job_id)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {status: len(keys) for status, keys in self._by_status.items() if keys}
+            counts['total'] = len(self._order)
+            return counts
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,618 @@
+"""Persistence layer สำหรับ jobs และ logs (เลือก backend ได้: memory / sqlite)"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from job_archive import JobArchive
+from job_registry import JobRegistry, sort_key
+from log_buffer import LogRingBuffer
+from models import Job, job_to_dict, job_from_dict
+
+
+def encode_cursor(job: Job) -> str:
+    """cursor = ตำแหน่งของ job สุดท้ายในหน้า (created_at + id ทำให้ไม่ซ้ำและเรียงได้แม้ job ถูกลบไปแล้ว)"""
+    return '|'.join(sort_key(job))
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not cursor or '|' not in cursor:
+        return None
+    created_at, job_id = cursor.split('|', 1)
+    return created_at, job_id
+
+
+class JobStore:
+    """Interface ของ job store - ทุก backend ต้องมี method ชุดนี้"""
+
+    def save_job(self, job: Job):
+        raise NotImplementedError
+
+    def create_job(self, job: Job) -> bool:
+        """บันทึก job ใหม่เฉพาะเมื่อยังไม่มี id นี้ (คืน False ถ้ามีอยู่แล้ว) - ใช้กับ id ที่ต้องไม่ซ้ำ เช่น daily job"""
+        raise NotImplementedError
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        raise NotImplementedError
+
+    def delete_job(self, job_id: str) -> bool:
+        raise NotImplementedError
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Job]:
+        """รายการ jobs เรียงจากใหม่ไปเก่า"""
+        raise NotImplementedError
+
+    def page_jobs(self, status: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50,
+                  schedule_time: Optional[str] = None, created_from: Optional[str] = None,
+                  created_to: Optional[str] = None) -> Tuple[List[Job], Optional[str]]:
+        """แบ่งหน้าแบบ cursor (ใหม่ -> เก่า) คืน (jobs, cursor ของหน้าถัดไป หรือ None ถ้าหมดแล้ว)
+
+        created_from / created_to เป็น ISO string: created_from <= created_at < created_to
+        """
+        raise NotImplementedError
+
+    def count_jobs(self) -> Dict[str, int]:
+        """จำนวน jobs แยกตามสถานะ พร้อม key 'total'"""
+        raise NotImplementedError
+
+    def append_log(self, entry: Dict):
+        raise NotImplementedError
+
+    def get_logs(self, job_id: str, limit: int = 200) -> List[Dict]:
+        """logs ของ job เรียงตามเวลา (เก่า -> ใหม่)"""
+        raise NotImplementedError
+
+    def recent_logs(self, limit: int = 100) -> List[Dict]:
+        """logs ล่าสุดของทุก job เรียงจากใหม่ไปเก่า"""
+        raise NotImplementedError
+
+    # ===== คิวงานร่วมระหว่างหลาย process (worker mode) =====
+
+    def enqueue(self, job_id: str, priority: int) -> bool:
+        """ใส่ job ในคิวกลาง (คืน False ถ้าอยู่ในคิวแล้ว)"""
+        raise NotImplementedError('worker mode ต้องใช้ job store ที่แชร์ข้าม process ได้ (sqlite)')
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Tuple[str, int]]:
+        """จอง job ถัดไป (รวม job ที่ lease หมดอายุ) คืน (job_id, attempts) หรือ None"""
+        raise NotImplementedError('worker mode ต้องใช้ job store ที่แชร์ข้าม process ได้ (sqlite)')
+
+    def renew_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """ต่ออายุ lease - คืน False ถ้า lease ไม่ใช่ของ owner แล้ว"""
+        raise NotImplementedError
+
+    def complete(self, job_id: str, owner: str):
+        """เอา job ออกจากคิวกลางเมื่อทำเสร็จ"""
+        raise NotImplementedError
+
+    def queue_depth(self) -> Dict[str, int]:
+        """จำนวนงานในคิวกลาง: pending (รอ worker) / leased (กำลังทำ)"""
+        raise NotImplementedError
+
+    def logs_after(self, last_id: int, limit: int = 500) -> List[Dict]:
+        """logs ที่มี id มากกว่า last_id (ใช้ส่ง events ข้าม process)"""
+        raise NotImplementedError
+
+    def last_log_id(self) -> int:
+        raise NotImplementedError
+
+    def jobs_changed_after(self, seq: int, limit: int = 500) -> List[Tuple[int, Job]]:
+        """(change_seq, job) ของ jobs ที่ถูกสร้าง/แก้ไขหลังลำดับ seq เรียงตามลำดับการเปลี่ยนแปลง"""
+        raise NotImplementedError
+
+    def last_change_seq(self) -> int:
+        raise NotImplementedError
+
+    # ===== โควตาโพสต์ต่อบัญชี (นับร่วมกันทุก process และไม่หายเมื่อ restart) =====
+
+    def reserve_post(self, account: str, limits: Sequence[Tuple[float, int]], now: Optional[float] = None) -> bool:
+        """บันทึกการโพสต์ 1 ครั้งของบัญชี เฉพาะเมื่อทุก window ยังโพสต์ไม่ครบ (limits = [(วินาที, จำนวนสูงสุด)])"""
+        raise NotImplementedError
+
+    def release_post(self, account: str, posted_at: float):
+        """ลบการโพสต์ที่จองไว้ด้วย reserve_post (posted_at = now ตอนจอง) - อัปโหลดไม่สำเร็จ"""
+        raise NotImplementedError
+
+    def recent_posts(self, account: str, since: float) -> List[float]:
+        """เวลา (epoch) ที่บัญชีโพสต์ตั้งแต่ since เรียงจากเก่าไปใหม่"""
+        raise NotImplementedError
+
+    def archive_stats(self) -> Optional[Dict]:
+        """สถิติของ archive ที่เก็บ jobs ที่จบแล้ว (None = backend นี้ไม่มี archive)"""
+        return None
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """เก็บทุกอย่างใน RAM (ข้อมูลหายเมื่อ restart) - เหมาะกับการทดสอบ
+
+    jobs ที่จบแล้วย้ายไปอยู่ใน archive (ไฟล์ชั่วคราวแบบบีบอัด) ถ้ากำหนดไว้ หน่วยความจำจึงโตตามจำนวน jobs ที่ยังทำงานอยู่
+    """
+
+    def __init__(self, max_logs: int = 1000, per_job_log_quota: int = 200,
+                 archive: Optional[JobArchive] = None):
+        self._archive = archive
+        self._jobs = JobRegistry(archive)
+        self._logs = LogRingBuffer(max_logs, per_job_log_quota)
+        self._posts: Dict[str, deque] = {}  # บัญชี -> เวลาที่โพสต์ (เฉพาะ process นี้)
+        self._lock = threading.Lock()
+
+    def save_job(self, job: Job):
+        self._jobs.put(job)
+
+    def create_job(self, job: Job) -> bool:
+        with self._lock:
+            if self._jobs.get(job.id) is not None:
+                return False
+            self._jobs.put(job)
+            return True
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def delete_job(self, job_id: str) -> bool:
+        return self._jobs.remove(job_id)
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Job]:
+        return self._jobs.page(status, limit=limit, offset=offset)
+
+    def page_jobs(self, status: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50,
+                  schedule_time: Optional[str] = None, created_from: Optional[str] = None,
+                  created_to: Optional[str] = None) -> Tuple[List[Job], Optional[str]]:
+        before = decode_cursor(cursor)
+        if created_to and (before is None or before > (created_to, '')):
+            before = (created_to, '')
+        jobs = self._jobs.page(status, before=before, limit=limit + 1,
+                               after=(created_from, '') if created_from else None,
+                               where=(lambda job: job.schedule_time == schedule_time) if schedule_time else None)
+        return jobs[:limit], encode_cursor(jobs[limit - 1]) if len(jobs) > limit else None
+
+    def count_jobs(self) -> Dict[str, int]:
+        return self._jobs.counts()
+
+    def append_log(self, entry: Dict):
+        self._logs.append(entry)
+
+    def get_logs(self, job_id: str, limit: int = 200) -> List[Dict]:
+        return self._logs.for_job(job_id, limit)
+
+    def recent_logs(self, limit: int = 100) -> List[Dict]:
+        return self._logs.recent(limit)
+
+    def reserve_post(self, account: str, limits: Sequence[Tuple[float, int]], now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            posts = self._posts.setdefault(account, deque())
+            while posts and posts[0] <= now - max(window for window, _ in limits):
+                posts.popleft()
+            if any(sum(1 for posted in posts if posted > now - window) >= limit for window, limit in limits):
+                return False
+            posts.append(now)
+            return True
+
+    def release_post(self, account: str, posted_at: float):
+        with self._lock:
+            try:
+                self._posts.get(account, deque()).remove(posted_at)
+            except ValueError:
+                pass  # หมดอายุออกจาก window ไปแล้ว
+
+    def recent_posts(self, account: str, since: float) -> List[float]:
+        with self._lock:
+            return [posted for posted in self._posts.get(account, ()) if posted > since]
+
+    def archive_stats(self) -> Optional[Dict]:
+        return self._archive.stats() if self._archive is not None else None
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+
+
+class SQLiteJobStore(JobStore):
+    """เก็บ jobs/logs ใน SQLite (WAL mode) พร้อม index และการเขียน log แบบ batch"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        schedule_time TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        data TEXT NOT NULL,
+        change_seq INTEGER
+    );
+    -- (created_at, id) = ลำดับของ cursor pagination
+    DROP INDEX IF EXISTS idx_jobs_status_created;
+    DROP INDEX IF EXISTS idx_jobs_created;
+    CREATE INDEX IF NOT EXISTS idx_jobs_status_page ON jobs(status, created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_jobs_page ON jobs(created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_jobs_schedule ON jobs(schedule_time);
+
+    CREATE TABLE IF NOT EXISTS job_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        level TEXT NOT NULL,
+        message TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_logs_job ON job_logs(job_id, id);
+    CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON job_logs(timestamp);
+
+    -- นับจำนวน jobs ต่อสถานะด้วย trigger เพื่อไม่ต้อง scan ทั้งตาราง
+    CREATE TABLE IF NOT EXISTS job_status_counts (
+        status TEXT PRIMARY KEY,
+        count INTEGER NOT NULL
+    );
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_insert AFTER INSERT ON jobs BEGIN
+        INSERT INTO job_status_counts (status, count) VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_delete AFTER DELETE ON jobs BEGIN
+        UPDATE job_status_counts SET count = count - 1 WHERE status = OLD.status;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_status AFTER UPDATE OF status ON jobs
+    WHEN OLD.status != NEW.status BEGIN
+        UPDATE job_status_counts SET count = count - 1 WHERE status = OLD.status;
+        INSERT INTO job_status_counts (status, count) VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+    END;
+    CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at);
+
+    -- ลำดับการเปลี่ยนแปลงของ jobs (ให้ StoreEventBridge ไล่ตาม): trigger นับต่อจาก counter กลาง
+    -- การเขียนของ SQLite เป็นทีละ transaction จึงเรียงตรงกันทุก process และไม่ซ้ำแม้ row ล่าสุดถูกลบ
+    CREATE TABLE IF NOT EXISTS job_change_seq (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO job_change_seq (id, seq) VALUES (1, 0);
+    CREATE INDEX IF NOT EXISTS idx_jobs_change ON jobs(change_seq);
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_change_insert AFTER INSERT ON jobs BEGIN
+        UPDATE job_change_seq SET seq = seq + 1 WHERE id = 1;
+        UPDATE jobs SET change_seq = (SELECT seq FROM job_change_seq WHERE id = 1) WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_change_update AFTER UPDATE OF status, data ON jobs BEGIN
+        UPDATE job_change_seq SET seq = seq + 1 WHERE id = 1;
+        UPDATE jobs SET change_seq = (SELECT seq FROM job_change_seq WHERE id = 1) WHERE id = NEW.id;
+    END;
+
+    -- คิวกลางของ worker processes: lease_expires_at เป็น NULL = ยังไม่มีใครจอง
+    CREATE TABLE IF NOT EXISTS work_queue (
+        job_id TEXT PRIMARY KEY,
+        priority INTEGER NOT NULL,
+        enqueued_at REAL NOT NULL,
+        lease_owner TEXT,
+        lease_expires_at REAL,
+        attempts INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_work_queue_order ON work_queue(priority, enqueued_at);
+
+    -- โพสต์ของแต่ละบัญชี (โควตารายชั่วโมง/รายวันที่ทุก process ใช้ร่วมกัน) เก็บไว้แค่ window ที่ยาวที่สุด
+    CREATE TABLE IF NOT EXISTS account_posts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account TEXT NOT NULL,
+        posted_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_account_posts ON account_posts(account, posted_at);
+    """
+
+    def __init__(self, path: str, log_batch_size: int = 50, log_flush_interval: float = 1.0):
+        self.path = path
+        self.log_batch_size = log_batch_size
+        self.log_flush_interval = log_flush_interval
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._log_buffer = []
+        self._log_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+        if columns and 'change_seq' not in columns:
+            conn.execute('ALTER TABLE jobs ADD COLUMN change_seq INTEGER')  # database จากเวอร์ชันก่อน
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+
+        # flush logs เป็นระยะใน background
+        self._flusher = threading.Thread(target=self._flush_loop, name='job-store-flusher')
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        """หนึ่ง connection ต่อ thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+        return conn
+
+    def save_job(self, job: Job):
+        data = json.dumps(job_to_dict(job), ensure_ascii=False)
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                """INSERT INTO jobs (id, status, schedule_time, created_at, updated_at, data)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                       status = excluded.status,
+                       schedule_time = excluded.schedule_time,
+                       updated_at = excluded.updated_at,
+                       data = excluded.data""",
+                (job.id, job.status, job.schedule_time, job.created_at, datetime.now().isoformat(), data)
+            )
+            conn.commit()
+
+    def create_job(self, job: Job) -> bool:
+        data = json.dumps(job_to_dict(job), ensure_ascii=False)
+        with self._write_lock:
+            conn = self._conn()
+            cursor = conn.execute(
+                """INSERT OR IGNORE INTO jobs (id, status, schedule_time, created_at, updated_at, data)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (job.id, job.status, job.schedule_time, job.created_at, datetime.now().isoformat(), data)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        row = self._conn().execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return job_from_dict(json.loads(row['data'])) if row else None
+
+    def delete_job(self, job_id: str) -> bool:
+        with self._write_lock:
+            conn = self._conn()
+            cursor = conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            conn.execute('DELETE FROM work_queue WHERE job_id = ?', (job_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Job]:
+        if status:
+            rows = self._conn().execute(
+                'SELECT data FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                (status, limit, offset)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                'SELECT data FROM jobs ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                (limit, offset)
+            ).fetchall()
+        return [job_from_dict(json.loads(row['data'])) for row in rows]
+
+    def page_jobs(self, status: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50,
+                  schedule_time: Optional[str] = None, created_from: Optional[str] = None,
+                  created_to: Optional[str] = None) -> Tuple[List[Job], Optional[str]]:
+        conditions, params = [], []
+        if status:
+            conditions.append('status = ?')
+            params.append(status)
+        if schedule_time:
+            conditions.append('schedule_time = ?')
+            params.append(schedule_time)
+        if created_from:
+            conditions.append('created_at >= ?')
+            params.append(created_from)
+        if created_to:
+            conditions.append('created_at < ?')
+            params.append(created_to)
+        before = decode_cursor(cursor)
+        if before:
+            conditions.append('(created_at < ? OR (created_at = ? AND id < ?))')
+            params.extend([before[0], before[0], before[1]])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self._conn().execute(
+            f'SELECT data FROM jobs {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+            (*params, limit + 1)
+        ).fetchall()
+        jobs = [job_from_dict(json.loads(row['data'])) for row in rows]
+        return jobs[:limit], encode_cursor(jobs[limit - 1]) if len(jobs) > limit else None
+
+    def count_jobs(self) -> Dict[str, int]:
+        rows = self._conn().execute('SELECT status, count FROM job_status_counts WHERE count > 0').fetchall()
+        counts = {row['status']: row['count'] for row in rows}
+        counts['total'] = sum(counts.values())
+        return counts
+
+    def append_log(self, entry: Dict):
+        with self._log_lock:
+            self._log_buffer.append(entry)
+            should_flush = len(self._log_buffer) >= self.log_batch_size
+        if should_flush:
+            self.flush()
+
+    def get_logs(self, job_id: str, limit: int = 200) -> List[Dict]:
+        self.flush()
+        rows = self._conn().execute(
+            """SELECT timestamp, job_id, message, level FROM job_logs
+               WHERE job_id = ? ORDER BY id DESC LIMIT ?""",
+            (job_id, limit)
+        ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def recent_logs(self, limit: int = 100) -> List[Dict]:
+        self.flush()
+        rows = self._conn().execute(
+            'SELECT timestamp, job_id, message, level FROM job_logs ORDER BY id DESC LIMIT ?',
+            (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def enqueue(self, job_id: str, priority: int) -> bool:
+        with self._write_lock:
+            conn = self._conn()
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO work_queue (job_id, priority, enqueued_at) VALUES (?, ?, ?)',
+                (job_id, priority, time.time())
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Tuple[str, int]]:
+        now = time.time()
+        with self._write_lock:
+            conn = self._conn()
+            # BEGIN IMMEDIATE ล็อกการเขียนข้าม process - worker สองตัวจะไม่ได้ job เดียวกัน
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    """SELECT job_id, attempts FROM work_queue
+                       WHERE lease_expires_at IS NULL OR lease_expires_at < ?
+                       ORDER BY priority, enqueued_at LIMIT 1""",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    conn.commit()
+                    return None
+                conn.execute(
+                    """UPDATE work_queue SET lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+                       WHERE job_id = ?""",
+                    (owner, now + lease_seconds, row['job_id'])
+                )
+                conn.commit()
+                return row['job_id'], row['attempts'] + 1
+            except Exception:
+                conn.rollback()
+                raise
+
+    def renew_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        with self._write_lock:
+            conn = self._conn()
+            cursor = conn.execute(
+                'UPDATE work_queue SET lease_expires_at = ? WHERE job_id = ? AND lease_owner = ?',
+                (time.time() + lease_seconds, job_id, owner)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: str, owner: str):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute('DELETE FROM work_queue WHERE job_id = ? AND lease_owner = ?', (job_id, owner))
+            conn.commit()
+
+    def queue_depth(self) -> Dict[str, int]:
+        row = self._conn().execute(
+            """SELECT COUNT(*) AS total,
+                      SUM(CASE WHEN lease_expires_at >= ? THEN 1 ELSE 0 END) AS leased
+               FROM work_queue""",
+            (time.time(),)
+        ).fetchone()
+        leased = row['leased'] or 0
+        return {'pending': row['total'] - leased, 'leased': leased}
+
+    def reserve_post(self, account: str, limits: Sequence[Tuple[float, int]], now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        with self._write_lock:
+            conn = self._conn()
+            # BEGIN IMMEDIATE: นับแล้วบันทึกใน transaction เดียว - หลาย worker จะไม่โพสต์เกินโควตาพร้อมกัน
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM account_posts WHERE account = ? AND posted_at <= ?',
+                             (account, now - max(window for window, _ in limits)))
+                for window, limit in limits:
+                    row = conn.execute(
+                        'SELECT COUNT(*) AS posts FROM account_posts WHERE account = ? AND posted_at > ?',
+                        (account, now - window)
+                    ).fetchone()
+                    if row['posts'] >= limit:
+                        conn.commit()
+                        return False
+                conn.execute('INSERT INTO account_posts (account, posted_at) VALUES (?, ?)', (account, now))
+                conn.commit()
+                return True
+            except Exception:
+                conn.rollback()
+                raise
+
+    def release_post(self, account: str, posted_at: float):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute('DELETE FROM account_posts WHERE id = (SELECT id FROM account_posts '
+                         'WHERE account = ? AND posted_at = ? LIMIT 1)', (account, posted_at))
+            conn.commit()
+
+    def recent_posts(self, account: str, since: float) -> List[float]:
+        rows = self._conn().execute(
+            'SELECT posted_at FROM account_posts WHERE account = ? AND posted_at > ? ORDER BY posted_at',
+            (account, since)
+        ).fetchall()
+        return [row['posted_at'] for row in rows]
+
+    def logs_after(self, last_id: int, limit: int = 500) -> List[Dict]:
+        rows = self._conn().execute(
+            'SELECT id, timestamp, job_id, message, level FROM job_logs WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def last_log_id(self) -> int:
+        self.flush()
+        row = self._conn().execute('SELECT MAX(id) AS last_id FROM job_logs').fetchone()
+        return row['last_id'] or 0
+
+    def jobs_changed_after(self, seq: int, limit: int = 500) -> List[Tuple[int, Job]]:
+        rows = self._conn().execute(
+            'SELECT change_seq, data FROM jobs WHERE change_seq > ? ORDER BY change_seq LIMIT ?',
+            (seq, limit)
+        ).fetchall()
+        return [(row['change_seq'], job_from_dict(json.loads(row['data']))) for row in rows]
+
+    def last_change_seq(self) -> int:
+        return self._conn().execute('SELECT seq FROM job_change_seq WHERE id = 1').fetchone()['seq']
+
+    def flush(self):
+        """เขียน logs ที่ค้างใน buffer ลง database ใน transaction เดียว"""
+        with self._write_lock:
+            with self._log_lock:
+                if not self._log_buffer:
+                    return
+                batch, self._log_buffer = self._log_buffer, []
+
+            conn = self._conn()
+            conn.executemany(
+                'INSERT INTO job_logs (job_id, timestamp, level, message) VALUES (?, ?, ?, ?)',
+                [(e['job_id'], e['timestamp'], e['level'], e['message']) for e in batch]
+            )
+            conn.commit()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.log_flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing job logs: {e}")
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+
+
+def create_job_store(backend: str = 'sqlite', path: str = 'data/jobs.db', max_logs: int = 1000,
+                     per_job_log_quota: int = 200, archive_dir: Optional[str] = None) -> JobStore:
+    """สร้าง job store ตาม backend ที่กำหนด (max_logs / per_job_log_quota / archive_dir ใช้กับ memory backend)
+
+    archive_dir = ที่วาง segment ของ jobs ที่จบแล้ว ('' = temp dir ของระบบ, None = เก็บทุก job ใน RAM)
+    """
+    if backend == 'memory':
+        archive = JobArchive(archive_dir) if archive_dir is not None else None
+        return MemoryJobStore(max_logs, per_job_log_quota, archive)
+    if backend == 'sqlite':
+        return SQLiteJobStore(path)
+    raise ValueError(f'Unknown job store backend: {backend}')
@@ -0,0 +1,48 @@
+"""ค่าที่สร้างเมื่อถูกใช้ครั้งแรก (เช่น client ของ API ภายนอก) - 1 ตัวต่อ process
+
+import module ไม่ต้องจ่ายค่าโหลด SDK / สร้าง client ถ้า process นั้นไม่เคยใช้ และ process ลูกหลัง fork
+(เช่น gunicorn --preload) จะสร้าง client ของตัวเองใหม่ ไม่ใช้ connection ที่สืบทอดมาจาก process แม่
+"""
+import os
+import threading
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class Lazy(Generic[T]):
+    def __init__(self, factory: Callable[[], T], name: str = ''):
+        self.factory = factory
+        self.name = name or getattr(factory, '__name__', 'lazy')
+        self._value: Optional[T] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        """คืนค่าเดิมของ process นี้ (สร้างครั้งแรกภายใต้ lock - หลาย thread เรียกพร้อมกันก็สร้างครั้งเดียว)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._value
+        with self._lock:
+            if self._pid != pid:
+                self._value = self.factory()
+                self._pid = pid
+            return self._value
+
+    def set(self, value: T):
+        """แทนค่าด้วย object ที่สร้างไว้แล้ว (เช่น fake ตอน benchmark)"""
+        with self._lock:
+            self._value = value
+            self._pid = os.getpid()
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._pid = None
+
+    @property
+    def ready(self) -> bool:
+        return self._pid == os.getpid()
+
+    def stats(self) -> Dict:
+        return {'name': self.name, 'ready': self.ready}
@@ -0,0 +1,110 @@
+"""Log buffer ขนาดคงที่ในหน่วยความจำ (มี index ต่อ job) และ sink สำหรับ export logs เป็นไฟล์ JSONL"""
+import json
+import logging
+import queue
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List
+
+
+class LogRingBuffer:
+    """เก็บ logs ล่าสุดไม่เกิน capacity รายการ โดยแต่ละ job ใช้ได้ไม่เกิน per_job_quota
+
+    ทุก operation เป็น O(1) ต่อรายการ: job ที่ log เยอะจะทับ log เก่าของตัวเอง
+    แทนที่จะดัน log ของ job อื่นออกไป, การอ่าน k รายการใช้เวลา O(k)
+    """
+
+    def __init__(self, capacity: int = 1000, per_job_quota: int = 200):
+        self.capacity = capacity
+        self.per_job_quota = max(1, min(per_job_quota, capacity))
+        self._entries = OrderedDict()  # seq -> entry เรียงจากเก่าไปใหม่
+        self._by_job: Dict[str, deque] = {}  # job_id -> seq ของ logs ที่ยังอยู่ใน buffer
+        self._seq = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def append(self, entry: Dict):
+        job_id = entry.get('job_id')
+        with self._lock:
+            self._seq += 1
+            job_seqs = self._by_job.setdefault(job_id, deque())
+            if len(job_seqs) >= self.per_job_quota:
+                # เกินโควต้า: ทิ้ง log เก่าสุดของ job นี้เอง
+                del self._entries[job_seqs.popleft()]
+                self._dropped += 1
+            elif len(self._entries) >= self.capacity:
+                # buffer เต็ม: ทิ้ง log เก่าสุดของทั้งระบบ (เป็น log เก่าสุดของ job นั้นเสมอ)
+                _, oldest = self._entries.popitem(last=False)
+                owner = oldest.get('job_id')
+                self._by_job[owner].popleft()
+                if not self._by_job[owner] and owner != job_id:
+                    del self._by_job[owner]
+                self._dropped += 1
+            self._entries[self._seq] = entry
+            job_seqs.append(self._seq)
+
+    def for_job(self, job_id: str, limit: int = 200) -> List[Dict]:
+        """logs ของ job เรียงตามเวลา (เก่า -> ใหม่)"""
+        with self._lock:
+            job_seqs = self._by_job.get(job_id)
+            if not job_seqs:
+                return []
+            seqs = list(islice(reversed(job_seqs), limit))
+            return [self._entries[seq] for seq in reversed(seqs)]
+
+    def recent(self, limit: int = 100) -> List[Dict]:
+        """logs ล่าสุดของทุก job เรียงจากใหม่ไปเก่า"""
+        with self._lock:
+            return list(islice(reversed(self._entries.values()), limit))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'capacity': self.capacity, 'jobs': len(self._by_job),
+                    'per_job_quota': self.per_job_quota, 'dropped': self._dropped}
+
+
+class JsonlLogSink:
+    """เขียน logs ลงไฟล์ JSONL (หมุนไฟล์ตามขนาด) ใน background thread - ไม่ถ่วง job threads"""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 queue_size: int = 10000):
+        self.path = path
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                            encoding='utf-8', delay=True)
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._dropped = 0
+        self._written = 0
+        self._thread = threading.Thread(target=self._run, name='log-sink')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, entry: Dict):
+        """ไม่ block - ถ้าคิวเต็ม (disk ช้า) จะนับเป็น dropped"""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._dropped += 1
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            record = logging.makeLogRecord({'msg': json.dumps(entry, ensure_ascii=False)})
+            self._handler.handle(record)
+            self._written += 1
+
+    def close(self, timeout: float = 5.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._handler.close()
+
+    def stats(self) -> Dict:
+        return {'path': self.path, 'written': self._written, 'dropped': self._dropped,
+                'pending': self._queue.qsize()}
@@ -0,0 +1,205 @@
+"""Metrics แบบ Prometheus (text exposition format) สำหรับ /metrics โดยไม่ต้องพึ่ง prometheus_client
+
+counter / histogram เก็บค่าแยกต่อ thread (shard) - การบันทึกใน hot path ไม่ต้องแย่ง lock กัน
+ค่าจะถูกรวมจากทุก shard ตอน scrape เท่านั้น ส่วน gauge อ่านค่าจาก callback ตอน scrape
+shard อยู่ใน process เดียว - process ที่ไม่มีเว็บ (worker.py) เปิด endpoint ของตัวเองด้วย serve()
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Sharded:
+    """ฐานของ metric ที่เก็บค่าแยกต่อ thread: แต่ละ thread เขียน dict ของตัวเองเท่านั้น"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict] = []
+        self._lock = threading.Lock()  # ใช้ตอนสร้าง shard ใหม่ (ครั้งเดียวต่อ thread) และตอน scrape
+
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _labels(self, labels: Dict) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _snapshots(self) -> List[Dict]:
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]  # dict.copy() เป็น atomic ภายใต้ GIL
+
+
+class Counter(_Sharded):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        shard = self._shard()
+        key = self._labels(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for snapshot in self._snapshots():
+            for key, value in snapshot.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(self.values().items())]
+
+
+class Histogram(_Sharded):
+    type = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        shard = self._shard()
+        key = self._labels(labels)
+        state = shard.get(key)
+        if state is None:
+            # [นับต่อ bucket (ไม่สะสม) ..., +Inf, ผลรวม]
+            state = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def render(self) -> List[str]:
+        merged: Dict[LabelValues, List] = {}
+        for snapshot in self._snapshots():
+            for key, state in snapshot.items():
+                state = list(state)
+                total = merged.get(key)
+                merged[key] = state if total is None else [a + b for a, b in zip(total, state)]
+        lines = []
+        for key, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {round(state[-1], 6)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class CallbackMetric:
+    """ค่าที่อ่านตอน scrape: fn() คืนตัวเลข หรือ dict ของ (label values) -> ตัวเลข"""
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], Union[float, Dict]],
+                 labelnames: Sequence[str] = (), metric_type: str = 'gauge'):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.type = metric_type
+
+    def render(self) -> List[str]:
+        value = self.fn()
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            return [f'{self.name} {_format_value(value)}']
+        return [f'{self.name}{_format_labels(self.labelnames, key if isinstance(key, tuple) else (key,))} '
+                f'{_format_value(v)}' for key, v in sorted(value.items()) if v is not None]
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = ''):
+        self.prefix = prefix
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, fn: Callable, labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(self.prefix + name, help_text, fn, labelnames))
+
+    def counter_func(self, name: str, help_text: str, fn: Callable, labelnames: Sequence[str] = ()) -> CallbackMetric:
+        """counter ที่มีค่าสะสมอยู่แล้วที่อื่น (เช่น stats() ของ component) อ่านตอน scrape"""
+        return self._register(CallbackMetric(self.prefix + name, help_text, fn, labelnames, 'counter'))
+
+    def render(self) -> str:
+        """ข้อความสำหรับ /metrics (ถ้า callback ของ metric ใดพังจะข้าม metric นั้นไป)"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:
+                lines.append(f'# {metric.name}: ERROR {e}')
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def serve(registry: MetricsRegistry, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """เปิด GET /metrics ของ registry บน thread แยก (daemon) - คืน server ไว้ shutdown()"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # ไม่ต้อง log ทุกครั้งที่ถูก scrape
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http')
+    thread.daemon = True
+    thread.start()
+    return server
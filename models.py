@@ -0,0 +1,73 @@
+"""Data models ของระบบ video jobs (ต้องใช้ Python 3.10+ เพราะ @dataclass(slots=True))"""
+import sys
+from dataclasses import dataclass, asdict, fields
+from typing import Dict, Optional
+
+from prompt_catalog import expand_prompt_key
+
+TERMINAL_STATUSES = ('completed', 'failed', 'partial_success')
+INTERNED_FIELDS = ('status', 'schedule_time', 'account', 'prompt')  # ค่าจากชุดเล็กๆ ที่ซ้ำกันทุก job
+
+
+@dataclass(slots=True)
+class Job:
+    """slots = ไม่มี __dict__ ต่อ instance และค่าที่ซ้ำกันทุก job (INTERNED_FIELDS) ใช้ string ตัวเดียวกัน"""
+    id: str
+    name: str
+    prompt: str
+    schedule_time: str
+    status: str
+    created_at: str
+    last_run: Optional[str] = None
+    video_url: Optional[str] = None
+    tiktok_url: Optional[str] = None
+    error_message: Optional[str] = None
+    use_cache: bool = True  # ใช้วิดีโอจาก generation cache ได้ถ้า prompt ซ้ำ
+    account: Optional[str] = None  # บัญชี TikTok ที่จะโพสต์ (None = บัญชีหลัก)
+    prompt_key: Optional[str] = None  # prompt ที่สุ่มได้: key ของชุดใน prompt_catalog แทนข้อความเต็ม
+    upload_resume_at: Optional[str] = None  # เวลาที่จะอัปโหลดต่อ (ISO) เมื่อถูกเลื่อนเพราะบัญชีใช้โควตาโพสต์ครบ
+    # checkpoints ของแต่ละ stage (ใช้รันต่อจากจุดที่ล้มเหลวโดยไม่ต้องสร้างวิดีโอใหม่)
+    video_data: Optional[Dict] = None
+    caption: Optional[str] = None
+    publish_id: Optional[str] = None
+    upload_progress: Optional[Dict] = None  # FILE_UPLOAD: publish_id, upload_url และ chunks ที่ TikTok ตอบรับแล้ว
+
+    def __post_init__(self):
+        for name in INTERNED_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, str):
+                setattr(self, name, sys.intern(value))
+
+    @property
+    def prompt_text(self) -> str:
+        """ข้อความ prompt ที่ใช้จริง (prompt ที่สุ่มได้สร้างจาก prompt_key ทุกครั้งที่ใช้)"""
+        if self.prompt_key:
+            return expand_prompt_key(self.prompt_key) or self.prompt
+        return self.prompt
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def clear_checkpoints(self):
+        """ล้างผลลัพธ์ของทุก stage เพื่อรันใหม่ตั้งแต่ต้น (prompt เดิมยังอยู่)"""
+        self.video_data = None
+        self.video_url = None
+        self.caption = None
+        self.publish_id = None
+        self.upload_progress = None
+        self.tiktok_url = None
+
+
+JOB_FIELDS = frozenset(f.name for f in fields(Job))
+OPTIONAL_FIELDS = frozenset(f.name for f in fields(Job) if f.default is None)
+
+
+def job_to_dict(job: Job) -> Dict:
+    """แปลง Job เป็น dict สำหรับบันทึกลง storage (ไม่เก็บ field ที่เป็น None - ใช้ค่า default ตอนอ่านกลับ)"""
+    return {k: v for k, v in asdict(job).items() if v is not None or k not in OPTIONAL_FIELDS}
+
+
+def job_from_dict(data: Dict) -> Job:
+    """สร้าง Job จาก dict (ข้าม field ที่ไม่รู้จัก เพื่อรองรับข้อมูลจากเวอร์ชันอื่น)"""
+    return Job(**{k: v for k, v in data.items() if k in JOB_FIELDS})
@@ -0,0 +1,252 @@
+"""สุ่ม prompt / caption แบบไม่ซ้ำ: จับคู่ base prompt x ส่วนเสริมทุกแบบไว้ล่วงหน้า แล้วสุ่มโดยไม่ใส่คืน (O(1) ต่อครั้ง)"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+from collections import deque
+from math import prod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+JOURNAL_MIN_COMPACT = 64  # window เล็กมาก: ไม่ต้องเขียนไฟล์ใหม่บ่อยเกินไป
+
+
+class ShuffledPool:
+    """Fisher-Yates แบบ lazy บนเลข 0..size-1: สุ่มไม่ซ้ำและลบค่าที่ระบุได้ใน O(1) โดยไม่ต้องสร้าง list ทั้งก้อน"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.reset()
+
+    def reset(self, exclude: Sequence[int] = ()):
+        self._remaining = self.size
+        self._values: Dict[int, int] = {}     # ตำแหน่ง -> ค่า (เฉพาะตำแหน่งที่ถูกสลับ)
+        self._positions: Dict[int, int] = {}  # ค่า -> ตำแหน่ง
+        for value in exclude:
+            self.remove(value)
+
+    def __len__(self):
+        return self._remaining
+
+    def _swap_out(self, position: int) -> int:
+        """ย้ายค่าที่ position ไปท้ายช่วงที่เหลือแล้วตัดออก"""
+        last = self._remaining - 1
+        value = self._values.get(position, position)
+        last_value = self._values.get(last, last)
+        self._values[position] = last_value
+        self._positions[last_value] = position
+        self._values.pop(last, None)
+        self._positions.pop(value, None)
+        self._remaining = last
+        return value
+
+    def draw(self, rng: random.Random) -> int:
+        if not self._remaining:
+            raise IndexError('pool ว่างแล้ว')
+        return self._swap_out(rng.randrange(self._remaining))
+
+    def remove(self, value: int) -> bool:
+        position = self._positions.get(value, value)
+        if position >= self._remaining or self._values.get(position, position) != value:
+            return False  # ถูกสุ่มออกไปแล้ว
+        self._swap_out(position)
+        return True
+
+    def put_back(self, value: int):
+        """คืนค่าที่เพิ่งสุ่มออกไปเข้า pool (ต่อท้ายช่วงที่เหลือ - ลำดับสุ่มยังเท่าเดิมเพราะ draw สุ่มตำแหน่งทุกครั้ง)"""
+        position = self._remaining
+        if value == position:
+            self._values.pop(position, None)
+            self._positions.pop(value, None)
+        else:
+            self._values[position] = value
+            self._positions[value] = position
+        self._remaining += 1
+
+
+def decode_combination(index: int, radix: Sequence[int]) -> List[int]:
+    """แปลง index ของชุดส่วนเสริมกลับเป็นตัวเลือกของแต่ละมิติ (เลขฐานผสม) - IndexError ถ้าเกินจำนวนชุด"""
+    if not 0 <= index < prod(radix):
+        raise IndexError(f'combination {index} อยู่นอกช่วง')
+    choices = []
+    for size in reversed(radix):
+        index, choice = divmod(index, size)
+        choices.append(choice)
+    return list(reversed(choices))
+
+
+class PromptSampler:
+    """สุ่ม (หมวด, base prompt, ส่วนเสริม...) โดยไม่ซ้ำกับ window ครั้งล่าสุด
+
+    - หมวดเลือกตาม weights
+    - ภายในหมวดวน base prompt ครบทุกตัวก่อนจะซ้ำ (กันวิดีโอหน้าตาคล้ายกันใน batch เดียว)
+    - แต่ละ base สุ่มชุดส่วนเสริมจาก index ที่จับคู่ไว้ครบทุกแบบ ไม่ซ้ำจนกว่าจะหมด
+    - ประวัติ window ล่าสุดบันทึกลงไฟล์ journal (ถ้ากำหนด history_path) จึงไม่ซ้ำข้าม restart
+    """
+
+    def __init__(self, categories: Dict[str, List[str]], modifiers: Sequence[Sequence[str]],
+                 weights: Optional[Dict[str, float]] = None, window: int = 500,
+                 history_path: Optional[str] = None, rng: Optional[random.Random] = None):
+        self.categories = {name: list(prompts) for name, prompts in categories.items() if prompts}
+        self.modifiers = [list(options) for options in modifiers]
+        self.weights = {name: max(0.0, (weights or {}).get(name, 1.0)) for name in self.categories}
+        if not any(self.weights.values()):
+            self.weights = {name: 1.0 for name in self.categories}
+        self.history_path = history_path
+        self.rng = rng or random.Random()
+
+        # ขนาดของแต่ละมิติส่วนเสริม -> index เดียวแปลงกลับเป็นชุดตัวเลือกแบบเลขฐานผสม
+        self._radix = [len(options) for options in self.modifiers]
+        self.combinations_per_base = 1
+        for size in self._radix:
+            self.combinations_per_base *= size
+        self.total_combinations = self.combinations_per_base * sum(len(p) for p in self.categories.values())
+        self.window = max(0, min(window, self.total_combinations - 1))
+
+        self._base_pools = {name: ShuffledPool(len(prompts)) for name, prompts in self.categories.items()}
+        self._combo_pools: Dict[Tuple[str, int], ShuffledPool] = {}
+        self._history = deque()
+        self._recent = set()  # key ใน window (สำหรับ exclude ตอน reset pool)
+        self._draws = 0
+        self._journal = None  # ไฟล์ประวัติที่เปิดไว้ต่อท้าย (เปิดตอนสุ่มครั้งแรก)
+        self._journal_lines = 0
+        self._compactions = 0
+        self._lock = threading.Lock()
+        self._load_history()
+
+    def signature(self) -> str:
+        """hash ของรายการ prompt/ส่วนเสริม - ถ้าเปลี่ยน ประวัติเดิมใช้ไม่ได้แล้ว"""
+        payload = json.dumps({'categories': self.categories, 'modifiers': self.modifiers}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def _combo_pool(self, category: str, base: int) -> ShuffledPool:
+        pool = self._combo_pools.get((category, base))
+        if pool is None:
+            pool = self._combo_pools[(category, base)] = ShuffledPool(self.combinations_per_base)
+        return pool
+
+    def _remember(self, key: Tuple[str, int, int]):
+        self._history.append(key)
+        self._recent.add(key)
+        while len(self._history) > self.window:
+            self._recent.discard(self._history.popleft())
+
+    def draw(self) -> Dict:
+        """สุ่ม 1 ชุด คืน {'category', 'base', 'modifiers': [...], 'key'}"""
+        with self._lock:
+            names = list(self.categories)
+            category = self.rng.choices(names, weights=[self.weights[name] for name in names])[0]
+
+            bases = self._base_pools[category]
+            if not len(bases):
+                bases.reset()  # ครบทุก base ในหมวดแล้ว - เริ่มรอบใหม่
+            base = bases.draw(self.rng)
+
+            pool = self._combo_pool(category, base)
+            if not len(pool):
+                # ใช้ครบทุกชุดของ base นี้แล้ว - เริ่มรอบใหม่โดยยังไม่ให้ชุดที่อยู่ใน window ออกซ้ำ
+                recent = [combo for cat, b, combo in self._recent if cat == category and b == base]
+                pool.reset(recent if len(recent) < self.combinations_per_base else ())
+            combo = pool.draw(self.rng)
+
+            key = (category, base, combo)
+            self._remember(key)
+            self._draws += 1
+            self._save_history(key)
+            return {
+                'category': category,
+                'base': self.categories[category][base],
+                'modifiers': [options[i] for options, i in zip(self.modifiers, decode_combination(combo, self._radix))],
+                'key': f'{category}:{base}:{combo}'
+            }
+
+    def _load_history(self):
+        """อ่าน journal (บรรทัดแรก = signature แล้วบรรทัดละ 1 ครั้งที่สุ่ม) หรือไฟล์ JSON ก้อนเดียวแบบเดิม"""
+        if not self.history_path or not os.path.exists(self.history_path):
+            return
+        entries = []
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if 'history' in header:
+                    entries = header['history']  # รูปแบบเดิม: {'signature', 'history'} ทั้งไฟล์
+                else:
+                    for line in f:
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            break  # บรรทัดสุดท้ายเขียนไม่ครบ (process ถูกปิดกลางคัน)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ อ่านประวัติการสุ่ม prompt ไม่ได้: {e}")
+            return
+        if header.get('signature') != self.signature():
+            return  # prompts เปลี่ยนไปแล้ว
+        for category, base, combo in entries[-self.window:] if self.window else []:
+            if category in self.categories and base < len(self.categories[category]) \
+                    and combo < self.combinations_per_base:
+                self._combo_pool(category, base).remove(combo)
+                self._remember((category, base, combo))
+
+    def _save_history(self, key: Tuple[str, int, int]):
+        """ต้องถือ lock อยู่แล้ว - ต่อท้าย journal 1 บรรทัด (O(1)) และเขียนใหม่เหลือแค่ window เมื่อยาวเกิน 2 เท่า"""
+        if not self.history_path:
+            return
+        try:
+            if self._journal is None or self._journal_lines >= 2 * max(self.window, JOURNAL_MIN_COMPACT):
+                self._compact_history()
+            else:
+                self._journal.write(json.dumps(key) + '\n')
+                self._journal.flush()
+                self._journal_lines += 1
+        except OSError as e:
+            print(f"⚠️ บันทึกประวัติการสุ่ม prompt ไม่ได้: {e}")
+
+    def _compact_history(self):
+        """เขียน journal ใหม่ (signature + window ล่าสุด) แทนไฟล์เดิมแบบ atomic แล้วเปิดไว้ต่อท้าย"""
+        directory = os.path.dirname(self.history_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'signature': self.signature()}) + '\n')
+            f.writelines(json.dumps(key) + '\n' for key in self._history)
+        os.replace(tmp_path, self.history_path)
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.history_path, 'a', encoding='utf-8')
+        self._journal_lines = len(self._history)
+        self._compactions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'draws': self._draws,
+                'window': self.window,
+                'history': len(self._history),
+                'journal_lines': self._journal_lines,
+                'journal_compactions': self._compactions,
+                'total_combinations': self.total_combinations
+            }
+
+
+class CyclingChoice:
+    """สุ่มจาก list โดยไม่ซ้ำจนกว่าจะครบทุกตัว (รอบใหม่จะไม่เริ่มด้วยตัวเดียวกับที่เพิ่งออก)"""
+
+    def __init__(self, items: Sequence, rng: Optional[random.Random] = None):
+        self.items = list(items)
+        self.rng = rng or random.Random()
+        self._pool = ShuffledPool(len(self.items))
+        self._last = None
+        self._lock = threading.Lock()
+
+    def choice(self):
+        with self._lock:
+            if not len(self._pool):
+                self._pool.reset()  # รอบใหม่มีครบทุกตัว รวมตัวที่เพิ่งออก
+            value = self._pool.draw(self.rng)
+            if value == self._last and len(self._pool):
+                # ออกซ้ำกับตัวสุดท้ายของรอบก่อน: สุ่มตัวอื่นแทนแล้วคืนตัวนี้ไว้ใช้ในรอบเดียวกัน
+                value, repeated = self._pool.draw(self.rng), value
+                self._pool.put_back(repeated)
+            self._last = value
+            return self.items[value]
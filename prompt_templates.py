@@ -0,0 +1,75 @@
+"""Prompt templates ของ Veo/Gemini ที่ compile ครั้งเดียวตอน import พร้อม version
+
+spec ทางเทคนิคเป็น template แยก (ข้อความคงที่ สร้างครั้งเดียว) - ส่งเป็น system instruction ของ model ครั้งเดียว
+ถ้า SDK รองรับ (include_spec=False) ไม่งั้นแทนค่าลงใน request ของแต่ละวิดีโอ / batch
+แก้ข้อความของ template ใดต้องเพิ่ม version ด้วย (fingerprint อยู่ใน cache key ของ generation cache)
+"""
+import hashlib
+import textwrap
+from string import Template
+from typing import Sequence
+
+
+class PromptTemplate:
+    """ข้อความแบบ $name ที่ dedent / strip ไว้แล้ว - render() แค่แทนค่า ไม่ต้องสร้างข้อความทั้งก้อนใหม่"""
+
+    def __init__(self, name: str, version: int, text: str):
+        self.name = name
+        self.version = version
+        self.text = textwrap.dedent(text).strip()
+        self._template = Template(self.text)
+        self.fingerprint = hashlib.sha256(f'{name}@{version}\n{self.text}'.encode('utf-8')).hexdigest()[:12]
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}@v{self.version}'
+
+    def render(self, **values) -> str:
+        return self._template.substitute(values)
+
+
+VEO_SPEC = PromptTemplate('veo_spec', 2, """
+    Technical specifications (apply to every video):
+    - Resolution: 1080x1920 (9:16 vertical for TikTok)
+    - Duration: 8-15 seconds
+    - Frame rate: 30 FPS
+    - Audio: High-quality ASMR sounds synchronized with visuals
+    - Style: Professional food photography lighting
+    - Focus: Macro lens with shallow depth of field
+    - Background: Minimal, clean wooden surface
+    - Sound design: Only cutting/slicing sounds, no music
+""")
+
+VEO_SCENE = PromptTemplate('veo_scene', 2, """
+    Create a hyper-realistic ASMR video using Veo 3 technology:
+
+    $prompt
+
+    $spec
+""")
+
+VEO_BATCH = PromptTemplate('veo_batch', 2, """
+    Create $count separate hyper-realistic ASMR videos using Veo 3 technology, one per scene:
+
+    $scenes
+
+    $spec
+
+    Respond with a JSON array of $count objects in scene order: {"index": <scene number>, "error": <null or reason>}
+""")
+
+
+def render_scene(prompt: str, include_spec: bool = True) -> str:
+    """request ของวิดีโอ 1 รายการ (spec ทางเทคนิคที่ compile ไว้แล้วต่อท้าย ถ้า include_spec)"""
+    return VEO_SCENE.render(prompt=prompt, spec=VEO_SPEC.text if include_spec else '').strip()
+
+
+def render_batch(prompts: Sequence[str], include_spec: bool = True) -> str:
+    scenes = '\n'.join(f'{index}. {prompt}' for index, prompt in enumerate(prompts, 1))
+    text = VEO_BATCH.render(count=len(prompts), scenes=scenes, spec=VEO_SPEC.text if include_spec else '')
+    return text if include_spec else text.replace('\n\n\n\n', '\n\n')
+
+
+def templates_fingerprint() -> str:
+    """fingerprint รวมของ templates ที่มีผลต่อวิดีโอ (ใส่ใน generation params)"""
+    return '-'.join(template.fingerprint for template in (VEO_SPEC, VEO_SCENE))
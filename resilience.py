@@ -0,0 +1,309 @@
+"""Rate limiting, retry และ circuit breaker สำหรับ API ภายนอก (Gemini / TikTok)"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+# ชื่อ exception ที่ถือว่าเป็นปัญหาชั่วคราว (เทียบด้วยชื่อ จะได้ไม่ต้อง import SDK ทุกตัว)
+TRANSIENT_ERROR_NAMES = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'DeadlineExceeded',
+    'InternalServerError', 'InternalServerErrorException', 'Aborted',
+    'ClientConnectionError', 'ServerDisconnectedError', 'ServerTimeoutError',
+    'ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout', 'TimeoutError'
+}
+TRANSIENT_STATUS_MARKERS = ('429', '500', '502', '503', '504', 'rate limit', 'quota')
+
+
+class CircuitOpenError(Exception):
+    """circuit breaker เปิดอยู่นานเกินกำหนด - API นี้ถูกพักไว้"""
+
+
+def is_throttled(error: Exception) -> bool:
+    """error ที่บอกว่าถูก rate limit (429 / quota)"""
+    text = str(error).lower()
+    return type(error).__name__ in ('ResourceExhausted', 'TooManyRequests') or '429' in text or 'quota' in text
+
+
+def is_retryable(error: Exception) -> bool:
+    """error ชั่วคราวที่ควรลองใหม่"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    for cls in type(error).__mro__:
+        if cls.__name__ in TRANSIENT_ERROR_NAMES:
+            return True
+    text = str(error).lower()
+    return any(marker in text for marker in TRANSIENT_STATUS_MARKERS)
+
+
+class TokenBucket:
+    """Token bucket แบบปรับอัตราได้เอง (AIMD): ลดครึ่งเมื่อโดน 429 แล้วค่อยๆ เพิ่มกลับเมื่อสำเร็จ"""
+
+    def __init__(self, rate_per_sec: float, burst: int, min_rate_per_sec: Optional[float] = None,
+                 recovery_per_success: float = 0.05):
+        self.max_rate = rate_per_sec
+        self.rate = rate_per_sec
+        self.min_rate = min_rate_per_sec if min_rate_per_sec is not None else rate_per_sec / 10
+        self.recovery = recovery_per_success
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """จอง 1 token แล้วคืนเวลาที่ต้องรอ (วินาที) ก่อนใช้ token นั้นได้"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """เวลาที่ต้องรอจนกว่าจะมี token ครบ tokens อัน (ไม่จอง)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = tokens - self._tokens
+            return 0.0 if missing <= 0 else missing / self.rate
+
+    def try_acquire(self) -> bool:
+        """ใช้ 1 token ถ้ามีอยู่ตอนนี้ (ไม่รอ)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def release(self):
+        """คืน 1 token ที่ใช้ไปแล้วแต่ไม่ได้ใช้จริง (ไม่เกิน capacity)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_throttled(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {'rate_per_sec': round(self.rate, 3), 'max_rate_per_sec': self.max_rate,
+                    'tokens': round(self._tokens, 2), 'burst': self.capacity}
+
+
+class RetryPolicy:
+    """Exponential backoff พร้อม full jitter"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """เวลารอก่อนลองครั้งถัดไป (attempt เริ่มที่ 1)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """เปิดวงจรเมื่อสัดส่วน error ใน window ล่าสุดสูงเกินกำหนด แล้วพักไว้ช่วง cooldown
+
+    ระหว่างที่วงจรเปิด ผู้เรียกจะรอ (stage หยุดชั่วคราว) แทนที่จะยิง API ต่อ
+    หลัง cooldown จะปล่อยให้ 1 call ลองก่อน (half-open) ถ้าสำเร็จจึงปิดวงจร
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, error_rate: float = 0.5, window: int = 20, min_calls: int = 5,
+                 cooldown: float = 60.0):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._trips = 0
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        """0 = เรียกได้เลย, มากกว่า 0 = ต้องรออีกกี่วินาที"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    return 0.0
+                return min(1.0, self.cooldown)
+            return remaining
+
+    def record(self, success: bool):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if success:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._trip()
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.error_rate):
+                self._trip()
+
+    def _trip(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._trips += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'state': self.state, 'trips': self._trips}
+
+
+class ApiGuard:
+    """รวม rate limiter + retry + circuit breaker ของ API หนึ่งตัว (ใช้ร่วมกันทุก job)"""
+
+    def __init__(self, name: str, bucket: TokenBucket, retry: RetryPolicy, breaker: CircuitBreaker,
+                 max_pause: float = 300.0):
+        self.name = name
+        self.bucket = bucket
+        self.retry = retry
+        self.breaker = breaker
+        self.max_pause = max_pause
+        self._calls = 0
+        self._retries = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _record(self, error: Optional[Exception]):
+        self.breaker.record(error is None)
+        if error is None:
+            self.bucket.on_success()
+        elif is_throttled(error):
+            self.bucket.on_throttled()
+
+    def call(self, fn: Callable, on_retry: Optional[Callable] = None):
+        """เรียก fn() ภายใต้ rate limit / circuit breaker และลองใหม่เมื่อเจอ error ชั่วคราว"""
+        attempt = 0
+        while True:
+            attempt += 1
+            paused = 0.0
+            wait = self.breaker.wait_time()
+            while wait > 0:
+                if paused >= self.max_pause:
+                    raise CircuitOpenError(f'{self.name}: circuit breaker เปิดอยู่ (พักการเรียก API)')
+                time.sleep(wait)
+                paused += wait
+                wait = self.breaker.wait_time()
+
+            self.bucket.acquire()
+            self._count('_calls')
+            try:
+                result = fn()
+            except Exception as e:
+                self._record(e)
+                if attempt >= self.retry.max_attempts or not is_retryable(e):
+                    self._count('_failures')
+                    raise
+                delay = self.retry.delay(attempt)
+                self._count('_retries')
+                if on_retry:
+                    on_retry(attempt, delay, e)
+                time.sleep(delay)
+                continue
+            self._record(None)
+            return result
+
+    async def call_async(self, coro_factory: Callable, on_retry: Optional[Callable] = None):
+        """เวอร์ชัน asyncio ของ call() - coro_factory ต้องคืน coroutine ใหม่ทุกครั้ง"""
+        attempt = 0
+        while True:
+            attempt += 1
+            paused = 0.0
+            wait = self.breaker.wait_time()
+            while wait > 0:
+                if paused >= self.max_pause:
+                    raise CircuitOpenError(f'{self.name}: circuit breaker เปิดอยู่ (พักการเรียก API)')
+                await asyncio.sleep(wait)
+                paused += wait
+                wait = self.breaker.wait_time()
+
+            await self.bucket.acquire_async()
+            self._count('_calls')
+            try:
+                result = await coro_factory()
+            except Exception as e:
+                self._record(e)
+                if attempt >= self.retry.max_attempts or not is_retryable(e):
+                    self._count('_failures')
+                    raise
+                delay = self.retry.delay(attempt)
+                self._count('_retries')
+                if on_retry:
+                    on_retry(attempt, delay, e)
+                await asyncio.sleep(delay)
+                continue
+            self._record(None)
+            return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = {'calls': self._calls, 'retries': self._retries, 'failures': self._failures}
+        return {**counters, 'rate_limit': self.bucket.stats(), 'breaker': self.breaker.stats()}
+
+
+def guard_from_env(name: str, prefix: str, default_rate_per_min: float, default_burst: int) -> ApiGuard:
+    """สร้าง ApiGuard จาก env เช่น GEMINI_RATE_PER_MIN, GEMINI_RETRY_MAX_ATTEMPTS, GEMINI_BREAKER_COOLDOWN"""
+    def setting(key, default):
+        return float(os.getenv(f'{prefix}_{key}', str(default)))
+
+    return ApiGuard(
+        name,
+        TokenBucket(setting('RATE_PER_MIN', default_rate_per_min) / 60.0,
+                    int(setting('BURST', default_burst))),
+        RetryPolicy(int(setting('RETRY_MAX_ATTEMPTS', 4)),
+                    setting('RETRY_BASE_DELAY', 1.0),
+                    setting('RETRY_MAX_DELAY', 30.0)),
+        CircuitBreaker(setting('BREAKER_ERROR_RATE', 0.5),
+                       int(setting('BREAKER_WINDOW', 20)),
+                       int(setting('BREAKER_MIN_CALLS', 5)),
+                       setting('BREAKER_COOLDOWN', 60.0)),
+        max_pause=setting('BREAKER_MAX_PAUSE', 300.0)
+    )
@@ -0,0 +1,58 @@
+"""ตารางอัปโหลดรายสัปดาห์แบบ compile ไว้ล่วงหน้า (หา slot ถัดไปด้วย binary search)"""
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+class WeeklySchedule:
+    """slot ทั้งหมดของสัปดาห์ เก็บเป็น offset (นาทีนับจากวันจันทร์ 00:00) เรียงจากน้อยไปมาก
+
+    ค่าของแต่ละวันใน optimal_schedule เป็น {'time': 'HH:MM', 'range': ...}
+    หรือ list ของ dict แบบนั้นถ้าวันนั้นมีหลาย slot
+    """
+
+    def __init__(self, optimal_schedule: Dict, tz):
+        self.tz = tz
+        slots = []
+        for weekday, entries in optimal_schedule.items():
+            day = WEEKDAYS.index(weekday)
+            for entry in entries if isinstance(entries, list) else [entries]:
+                hour, minute = (int(part) for part in entry['time'].split(':'))
+                slots.append((day * MINUTES_PER_DAY + hour * 60 + minute, weekday, entry['time'], entry.get('range')))
+        if not slots:
+            raise ValueError('optimal_schedule ต้องมีอย่างน้อย 1 slot')
+        slots.sort()
+        self._slots = slots
+        self._offsets = [slot[0] for slot in slots]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def slots(self) -> List[Tuple[str, str]]:
+        """(weekday, 'HH:MM') ของทุก slot สำหรับลงทะเบียนกับ scheduler"""
+        return [(weekday, at) for _, weekday, at, _ in self._slots]
+
+    def next_slot(self, now: datetime) -> Dict:
+        """slot แรกที่อยู่หลัง now (now ต้องเป็น datetime ที่มี timezone)"""
+        local = now.astimezone(self.tz)
+        minute_of_week = local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute
+
+        # slot ที่ตรงกับนาทีปัจจุบันถือว่าผ่านไปแล้ว (ต้องอยู่หลัง now เท่านั้น)
+        index = bisect_right(self._offsets, minute_of_week)
+        weeks_ahead = 0
+        if index == len(self._offsets):
+            index, weeks_ahead = 0, 1
+        offset, weekday, at, time_range = self._slots[index]
+
+        week_start = local.date() - timedelta(days=local.weekday())
+        naive = datetime.combine(week_start, datetime.min.time()) + timedelta(
+            minutes=offset + weeks_ahead * MINUTES_PER_WEEK)
+        return {
+            'datetime': self.tz.localize(naive) if hasattr(self.tz, 'localize') else naive.replace(tzinfo=self.tz),
+            'weekday': weekday,
+            'time_range': time_range
+        }
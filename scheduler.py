@@ -0,0 +1,151 @@
+"""Scheduler แบบ min-heap: ตื่นตรงเวลาของงานถัดไปแทนการ poll ทุกนาที"""
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+RECURRING_SCHEDULES = ('hourly', 'daily', 'weekly')
+
+
+def next_run_time(schedule_time: str, now: datetime, anchor: Optional[datetime] = None,
+                  daily_at: str = '09:00') -> Optional[datetime]:
+    """เวลารันครั้งถัดไปของ job ตามค่า schedule_time (None = ไม่ต้องตั้งเวลา เช่น manual)
+
+    now ต้องเป็นเวลาท้องถิ่นที่มี timezone (THAILAND_TZ), anchor คือวันที่สร้าง job (ใช้กับ weekly)
+    """
+    if schedule_time == 'hourly':
+        return now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+    if schedule_time in ('daily', 'weekly'):
+        hour, minute = (int(part) for part in daily_at.split(':'))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if schedule_time == 'daily':
+            return candidate if candidate > now else candidate + timedelta(days=1)
+        weekday = (anchor or now).weekday()
+        candidate += timedelta(days=(weekday - now.weekday()) % 7)
+        return candidate if candidate > now else candidate + timedelta(days=7)
+
+    # เวลาแน่นอนครั้งเดียว เช่น '2024-05-01 19:30' หรือ '2024-05-01T19:30'
+    try:
+        at = datetime.fromisoformat(schedule_time)
+    except (TypeError, ValueError):
+        return None
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=now.tzinfo) if not hasattr(now.tzinfo, 'localize') else now.tzinfo.localize(at)
+    return at
+
+
+class Scheduler:
+    """เก็บงานที่ตั้งเวลาไว้ใน heap (key -> deadline) - เพิ่ม/ยกเลิก O(log n)
+
+    ยกเลิกแบบ lazy: entry เก่าใน heap ถูกข้ามตอนถึงเวลา และจะ rebuild heap
+    เมื่อ entry ที่ยกเลิกแล้วมีมากกว่าครึ่ง
+    """
+
+    def __init__(self, name: str = 'scheduler', on_fire: Optional[Callable[[str, float], None]] = None):
+        self.name = name
+        self.on_fire = on_fire  # on_fire(key, lag) - lag = ช้ากว่ากำหนดกี่วินาที (ใช้ทำ metrics)
+        self._heap = []  # (deadline, seq, key)
+        self._entries: Dict[str, tuple] = {}  # key -> (deadline, seq, callback)
+        self._seq = itertools.count()
+        self._fired = 0
+        self._last_lag = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def schedule(self, key: str, when: datetime, callback: Callable[[str], None]):
+        """ตั้งเวลา (หรือเลื่อนเวลา) ให้ key - callback(key) จะถูกเรียกใน scheduler thread"""
+        deadline = when.timestamp()
+        with self._cond:
+            seq = next(self._seq)
+            self._entries[key] = (deadline, seq, callback)
+            heapq.heappush(self._heap, (deadline, seq, key))
+            # ปลุก thread ถ้างานใหม่ต้องรันก่อนงานที่กำลังรออยู่
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def cancel(self, key: str) -> bool:
+        with self._cond:
+            if self._entries.pop(key, None) is None:
+                return False
+            if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+                self._heap = [(deadline, seq, k) for k, (deadline, seq, _) in self._entries.items()]
+                heapq.heapify(self._heap)
+            return True
+
+    def next_run(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def start(self):
+        """เริ่ม thread (เรียกซ้ำได้ไม่มีผล)"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+    def _pop_due(self):
+        """คืน (key, callback, lag) ของงานที่ถึงเวลา หรือรอจนกว่าจะถึง (ต้องถือ lock)"""
+        while not self._stopping:
+            if not self._heap:
+                self._cond.wait()
+                continue
+            deadline, seq, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != seq:
+                heapq.heappop(self._heap)  # ถูกยกเลิกหรือเลื่อนเวลาไปแล้ว
+                continue
+            delay = deadline - time.time()
+            if delay > 0:
+                self._cond.wait(delay)
+                continue
+            heapq.heappop(self._heap)
+            del self._entries[key]
+            return key, entry[2], -delay
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due = self._pop_due()
+            if due is None:
+                return
+            key, callback, lag = due
+            self._last_lag = lag
+            if self.on_fire:
+                self.on_fire(key, lag)
+            try:
+                callback(key)
+            except Exception as e:
+                print(f"Scheduler error ({key}): {e}")
+            self._fired += 1
+
+    def stats(self) -> Dict:
+        with self._cond:
+            next_deadline = None
+            while self._heap:
+                deadline, seq, key = self._heap[0]
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] == seq:
+                    next_deadline = deadline
+                    break
+                heapq.heappop(self._heap)
+            return {'pending': len(self._entries), 'heap_size': len(self._heap), 'fired': self._fired,
+                    'last_lag_seconds': round(self._last_lag, 3) if self._last_lag is not None else None,
+                    'next_in_seconds': round(next_deadline - time.time(), 1) if next_deadline else None}
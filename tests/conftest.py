@@ -0,0 +1,14 @@
+import pytest
+
+from models import Job
+
+
+@pytest.fixture
+def make_job():
+    """สร้าง Job สำหรับทดสอบ (ค่าที่ไม่ระบุใช้ค่าตั้งต้นของ job แบบ manual)"""
+    def make(job_id: str, **fields) -> Job:
+        values = {'name': 'test', 'prompt': 'auto', 'schedule_time': 'manual', 'status': 'pending',
+                  'created_at': '2026-01-01T00:00:00'}
+        values.update(fields)
+        return Job(id=job_id, **values)
+    return make
@@ -0,0 +1,93 @@
+import queue
+import time
+
+import pytest
+
+from accounts import Account, AccountPool, FairDispatcher, PostQuota
+from job_store import MemoryJobStore
+
+
+def test_post_quota_stops_at_hourly_limit():
+    quota = PostQuota(posts_per_hour=3, posts_per_day=10)
+    assert [quota.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert quota.wait_time() > 0
+
+
+def test_post_quota_shares_ledger_between_processes():
+    ledger = MemoryJobStore()
+    first, second = PostQuota(2, 10, ledger, 'a'), PostQuota(2, 10, ledger, 'a')
+    assert first.try_acquire() and second.try_acquire()
+    assert not first.try_acquire() and not second.try_acquire()  # bucket ของแต่ละตัวยังเหลือแต่ ledger เต็ม
+    assert len(ledger.recent_posts('a', 0)) == 2
+
+
+def test_post_quota_refunds_tokens_when_ledger_refuses():
+    class FullLedger:
+        def recent_posts(self, account, since):
+            return []
+
+        def reserve_post(self, account, limits, now=None):
+            return False
+
+    quota = PostQuota(2, 10, FullLedger(), 'a')
+    assert not quota.try_acquire()
+    assert quota.hourly.wait_time(2) == 0 and quota.daily.wait_time(10) == 0
+
+
+def test_post_quota_release_returns_slot():
+    ledger = MemoryJobStore()
+    quota = PostQuota(1, 10, ledger, 'a')
+    posted_at = quota.acquire_post()
+    assert posted_at is not None and quota.acquire_post() is None
+    quota.release(posted_at)
+    assert ledger.recent_posts('a', 0) == []
+    assert quota.acquire_post() is not None
+
+
+def make_pool(*accounts):
+    return AccountPool([Account(name, 'token', name, weight=weight, posts_per_hour=limit, posts_per_day=1000)
+                        for name, weight, limit in accounts])
+
+
+def test_fair_dispatcher_interleaves_by_weight():
+    pool = make_pool(('a', 2.0, 1000), ('b', 1.0, 1000))
+    dispatcher = FairDispatcher(pool, lambda item: item[0], maxsize=100)
+    for i in range(6):
+        dispatcher.put(('a', i))
+    for i in range(3):
+        dispatcher.put(('b', i))
+    order = [dispatcher.get(timeout=0)[0] for _ in range(9)]
+    assert order.count('a') == 6
+    assert order[:3].count('a') == 2 and order[3:6].count('a') == 2  # a ได้ 2 รอบต่อ b 1 รอบ
+
+
+def test_fair_dispatcher_does_not_block_other_accounts_on_quota():
+    pool = make_pool(('a', 1.0, 1), ('b', 1.0, 1000))
+    dispatched = []
+    dispatcher = FairDispatcher(pool, lambda item: item[0], maxsize=100, max_wait=10 ** 6,
+                                on_dispatched=lambda item, posted_at: dispatched.append(item))
+    dispatcher.put(('a', 0))
+    dispatcher.put(('a', 1))
+    dispatcher.put(('b', 0))
+    got = [dispatcher.get(timeout=0.1) for _ in range(2)]
+    assert sorted(got) == [('a', 0), ('b', 0)]
+    with pytest.raises(queue.Empty):
+        dispatcher.get(timeout=0.1)  # a ใช้โควตาหมดแล้ว
+    assert dispatched == got
+    assert dispatcher.stats()['waiting'] == {'a': 1}
+
+
+def test_fair_dispatcher_defers_long_waits_and_bounds_queue():
+    pool = make_pool(('a', 1.0, 1))
+    deferred = []
+    dispatcher = FairDispatcher(pool, lambda item: item[0], maxsize=1, max_wait=60,
+                                on_deferred=lambda item, wait: deferred.append((item, wait)))
+    assert dispatcher.put(('a', 0))
+    assert not dispatcher.put(('a', 1))  # งานที่สองต้องรอโควตาชั่วโมงหน้า
+    assert deferred and deferred[0][0] == ('a', 1) and deferred[0][1] > 60
+    big = FairDispatcher(make_pool(('a', 1.0, 1000)), lambda item: item[0], maxsize=1)
+    big.put(('a', 0))
+    started = time.monotonic()
+    with pytest.raises(queue.Full):
+        big.put(('a', 1), timeout=0.1)
+    assert time.monotonic() - started >= 0.1
@@ -0,0 +1,43 @@
+import threading
+from unittest import mock
+
+import ids
+
+
+def test_ids_increase_within_same_millisecond():
+    with mock.patch('ids.time.time', return_value=1_700_000_000.0):
+        generated = [ids.new_id() for _ in range(1000)]
+    assert generated == sorted(generated) and len(set(generated)) == 1000
+    assert all(len(value) == 26 for value in generated)
+
+
+def test_ids_increase_when_clock_goes_back():
+    with mock.patch('ids.time.time', return_value=1_700_000_001.0):
+        before = ids.new_id()
+    with mock.patch('ids.time.time', return_value=1_700_000_000.0):
+        after = ids.new_id()
+    assert after > before
+
+
+def test_ids_unique_across_threads():
+    results = []
+    lock = threading.Lock()
+
+    def generate():
+        batch = [ids.new_id() for _ in range(2000)]
+        assert batch == sorted(batch)
+        with lock:
+            results.extend(batch)
+
+    threads = [threading.Thread(target=generate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == len(results)
+
+
+def test_id_for_is_deterministic_and_carries_timestamp():
+    assert ids.id_for(1_800_000_000.5, 'daily-monday') == ids.id_for(1_800_000_000.5, 'daily-monday')
+    assert ids.id_for(1_800_000_000.5, 'a') != ids.id_for(1_800_000_000.5, 'b')
+    assert ids.id_timestamp(ids.id_for(1_800_000_000.5, 'a')) == 1_800_000_000.5
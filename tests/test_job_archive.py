@@ -0,0 +1,34 @@
+from job_archive import JobArchive
+from job_store import MemoryJobStore
+
+
+def test_put_get_replace_discard(tmp_path, make_job):
+    archive = JobArchive(str(tmp_path))
+    archive.put(make_job('a', status='completed', caption='first'))
+    archive.put(make_job('a', status='completed', caption='second'))
+    assert archive.get('a').caption == 'second'
+    assert 'a' in archive and len(archive) == 1
+    assert archive.discard('a') and not archive.discard('a')
+    assert archive.get('a') is None
+    archive.close()
+
+
+def test_compaction_keeps_live_records(tmp_path, make_job):
+    archive = JobArchive(str(tmp_path), compact_min_bytes=1)
+    for round_ in range(5):
+        for i in range(20):
+            archive.put(make_job(f'j{i}', status='failed', error_message=f'round {round_}'))
+    assert archive.stats()['compactions'] > 0
+    assert all(archive.get(f'j{i}').error_message == 'round 4' for i in range(20))
+    archive.close()
+
+
+def test_memory_store_moves_finished_jobs_to_archive(tmp_path, make_job):
+    store = MemoryJobStore(archive=JobArchive(str(tmp_path)))
+    store.save_job(make_job('running', status='running'))
+    store.save_job(make_job('done', status='completed'))
+    assert store.archive_stats()['jobs'] == 1
+    assert store.get_job('done').status == 'completed'
+    assert store.count_jobs() == {'running': 1, 'completed': 1, 'total': 2}
+    assert {job.id for job in store.list_jobs()} == {'running', 'done'}
+    store.close()
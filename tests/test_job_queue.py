@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, JobPipeline, JobQueue, QueueFullError, Stage
+
+
+def test_priority_then_fifo():
+    q = JobQueue(maxsize=10)
+    q.put('low', PRIORITY_LOW)
+    q.put('normal-1', PRIORITY_NORMAL)
+    q.put('high', PRIORITY_HIGH)
+    q.put('normal-2', PRIORITY_NORMAL)
+    assert [q.get(timeout=0) for _ in range(4)] == ['high', 'normal-1', 'normal-2', 'low']
+    assert q.get(timeout=0) is None
+
+
+def test_deferred_overflow_then_reject():
+    q = JobQueue(maxsize=1, max_deferred=1)
+    q.put('a')
+    q.put('b')  # คิวสำรอง
+    with pytest.raises(QueueFullError):
+        q.put('c')
+    assert q.free_slots() == 0
+    assert q.get(timeout=0) == 'a'
+    assert q.stats()['depth'] == 1 and q.stats()['deferred'] == 0  # b ย้ายเข้าคิวหลัก
+    assert q.get(timeout=0) == 'b'
+    assert q.stats()['rejected'] == 1
+
+
+def test_concurrent_producers_and_consumers_lose_nothing():
+    q = JobQueue(maxsize=10000)
+    received, lock = [], threading.Lock()
+
+    def produce(base):
+        for i in range(500):
+            q.put(base + i, i % 3)
+
+    def consume():
+        while True:
+            item = q.get(timeout=0.2)
+            if item is None:
+                return
+            with lock:
+                received.append(item)
+
+    producers = [threading.Thread(target=produce, args=(n * 1000,)) for n in range(4)]
+    consumers = [threading.Thread(target=consume) for _ in range(4)]
+    for thread in producers + consumers:
+        thread.start()
+    for thread in producers + consumers:
+        thread.join()
+    assert sorted(received) == sorted(n * 1000 + i for n in range(4) for i in range(500))
+
+
+def run_pipeline(stages, jobs, **kwargs):
+    q = JobQueue(maxsize=100)
+    done, lock = [], threading.Lock()
+    all_done = threading.Event()
+
+    def on_done(job, ctx):
+        with lock:
+            done.append((job, ctx))
+            if len(done) == len(jobs):
+                all_done.set()
+
+    pipeline = JobPipeline(q, stages, on_done=on_done, **kwargs)
+    pipeline.start()
+    for job in jobs:
+        q.put(job)
+    assert all_done.wait(10)
+    pipeline.stop(timeout=2)
+    return done, pipeline
+
+
+def test_pipeline_runs_every_stage_in_order():
+    def stage(name):
+        def handler(job, ctx):
+            ctx.setdefault('trace', []).append(name)
+            return True
+        return handler
+
+    done, pipeline = run_pipeline([Stage(name, stage(name), workers=2, queue_size=2) for name in ('a', 'b', 'c')],
+                                  list(range(20)))
+    assert sorted(job for job, _ in done) == list(range(20))
+    assert all(ctx['trace'] == ['a', 'b', 'c'] for _, ctx in done)
+    assert {name: info['processed'] for name, info in pipeline.stats().items()} == {'a': 20, 'b': 20, 'c': 20}
+
+
+def test_pipeline_stops_early_and_reports_errors():
+    errors = []
+
+    def first(job, ctx):
+        if job == 'boom':
+            raise RuntimeError('boom')
+        return job != 'stop'
+
+    def second(job, ctx):
+        ctx['second'] = True
+        return True
+
+    done, _ = run_pipeline([Stage('first', first), Stage('second', second)], ['ok', 'stop', 'boom'],
+                           on_error=lambda job, e: errors.append((job, str(e))))
+    ran_second = {job: ctx.get('second', False) for job, ctx in done}
+    assert ran_second == {'ok': True, 'stop': False, 'boom': False}
+    assert errors == [('boom', 'boom')]
+
+
+def test_pipeline_handoff_applies_backpressure():
+    release = threading.Event()
+    started = []
+
+    def slow(job, ctx):
+        started.append(job)
+        release.wait(5)
+        return True
+
+    q = JobQueue(maxsize=100)
+    pipeline = JobPipeline(q, [Stage('fast', lambda job, ctx: True), Stage('slow', slow, queue_size=1)])
+    pipeline.start()
+    for job in range(10):
+        q.put(job)
+    time.sleep(0.5)
+    # slow ทำอยู่ 1 + hand-off queue 1 + fast ถืออีก 1 รอ put - ที่เหลือยังอยู่ในคิวหลัก
+    assert len(started) == 1
+    assert len(q) == 7
+    release.set()
+    pipeline.stop(timeout=2)
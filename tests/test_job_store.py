@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from events import EventBus, StoreEventBridge
+from job_store import MemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    store = MemoryJobStore() if request.param == 'memory' else SQLiteJobStore(str(tmp_path / 'jobs.db'))
+    yield store
+    store.close()
+
+
+def test_counts_follow_status_changes_and_deletes(store, make_job):
+    for i in range(5):
+        store.save_job(make_job(f'j{i}', status='queued'))
+    job = store.get_job('j0')
+    job.status = 'completed'
+    store.save_job(job)
+    store.save_job(job)  # บันทึกซ้ำด้วยสถานะเดิมต้องไม่นับซ้ำ
+    assert store.delete_job('j1')
+    assert not store.delete_job('missing')
+    assert store.count_jobs() == {'queued': 3, 'completed': 1, 'total': 4}
+
+
+def test_create_job_does_not_overwrite(store, make_job):
+    assert store.create_job(make_job('daily', name='first'))
+    assert not store.create_job(make_job('daily', name='second'))
+    assert store.get_job('daily').name == 'first'
+
+
+def test_cursor_pagination_visits_every_job_once(store, make_job):
+    # created_at ซ้ำกันหลาย job: cursor ต้องใช้ id แยกลำดับ ไม่ข้ามหรือซ้ำที่ขอบหน้า
+    for i in range(23):
+        store.save_job(make_job(f'j{i:02d}', created_at=f'2026-01-01T00:00:0{i % 4}',
+                                status='completed' if i % 2 else 'queued'))
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.page_jobs(cursor=cursor, limit=5)
+        seen.extend(job.id for job in page)
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 23
+    assert seen == [job.id for job in store.list_jobs(limit=100)]
+
+    completed, cursor = [], None
+    while True:
+        page, cursor = store.page_jobs(status='completed', cursor=cursor, limit=4)
+        completed.extend(job.id for job in page)
+        if cursor is None:
+            break
+    assert sorted(completed) == [f'j{i:02d}' for i in range(1, 23, 2)]
+
+
+def test_post_ledger_reserve_and_release(store):
+    limits = [(3600.0, 2)]
+    now = 1_000_000.0
+    assert store.reserve_post('a', limits, now)
+    assert store.reserve_post('a', limits, now + 1)
+    assert not store.reserve_post('a', limits, now + 2)
+    assert store.reserve_post('b', limits, now + 2)  # แยกต่อบัญชี
+    store.release_post('a', now + 1)
+    assert store.recent_posts('a', 0) == [now]
+    assert store.reserve_post('a', limits, now + 3)
+    assert store.reserve_post('a', limits, now + 3600.5)  # โพสต์แรกหลุด window แล้ว
+
+
+def test_sqlite_status_counts_are_shared_between_connections(tmp_path, make_job):
+    path = str(tmp_path / 'jobs.db')
+    writer, reader = SQLiteJobStore(path), SQLiteJobStore(path)
+    threads = [threading.Thread(target=lambda n=n: [writer.save_job(make_job(f'{n}-{i}')) for i in range(50)])
+               for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert reader.count_jobs() == {'pending': 200, 'total': 200}
+
+
+def test_change_sequence_pages_through_same_timestamp_updates(tmp_path, make_job):
+    path = str(tmp_path / 'jobs.db')
+    a, b = SQLiteJobStore(path), SQLiteJobStore(path)
+    start = a.last_change_seq()
+    for i in range(30):
+        (a if i % 2 else b).save_job(make_job(f'j{i}'))
+    seen, seq = [], start
+    while True:
+        page = a.jobs_changed_after(seq, limit=7)
+        if not page:
+            break
+        seen.extend(job.id for _, job in page)
+        seq = page[-1][0]
+    assert seen == [f'j{i}' for i in range(30)]
+    assert seq == a.last_change_seq()
+
+
+def test_change_sequence_added_to_existing_database(tmp_path, make_job):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, schedule_time TEXT, '
+                 'created_at TEXT NOT NULL, updated_at TEXT NOT NULL, data TEXT NOT NULL)')
+    conn.commit()
+    conn.close()
+    store = SQLiteJobStore(path)
+    store.save_job(make_job('new'))
+    assert [job.id for _, job in store.jobs_changed_after(0)] == ['new']
+
+
+def test_store_event_bridge_publishes_changes_from_other_process(tmp_path, make_job):
+    path = str(tmp_path / 'jobs.db')
+    web, worker = SQLiteJobStore(path), SQLiteJobStore(path)
+    bus = EventBus()
+    events = []
+    bus.add_listener(events.append)
+    StoreEventBridge(bus, web, lambda job: {'id': job.id, 'status': job.status}, interval=0.05).start()
+    for i in range(600):  # มากกว่า limit ต่อรอบของ bridge
+        worker.save_job(make_job(f'j{i}'))
+    job = worker.get_job('j0')
+    job.status = 'completed'
+    worker.save_job(job)
+    deadline = time.monotonic() + 5
+    while len(events) < 601 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(events) == 601
+    assert events[-1]['data'] == {'id': 'j0', 'status': 'completed'}
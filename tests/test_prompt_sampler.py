@@ -0,0 +1,48 @@
+import random
+
+from prompt_sampler import CyclingChoice, ShuffledPool, decode_combination
+
+
+def test_shuffled_pool_draws_each_value_once():
+    pool = ShuffledPool(100)
+    rng = random.Random(1)
+    assert sorted(pool.draw(rng) for _ in range(100)) == list(range(100))
+    assert len(pool) == 0
+
+
+def test_shuffled_pool_remove_and_put_back():
+    rng = random.Random(2)
+    pool = ShuffledPool(10)
+    assert pool.remove(3) and not pool.remove(3)
+    drawn = pool.draw(rng)
+    pool.put_back(drawn)
+    values = sorted(pool.draw(rng) for _ in range(len(pool)))
+    assert values == [value for value in range(10) if value != 3]
+
+
+def test_shuffled_pool_reset_with_exclude():
+    pool = ShuffledPool(5)
+    pool.reset([0, 4])
+    assert sorted(pool.draw(random.Random(3)) for _ in range(len(pool))) == [1, 2, 3]
+
+
+def test_cycling_choice_rounds_contain_every_item_without_repeats():
+    for size in (2, 3, 8):
+        items = [f'caption-{i}' for i in range(size)]
+        choice = CyclingChoice(items, random.Random(size))
+        drawn = [choice.choice() for _ in range(size * 200)]
+        rounds = [drawn[i:i + size] for i in range(0, len(drawn), size)]
+        assert all(sorted(r) == sorted(items) for r in rounds)
+        assert all(a != b for a, b in zip(drawn, drawn[1:]))
+
+
+def test_cycling_choice_single_item():
+    choice = CyclingChoice(['only'])
+    assert [choice.choice() for _ in range(3)] == ['only'] * 3
+
+
+def test_decode_combination_is_mixed_radix():
+    radix = (3, 4, 2)
+    combos = {tuple(decode_combination(index, radix)) for index in range(24)}
+    assert len(combos) == 24
+    assert all(all(0 <= digit < base for digit, base in zip(combo, radix)) for combo in combos)
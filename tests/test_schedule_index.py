@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from schedule_index import WeeklySchedule
+
+TZ = pytz.timezone('Asia/Bangkok')
+SCHEDULE = {
+    'monday': {'time': '19:30', 'range': '19:00-20:00'},
+    'wednesday': [{'time': '09:00'}, {'time': '17:30', 'range': '17:00-18:00'}],
+    'sunday': {'time': '20:30'},
+}
+
+
+def at(*args):
+    return TZ.localize(datetime(*args))
+
+
+@pytest.mark.parametrize('now, expected', [
+    (at(2026, 10, 12, 8, 0), at(2026, 10, 12, 19, 30)),    # จันทร์เช้า -> จันทร์เย็น
+    (at(2026, 10, 12, 19, 30), at(2026, 10, 14, 9, 0)),    # ตรงนาทีของ slot ถือว่าผ่านไปแล้ว
+    (at(2026, 10, 14, 9, 1), at(2026, 10, 14, 17, 30)),    # หลาย slot ในวันเดียว
+    (at(2026, 10, 18, 21, 0), at(2026, 10, 19, 19, 30)),   # หลัง slot สุดท้ายของสัปดาห์ -> สัปดาห์หน้า
+])
+def test_next_slot(now, expected):
+    assert WeeklySchedule(SCHEDULE, TZ).next_slot(now)['datetime'] == expected
+
+
+def test_next_slot_converts_timezone():
+    now = pytz.utc.localize(datetime(2026, 10, 12, 12, 0))  # 19:00 เวลาไทย
+    slot = WeeklySchedule(SCHEDULE, TZ).next_slot(now)
+    assert slot['datetime'] == at(2026, 10, 12, 19, 30)
+    assert slot['weekday'] == 'monday' and slot['time_range'] == '19:00-20:00'
+
+
+def test_slots_sorted_and_empty_rejected():
+    assert WeeklySchedule(SCHEDULE, TZ).slots() == [('monday', '19:30'), ('wednesday', '09:00'),
+                                                    ('wednesday', '17:30'), ('sunday', '20:30')]
+    with pytest.raises(ValueError):
+        WeeklySchedule({}, TZ)
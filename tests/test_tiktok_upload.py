@@ -0,0 +1,25 @@
+import pytest
+
+from tiktok_upload import plan_chunks
+
+
+def covered(chunks):
+    return [(chunk['start'], chunk['end']) for chunk in chunks]
+
+
+def test_small_file_is_single_chunk():
+    assert covered(plan_chunks(100, 1000)) == [(0, 99)]
+    assert covered(plan_chunks(1000, 1000)) == [(0, 999)]
+
+
+def test_remainder_goes_into_last_chunk():
+    assert covered(plan_chunks(2500, 1000)) == [(0, 999), (1000, 2499)]
+
+
+@pytest.mark.parametrize('size', [1001, 4096, 10 ** 6 + 7])
+def test_chunks_are_contiguous_and_cover_file(size):
+    chunks = plan_chunks(size, 1000)
+    assert [chunk['index'] for chunk in chunks] == list(range(len(chunks)))
+    assert chunks[0]['start'] == 0 and chunks[-1]['end'] == size - 1
+    assert all(a['end'] + 1 == b['start'] for a, b in zip(chunks, chunks[1:]))
+    assert all(chunk['end'] - chunk['start'] + 1 >= 1000 for chunk in chunks)
@@ -0,0 +1,213 @@
+"""อัปโหลดไฟล์วิดีโอไป TikTok แบบ FILE_UPLOAD (init + PUT ทีละ chunk) โดยอ่านไฟล์แบบ stream
+
+หน่วยความจำต่อการอัปโหลดคงที่ (buffer อ่านไฟล์ขนาดเล็กต่อ chunk ที่กำลังส่ง) ไม่ว่าไฟล์จะใหญ่แค่ไหน
+และรันต่อจาก chunk ที่ server ตอบรับแล้วได้ผ่าน state ที่เก็บไว้ใน job (upload_progress)
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from resilience import RetryPolicy, is_retryable
+
+MIN_CHUNK_SIZE = 5 * 1024 * 1024     # ข้อกำหนดของ TikTok: chunk ละ 5-64 MB (chunk สุดท้ายใหญ่ได้ถึง 128 MB)
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class PublishFailedError(Exception):
+    """TikTok รับไฟล์ครบแต่ประมวลผลโพสต์ไม่สำเร็จ - ต้อง init ใหม่ (state เดิมใช้ไม่ได้แล้ว)"""
+
+
+def plan_chunks(video_size: int, chunk_size: int) -> List[Dict]:
+    """แบ่งไฟล์เป็นช่วง byte ตามกติกาของ TikTok: ไฟล์เล็กกว่า chunk_size ส่งทีเดียว ส่วนเศษรวมไว้ใน chunk สุดท้าย"""
+    if video_size <= chunk_size:
+        return [{'index': 0, 'start': 0, 'end': video_size - 1}]
+    count = video_size // chunk_size
+    chunks = []
+    for index in range(count):
+        start = index * chunk_size
+        end = video_size - 1 if index == count - 1 else start + chunk_size - 1
+        chunks.append({'index': index, 'start': start, 'end': end})
+    return chunks
+
+
+class FileSlice:
+    """ช่วง byte ของไฟล์แบบ file-like (requests อ่านทีละ block จึงไม่ต้องโหลดทั้ง chunk เข้า memory)"""
+
+    def __init__(self, path: str, start: int, length: int, block_size: int = READ_BLOCK_SIZE):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.block_size = block_size
+        self._file = None
+        self._read = 0
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+            self._file.seek(self.start)
+        remaining = self.length - self._read
+        if remaining <= 0:
+            return b''
+        size = self.block_size if size is None or size < 0 else size
+        data = self._file.read(min(size, remaining, self.block_size))
+        self._read += len(data)
+        return data
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ChunkedUploader:
+    """Client ของ TikTok Content Posting API แบบ FILE_UPLOAD
+
+    upload_file() init โพสต์ (ครั้งแรก) แล้ว PUT chunks ที่ยังไม่ถูกตอบรับ ทีละ parallel chunks
+    (TikTok จริงรับ chunk ตามลำดับ - ค่าเริ่มต้นจึงเป็น 1, ตั้งมากกว่านี้ได้กับ server ที่รับแบบขนาน)
+    """
+
+    def __init__(self, access_token: str, base_url: str = 'https://open.tiktokapis.com',
+                 chunk_size: int = 10 * 1024 * 1024, parallel: int = 1, timeout: float = 120.0,
+                 retry: Optional[RetryPolicy] = None, guard=None, enforce_limits: bool = True):
+        if enforce_limits:
+            chunk_size = min(max(chunk_size, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+        self.access_token = access_token
+        self.base_url = base_url.rstrip('/')
+        self.chunk_size = chunk_size
+        self.parallel = max(1, parallel)
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=15.0)
+        self.guard = guard  # resilience.ApiGuard สำหรับ API calls (ไม่ใช้กับ chunk PUT จะได้ไม่กิน rate limit)
+        self._local = threading.local()  # requests.Session ต่อ thread (keep-alive)
+        self._chunks_sent = 0
+        self._bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _post(self, path: str, payload: Dict, on_retry=None) -> Dict:
+        def call():
+            response = self._session().post(f'{self.base_url}{path}', json=payload, timeout=self.timeout,
+                                            headers={'Authorization': f'Bearer {self.access_token}'})
+            body = response.json() if response.content else {}
+            error = body.get('error') or {}
+            if response.status_code >= 400 or error.get('code', 'ok') != 'ok':
+                raise RuntimeError(f"TikTok API {response.status_code}: {error.get('message') or error.get('code')}")
+            return body.get('data') or {}
+
+        if self.guard is not None:
+            return self.guard.call(call, on_retry=on_retry)
+        return call()
+
+    def init_upload(self, post_info: Dict, video_size: int, on_retry=None) -> Dict:
+        """เริ่มโพสต์แบบ FILE_UPLOAD คืน state เริ่มต้นสำหรับ upload_file"""
+        chunks = plan_chunks(video_size, self.chunk_size)
+        data = self._post('/v2/post/publish/video/init/', {
+            'post_info': post_info,
+            'source_info': {
+                'source': 'FILE_UPLOAD',
+                'video_size': video_size,
+                'chunk_size': min(self.chunk_size, video_size),
+                'total_chunk_count': len(chunks)
+            }
+        }, on_retry)
+        return {
+            'publish_id': data['publish_id'],
+            'upload_url': data['upload_url'],
+            'video_size': video_size,
+            'chunk_size': self.chunk_size,
+            'acked': []
+        }
+
+    def _put_chunk(self, path: str, state: Dict, chunk: Dict):
+        """PUT chunk เดียว (ลองใหม่เมื่อเจอ error ชั่วคราว)"""
+        length = chunk['end'] - chunk['start'] + 1
+        headers = {
+            'Content-Type': 'video/mp4',
+            'Content-Length': str(length),
+            'Content-Range': f"bytes {chunk['start']}-{chunk['end']}/{state['video_size']}"
+        }
+        attempt = 0
+        while True:
+            attempt += 1
+            body = FileSlice(path, chunk['start'], length)
+            try:
+                response = self._session().put(state['upload_url'], data=body, headers=headers,
+                                               timeout=self.timeout)
+                if response.status_code not in (200, 201, 206):
+                    raise RuntimeError(f"TikTok chunk {chunk['index']} upload {response.status_code}: {response.text[:200]}")
+                break
+            except Exception as e:
+                if attempt >= self.retry.max_attempts or not is_retryable(e):
+                    raise
+                time.sleep(self.retry.delay(attempt))
+            finally:
+                body.close()
+        with self._lock:
+            self._chunks_sent += 1
+            self._bytes_sent += length
+
+    def upload_file(self, path: str, post_info: Dict, state: Optional[Dict] = None,
+                    on_progress: Optional[Callable[[Dict], None]] = None, on_retry=None) -> Dict:
+        """อัปโหลดไฟล์ทั้งไฟล์ (หรือเฉพาะ chunks ที่เหลือถ้ามี state เดิม) คืน state ที่ acked ครบแล้ว
+
+        on_progress(state) ถูกเรียกทุกครั้งที่ server ตอบรับ chunk - ใช้บันทึก checkpoint
+        """
+        video_size = os.path.getsize(path)
+        if not state or state.get('video_size') != video_size:
+            state = self.init_upload(post_info, video_size, on_retry)
+            if on_progress:
+                on_progress(state)
+
+        acked = set(state['acked'])
+        pending = [chunk for chunk in plan_chunks(video_size, state['chunk_size']) if chunk['index'] not in acked]
+        progress_lock = threading.Lock()
+
+        def send(chunk):
+            self._put_chunk(path, state, chunk)
+            with progress_lock:
+                state['acked'] = sorted(set(state['acked']) | {chunk['index']})
+                if on_progress:
+                    on_progress(state)
+
+        if self.parallel == 1 or len(pending) <= 1:
+            for chunk in pending:
+                send(chunk)
+        else:
+            with ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix='tiktok-chunk') as pool:
+                for future in [pool.submit(send, chunk) for chunk in pending]:
+                    future.result()
+        return state
+
+    def wait_published(self, publish_id: str, attempts: int = 10, interval: float = 2.0) -> Optional[str]:
+        """รอจน TikTok ประมวลผลเสร็จ คืน post id (None ถ้ายังไม่เผยแพร่ภายในเวลาที่รอ)"""
+        for _ in range(attempts):
+            status = self._post('/v2/post/publish/status/fetch/', {'publish_id': publish_id})
+            if status.get('status') == 'FAILED':
+                raise PublishFailedError(f"TikTok publish failed: {status.get('fail_reason')}")
+            if status.get('status') == 'PUBLISH_COMPLETE':
+                post_ids = status.get('publicaly_available_post_id') or []
+                return post_ids[0] if post_ids else None
+            time.sleep(interval)
+        return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'chunk_size': self.chunk_size,
+                'parallel': self.parallel,
+                'chunks_sent': self._chunks_sent,
+                'bytes_sent': self._bytes_sent
+            }
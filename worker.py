@@ -0,0 +1,99 @@
+"""Worker process สำหรับ worker mode (EXECUTION_MODE=distributed)
+
+เว็บ (app.py) แค่ส่ง job เข้าคิวกลางใน SQLite ส่วน process นี้จอง job ด้วย lease + heartbeat
+แล้วรัน pipeline generation -> caption -> upload เอง รันหลายตัวพร้อมกันได้ (ใช้ JOB_STORE_PATH เดียวกัน):
+
+    EXECUTION_MODE=distributed python app.py
+    EXECUTION_MODE=distributed python worker.py   # เปิดกี่ตัวก็ได้
+
+/metrics ของเว็บเห็นแค่ process เว็บ - เวลาของแต่ละ stage อยู่ใน worker: ตั้ง WORKER_METRICS_PORT ให้ worker
+เปิด /metrics ของตัวเอง (Prometheus scrape ทุก worker แล้วรวมด้วย sum by stage)
+"""
+import os
+import signal
+import socket
+import threading
+import uuid
+
+os.environ.setdefault('EXECUTION_MODE', 'distributed')
+
+import app as web
+import metrics
+from job_queue import JobPipeline, LeasedJobSource, Stage
+
+
+def mark_exhausted(job, attempts: int):
+    """job ที่ worker ตายระหว่างรันซ้ำหลายรอบ - หยุดลองแล้วตั้งเป็น failed"""
+    job.status = 'failed'
+    job.error_message = f'worker หยุดทำงานระหว่างรัน {attempts} ครั้ง'
+    web.save_job(job)
+    web.video_manager.log_job_activity(job.id, f'💀 worker หยุดทำงานระหว่างรัน {attempts} ครั้ง - เลิกลองใหม่', 'error')
+
+
+def main():
+    if web.EXECUTION_MODE != 'distributed':
+        raise SystemExit('worker.py ต้องใช้ EXECUTION_MODE=distributed')
+    web.init_services()
+
+    owner = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+    source = LeasedJobSource(web.job_store, web.job_store.get_job, owner,
+                             lease_seconds=web.WORKER_LEASE_SECONDS,
+                             max_attempts=web.WORKER_MAX_ATTEMPTS,
+                             on_exhausted=mark_exhausted)
+    manager = web.video_manager
+
+    def guarded(handler):
+        """ตรวจว่ายังถือ lease อยู่ก่อนเริ่มแต่ละ stage (กันการอัปโหลดซ้ำเมื่อ worker อื่นรับงานไปแล้ว)"""
+        def run(job, ctx):
+            if not source.owns(job.id):
+                ctx['lease_lost'] = True
+                manager.log_job_activity(job.id, '⚠️ lease หลุด - ปล่อยให้ worker อื่นทำต่อ', 'warning')
+                return False
+            return handler(job, ctx)
+        return run
+
+    def on_done(job, ctx):
+        if ctx.get('lease_lost') or not source.owns(job.id):
+            return  # ไม่บันทึกทับผลของ worker ที่ถือ lease อยู่ตอนนี้
+        manager.finish_job(job, ctx)
+        source.release(job.id)
+
+    def defer_upload(item, wait):
+        """โควตาบัญชีหมด: เลื่อน job แล้วคืน lease (รอบหน้าเข้าคิวกลางใหม่ ให้ worker ตัวไหนก็ได้รับ)"""
+        web.defer_upload(item, wait)
+        source.release(item[0].id)
+
+    # คิวต่อบัญชีแยกต่อ worker process แต่โควตาโพสต์นับร่วมกันใน job store (ไม่เกินโควตาแม้มีหลาย worker)
+    upload_dispatcher = web.create_upload_dispatcher(on_deferred=defer_upload)
+    pipeline = JobPipeline(
+        source,
+        [Stage(name, guarded(handler), workers=web.stage_workers[name], queue_size=web.PIPELINE_HANDOFF_SIZE,
+               handoff=upload_dispatcher if name == 'upload' else None)
+         for name, handler in manager.pipeline_stages()],
+        on_error=manager.handle_stage_error,
+        on_done=on_done,
+        name='worker'
+    )
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    pipeline.start()
+    metrics_server = metrics.serve(web.metrics, web.WORKER_METRICS_PORT) if web.WORKER_METRICS_PORT else None
+    print(f"👷 Worker {owner} เริ่มทำงาน (lease {web.WORKER_LEASE_SECONDS:.0f}s)"
+          + (f" metrics ที่ :{web.WORKER_METRICS_PORT}/metrics" if metrics_server else ''))
+    while not stopping.wait(1.0):
+        pass
+
+    # หยุดรับงานใหม่ - งานที่ค้างอยู่จะถูก worker อื่นรับต่อเมื่อ lease หมดอายุ
+    pipeline.stop(timeout=web.WORKER_LEASE_SECONDS)
+    source.stop()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    web.job_store.close()
+    print(f"👋 Worker {owner} หยุดทำงาน")
+
+
+if __name__ == '__main__':
+    main()